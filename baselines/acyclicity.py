@@ -0,0 +1,173 @@
+"""
+    File name: acyclicity.py
+    Python Version: 3.8
+    Description: Acyclicity constraints shared by the NOTEARS, DCDI and DAG-GNN baselines.
+
+    All constraints take a non-negative matrix A, e.g., W * W or edge probabilities, and are zero
+    if and only if A is the weighted adjacency matrix of a DAG:
+
+        expm:   h(A) = tr(exp(A)) - d                       (Zheng et al. 2018)
+        poly:   h(A) = tr((I + A / d)^d) - d                (Yu et al. 2019)
+        logdet: h(A) = -log det(sI - A) + d log s           (Bello et al. 2022, DAGMA)
+
+    The matrix power of poly is computed by repeated squaring. The logdet constraint is only
+    defined while the spectral radius rho(A) is below s. Once rho(A) reaches (1 - LOGDET_MARGIN) s,
+    s is raised to rho(A) / (1 - LOGDET_MARGIN), as DAGMA rescales s, and the increase of s is
+    penalized linearly. h then stays finite, is still zero only for DAGs, and its gradient leads
+    back into the domain.
+"""
+
+import numpy as np
+import scipy.linalg as slin
+import torch
+
+
+ACYCLICITY_METHODS = ['expm', 'poly', 'logdet']
+
+# Relative distance of rho(A) to s from which the logdet constraint rescales s
+LOGDET_MARGIN = 0.05
+
+
+def _in_logdet_domain_numpy(A: np.ndarray, c: float) -> bool:
+    """ Whether rho(A) < c, i.e., whether the Z-matrix cI - A is a non-singular M-matrix, which is
+    the case if and only if its inverse is non-negative.
+    """
+
+    try:
+        M_inv = np.linalg.inv(c * np.eye(A.shape[0]) - A)
+    except np.linalg.LinAlgError:
+        return False
+    return bool(np.all(np.isfinite(M_inv)) and M_inv.min() >= -1e-12 * np.abs(M_inv).max())
+
+
+def _perron_numpy(A: np.ndarray):
+    """ Spectral radius of a non-negative matrix and its gradient v u^T / v^T u, from the right and
+    left Perron vectors u and v of A shifted by a tiny positive matrix, which makes them unique.
+    """
+
+    P = A + 1e-9 * (A.max() + 1.0)
+    eigvals, right = np.linalg.eig(P)
+    u = np.abs(right[:, np.argmax(eigvals.real)].real)
+    eigvals_left, left = np.linalg.eig(P.T)
+    v = np.abs(left[:, np.argmax(eigvals_left.real)].real)
+    return float(eigvals.real.max()), np.outer(v, u) / (v @ u)
+
+
+def acyclicity_numpy(A: np.ndarray, method: str = 'expm', s: float = 1.0):
+    """ Value and gradient of an acyclicity constraint.
+
+    Args:
+        A (np.ndarray): [d, d] non-negative matrix.
+        method (str, optional): One of ACYCLICITY_METHODS. Defaults to 'expm'.
+        s (float, optional): Scale of the logdet constraint. Defaults to 1.0.
+
+    Returns:
+        Tuple[float, np.ndarray]: h(A) and its [d, d] gradient w.r.t. A.
+    """
+
+    d = A.shape[0]
+    if method == 'expm':
+        E = slin.expm(A)
+        return np.trace(E) - d, E.T
+    elif method == 'poly':
+        M = np.eye(d) + A / d
+        E = np.linalg.matrix_power(M, d - 1)
+        return (E.T * M).sum() - d, E.T
+    elif method == 'logdet':
+        if _in_logdet_domain_numpy(A, (1 - LOGDET_MARGIN) * s):
+            M = s * np.eye(d) - A
+            return -np.linalg.slogdet(M)[1] + d * np.log(s), np.linalg.inv(M).T
+
+        rho, G_rho = _perron_numpy(A)
+        s_eff = rho / (1 - LOGDET_MARGIN)
+        M_inv = np.linalg.inv(s_eff * np.eye(d) - A)
+        slope = d / (LOGDET_MARGIN * s)
+        h = -np.linalg.slogdet(s_eff * np.eye(d) - A)[1] + d * np.log(s_eff) + slope * (s_eff - s)
+        dh_ds = -np.trace(M_inv) + d / s_eff + slope
+        return h, M_inv.T + dh_ds * G_rho / (1 - LOGDET_MARGIN)
+    else:
+        raise ValueError(f'Unknown acyclicity constraint {method}, choose from {ACYCLICITY_METHODS}.')
+
+
+class _TraceExpm(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, A):
+        E = torch.linalg.matrix_exp(A)
+        ctx.save_for_backward(E)
+        return torch.trace(E) - A.shape[0]
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        E, = ctx.saved_tensors
+        return grad_output * E.t()
+
+
+class _TracePoly(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, A):
+        d = A.shape[0]
+        M = torch.eye(d, dtype=A.dtype, device=A.device) + A / d
+        E = torch.linalg.matrix_power(M, d - 1)
+        ctx.save_for_backward(E)
+        return (E.t() * M).sum() - d
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        E, = ctx.saved_tensors
+        return grad_output * E.t()
+
+
+class _LogDet(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, A, s):
+        d = A.shape[0]
+        eye = torch.eye(d, dtype=A.dtype, device=A.device)
+
+        # Same domain test and rescaling of s as acyclicity_numpy
+        M_inv, info = torch.linalg.inv_ex((1 - LOGDET_MARGIN) * s * eye - A)
+        if info == 0 and torch.isfinite(M_inv).all() and M_inv.min() >= -1e-12 * M_inv.abs().max():
+            M_inv = torch.linalg.inv(s * eye - A)
+            ctx.save_for_backward(M_inv.t())
+            return -torch.linalg.slogdet(s * eye - A)[1] + d * np.log(s)
+
+        P = A + 1e-9 * (A.max() + 1.0)
+        eigvals, right = torch.linalg.eig(P)
+        u = right[:, torch.argmax(eigvals.real)].real.abs()
+        eigvals_left, left = torch.linalg.eig(P.t())
+        v = left[:, torch.argmax(eigvals_left.real)].real.abs()
+        G_rho = torch.outer(v, u) / (v @ u)
+
+        s_eff = eigvals.real.max().item() / (1 - LOGDET_MARGIN)
+        M_inv = torch.linalg.inv(s_eff * eye - A)
+        slope = d / (LOGDET_MARGIN * s)
+        dh_ds = -torch.trace(M_inv) + d / s_eff + slope
+        ctx.save_for_backward(M_inv.t() + dh_ds * G_rho / (1 - LOGDET_MARGIN))
+        return -torch.linalg.slogdet(s_eff * eye - A)[1] + d * np.log(s_eff) + slope * (s_eff - s)
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        G, = ctx.saved_tensors
+        return grad_output * G, None
+
+
+def acyclicity_torch(A: torch.Tensor, method: str = 'expm', s: float = 1.0) -> torch.Tensor:
+    """ Acyclicity constraint of a tensor, differentiable with the analytic gradient and computed
+    on the device of A.
+
+    Args:
+        A (torch.Tensor): [d, d] non-negative matrix.
+        method (str, optional): One of ACYCLICITY_METHODS. Defaults to 'expm'.
+        s (float, optional): Scale of the logdet constraint. Defaults to 1.0.
+
+    Returns:
+        torch.Tensor: h(A) as scalar tensor.
+    """
+
+    if method == 'expm':
+        return _TraceExpm.apply(A)
+    elif method == 'poly':
+        return _TracePoly.apply(A)
+    elif method == 'logdet':
+        return _LogDet.apply(A, s)
+    else:
+        raise ValueError(f'Unknown acyclicity constraint {method}, choose from {ACYCLICITY_METHODS}.')
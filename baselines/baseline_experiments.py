@@ -12,8 +12,9 @@
 import os
 import sys
 import pickle
+import random
+import hashlib
 import argparse
-import os
 import uuid
 
 import numpy as np
@@ -23,6 +24,8 @@ from shutil import rmtree
 from cdt.utils.R import launch_R_script
 
 from abc import ABC, abstractmethod
+from multiprocessing import Manager, Pool
+from typing import Dict
 
 sys.path.append("../federated")
 sys.path.append("../causal_graphs")
@@ -32,6 +35,9 @@ from causal_learning import ENCOAlg
 from graph_definition import CausalDAGDataset
 from logging_settings import logger
 from utils import calculate_metrics
+from native_gies import GaussL0penIntScore, greedy_dag_search
+from lowrank_hsic import hsic_lowrank_invariance_suffstat, hsic_lowrank_invariance_test
+from lowrank_hsic import hsic_lowrank_suffstat, hsic_lowrank_test
 
 from causaldag import igsp
 from conditional_independence.ci_tests import MemoizedCI_Tester, hsic_test
@@ -99,7 +105,7 @@ class GIES(BaselineExperiments):
     """
     def __init__(self, obs_samples_size: int = 5000, int_samples_size: int = 40,
                  num_vars: int = 5, graph_type: str = "full", edge_prob: float = 0.0,
-                 seed: int = 0, num_clients: int = 2, num_rounds: int = 1):
+                 seed: int = 0, num_clients: int = 2, num_rounds: int = 1, engine: str = "r"):
         """Initialization of experiments for GIES method.
         TODO: Check if Nan is the right way to go for observational samples target list.
 
@@ -112,9 +118,14 @@ class GIES(BaselineExperiments):
             seed (int, optional): Random seed of the experiment. Defaults to 0.
             num_clients (int, optional): Total number of clients. Defaults to 2.
             num_rounds (int, optional): Total number of federated rounds. Defaults to 1.
+            engine (str, optional): Structure search, r for GIES with the R script or greedy for
+                the in-process greedy DAG search on the same score, which is not GIES and may end
+                in a different local optimum. Defaults to "r".
         """
         super().__init__(obs_samples_size, int_samples_size, num_vars, graph_type,
                          edge_prob, seed, num_clients, num_rounds)
+        assert engine in ("r", "greedy"), f'Unknown GIES engine: {engine}'
+        self.engine = engine
         logger.info('GIES baseline class initialized.')
 
     @abstractmethod
@@ -163,6 +174,11 @@ class GIES(BaselineExperiments):
         """ Setting up and running GIES with interventional and observational data.
         """
 
+        if self.engine == "greedy":
+            score = GaussL0penIntScore(data.values, None if targets is None else targets.values,
+                                       lambda_gies=lambda_gies)
+            return greedy_dag_search(score)
+
         id = str(uuid.uuid4())
         data_path = os.path.join('tmp', f'cdt_gies{id}')
 
@@ -269,12 +285,87 @@ class GIES(BaselineExperiments):
         return data, targets
 
 
+def fingerprint(*arrays: np.ndarray) -> str:
+    """ Hash of the contents of a number of arrays.
+    """
+
+    sha = hashlib.sha1()
+    for array in arrays:
+        sha.update(np.ascontiguousarray(array).tobytes())
+    return sha.hexdigest()
+
+
+class SharedTestCache:
+    def __init__(self, test, cache: Dict, data_fingerprint: str, context_fingerprints: Dict = None):
+        """ CI or invariance test whose results are memoized in a dict shared among clients. The
+        memo is keyed on the fingerprint of the data the test reads instead of on the client, so
+        clients holding the same samples reuse each other's results.
+
+        Args:
+            test (Callable): hsic_test or an invariance test with the same signature.
+            cache (Dict): Shared memo, e.g., a multiprocessing.Manager dict.
+            data_fingerprint (str): Fingerprint of the observational samples.
+            context_fingerprints (Dict, optional): Fingerprint of the samples of each context for
+                invariance tests, whose first argument after the sufficient statistics is the
+                context. Defaults to None.
+        """
+
+        self.test = test
+        self.cache = cache
+        self.data_fingerprint = data_fingerprint
+        self.context_fingerprints = context_fingerprints
+
+    def __call__(self, suffstat, *args, **kwargs):
+        key_args = [frozenset(arg) if isinstance(arg, (set, frozenset, list)) else arg for arg in args]
+        key_kwargs = {k: frozenset(v) if isinstance(v, (set, frozenset, list)) else v for k, v in kwargs.items()}
+        if self.context_fingerprints is not None:
+            if 'context' in key_kwargs:
+                key_kwargs['context'] = self.context_fingerprints[key_kwargs['context']]
+            else:
+                key_args[0] = self.context_fingerprints[key_args[0]]
+        key = (self.test.__name__, self.data_fingerprint, *key_args, *sorted(key_kwargs.items()))
+
+        result = self.cache.get(key)
+        if result is None:
+            result = self.test(suffstat, *args, **kwargs)
+            self.cache[key] = result
+        return result
+
+
+def run_igsp_client(client_id: int, local_causal_dag_dataset: CausalDAGDataset, ci_cache: Dict,
+                    seed: int, ci_test: str = "hsic", rank: int = 100, nruns: int = 5):
+    """
+    Local IGSP inference of a client inside a pool worker.
+
+    Args:
+        client_id (int): The client.
+        local_causal_dag_dataset (CausalDAGDataset): Local dataset of the client.
+        ci_cache (Dict): Memo of test results shared by all clients.
+        seed (int): Random seed of the client's permutation search.
+        ci_test (str, optional): CI test, hsic or hsic_lowrank. Defaults to "hsic".
+        rank (int, optional): Number of kernel features of hsic_lowrank. Defaults to 100.
+        nruns (int, optional): Number of IGSP restarts. Defaults to 5.
+
+    Returns:
+        Tuple[int, np.ndarray]: Client id and the adjacency matrix of its estimated DAG.
+    """
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+    ci_tester, invariance_tester, nodes, setting_list = IGSP.prepare_igsp(local_causal_dag_dataset, ci_test=ci_test,
+                                                                          rank=rank, ci_cache=ci_cache)
+    est_dag = igsp(setting_list, nodes, ci_tester, invariance_tester, nruns=nruns)
+    return client_id, est_dag.to_amat()[0]
+
+
 class IGSP(BaselineExperiments):
     """Class to assess IGSP performance in a federated setup.
     """
     def __init__(self, obs_samples_size: int = 5000, int_samples_size: int = 40,
                  num_vars: int = 20, graph_type: str = "full", edge_prob: float = 0.0,
-                 seed: int = 0, num_clients: int = 2, num_rounds: int = 1):
+                 seed: int = 0, num_clients: int = 2, num_rounds: int = 1, num_workers: int = None,
+                 ci_cache: Dict = None, ci_test: str = "hsic", rank: int = 100):
         """Initialization of experiments for IGSP method.
 
         Args:
@@ -286,9 +377,22 @@ class IGSP(BaselineExperiments):
             seed (int, optional): Random seed of the experiment. Defaults to 0.
             num_clients (int, optional): Total number of clients. Defaults to 2.
             num_rounds (int, optional): Total number of federated rounds. Defaults to 1.
+            num_workers (int, optional): Number of clients trained in parallel. Defaults to None,
+                which uses one worker per client up to the number of CPUs.
+            ci_cache (Dict, optional): Memo of CI and invariance test results to share with other
+                experiments, e.g., a multiprocessing.Manager dict. Defaults to None, which shares
+                the results among the clients of this experiment only.
+            ci_test (str, optional): CI and invariance tests, hsic with full Gram matrices or
+                hsic_lowrank with rank kernel features per variable, which scales to thousands of
+                samples. Defaults to "hsic".
+            rank (int, optional): Number of kernel features of hsic_lowrank. Defaults to 100.
         """
         super().__init__(obs_samples_size, int_samples_size, num_vars, graph_type,
                          edge_prob, seed, num_clients, num_rounds)
+        self.num_workers = num_workers if num_workers is not None else min(num_clients, os.cpu_count())
+        self.ci_cache = ci_cache
+        self.ci_test = ci_test
+        self.rank = rank
         logger.info('IGSP baseline class initialized.')
 
     @abstractmethod
@@ -297,16 +401,19 @@ class IGSP(BaselineExperiments):
         """
 
         """ Simple federated 1-round """
-        clients_adjacency_matrix = list()
+        local_datasets = [self.build_local_dataset(client_id) for client_id in range(self.num_clients)]
 
-        for client_id in range(self.num_clients):
-            local_causal_dag_dataset = self.build_local_dataset(client_id)
+        with Manager() as manager:
+            ci_cache = self.ci_cache if self.ci_cache is not None else manager.dict()
+            clients_args = [(client_id, local_datasets[client_id], ci_cache, self.seed + client_id,
+                             self.ci_test, self.rank) for client_id in range(self.num_clients)]
+            with Pool(processes=self.num_workers) as workers_pool:
+                clients_dags = dict(workers_pool.starmap(run_igsp_client, clients_args))
 
-            ci_tester, invariance_tester, nodes, setting_list = self.prepare_igsp(local_causal_dag_dataset)
-            est_dag = igsp(setting_list, nodes, ci_tester, invariance_tester, nruns=5)
-            dag = est_dag.to_amat()[0]
+        clients_adjacency_matrix = list()
+        for client_id in range(self.num_clients):
+            dag = clients_dags[client_id]
             logger.info(f'Final DAG by client {client_id}: \n{dag}')
-
             clients_adjacency_matrix.append(dag)
 
         """ Calculate the naive aggregation """
@@ -335,34 +442,46 @@ class IGSP(BaselineExperiments):
             pickle.dump(final_results, f, protocol=pickle.HIGHEST_PROTOCOL)
             logger.info(f'Saving results was successful.')
 
-    def prepare_igsp(self, local_causal_dag_dataset, alpha=1e-3, alpha_inv=1e-3, ci_test="hsic"):
+    @staticmethod
+    def prepare_igsp(local_causal_dag_dataset, alpha=1e-3, alpha_inv=1e-3, ci_test="hsic", rank=100,
+                     ci_cache=None):
         """
-            Convert ENCO dataset to IGSP output.
+            Convert ENCO dataset to IGSP output, with one context per intervened variable. The
+            test results are memoized in ci_cache if given, otherwise per client.
         """
 
         obs_samples = local_causal_dag_dataset.data_obs
         int_samples = local_causal_dag_dataset.data_int
 
-        iv_samples_list = list()
-        targets_list = list()
-
-        for var_idx in range(local_causal_dag_dataset.adj_matrix.shape[0]):
-            for int_sample in int_samples[var_idx]:
-                # TODO: FIX THIS
-                iv_samples_list.append(int_samples[var_idx])
-                targets_list.append([var_idx])
+        intervened_vars = [var_idx for var_idx in range(local_causal_dag_dataset.adj_matrix.shape[0])
+                           if len(int_samples[var_idx]) > 0]
+        contexts = {context: int_samples[var_idx] for context, var_idx in enumerate(intervened_vars)}
 
         logger.info(f'Shape of obs_samples {obs_samples.shape}')
-        logger.info(f'Shape of iv_samples_list ({len(iv_samples_list)}, {iv_samples_list[0].shape})')
-
-        contexts = {i:s for i,s in enumerate(iv_samples_list)}
-        invariance_suffstat = {"obs_samples":obs_samples}
-        invariance_suffstat.update(contexts)
-
-        ci_tester = MemoizedCI_Tester(hsic_test, obs_samples, alpha=alpha)
-        invariance_tester = MemoizedInvarianceTester(hsic_invariance_test, invariance_suffstat, alpha=alpha_inv)
-
-        setting_list = [dict(interventions=targets) for targets in targets_list]
+        logger.info(f'Number of contexts {len(contexts)} with samples of shape {int_samples.shape[1:]}')
+
+        if ci_test == "hsic":
+            ci_suffstat, ci_test_fn = obs_samples, hsic_test
+            invariance_suffstat = {"obs_samples":obs_samples}
+            invariance_suffstat.update(contexts)
+            invariance_test_fn = hsic_invariance_test
+        elif ci_test == "hsic_lowrank":
+            ci_suffstat, ci_test_fn = hsic_lowrank_suffstat(obs_samples, rank=rank), hsic_lowrank_test
+            invariance_suffstat = hsic_lowrank_invariance_suffstat(obs_samples, contexts, rank=rank)
+            invariance_test_fn = hsic_lowrank_invariance_test
+        else:
+            raise ValueError(f"CI test '{ci_test}' does not exist. Choose between: [hsic, hsic_lowrank]")
+
+        if ci_cache is not None:
+            obs_fingerprint = f'{fingerprint(obs_samples)}-{rank}'
+            ci_test_fn = SharedTestCache(ci_test_fn, ci_cache, obs_fingerprint)
+            invariance_test_fn = SharedTestCache(invariance_test_fn, ci_cache, obs_fingerprint,
+                                                 {context: fingerprint(samples) for context, samples in contexts.items()})
+
+        ci_tester = MemoizedCI_Tester(ci_test_fn, ci_suffstat, alpha=alpha)
+        invariance_tester = MemoizedInvarianceTester(invariance_test_fn, invariance_suffstat, alpha=alpha_inv)
+
+        setting_list = [dict(interventions=[var_idx]) for var_idx in intervened_vars]
         nodes = set(range(local_causal_dag_dataset.adj_matrix.shape[0]))
         return ci_tester, invariance_tester, nodes, setting_list
 
@@ -411,7 +530,13 @@ class IGSP(BaselineExperiments):
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GIES baseline.')
+    parser.add_argument('--engine', type=str, default='r', choices=['r', 'greedy'],
+                        help='Structure search: GIES with the R script or the in-process greedy DAG search '
+                             'on the same score')
+    args = parser.parse_args()
+
     logger.info('Running baselines test...')
-    gies_module = GIES()
+    gies_module = GIES(engine=args.engine)
     gies_module.run()
 
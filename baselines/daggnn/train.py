@@ -12,6 +12,7 @@ import time
 import argparse
 import pickle
 import os
+import sys
 import datetime
 
 # import torch
@@ -23,6 +24,9 @@ import math
 from utils import *
 from modules import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from acyclicity import acyclicity_torch, ACYCLICITY_METHODS
+
 parser = argparse.ArgumentParser()
 
 # -----------data parameters ------
@@ -109,6 +113,8 @@ parser.add_argument('--load-folder', type=str, default='',
 
 parser.add_argument('--h_tol', type=float, default = 1e-8,
                     help='the tolerance of error of h(A) to zero')
+parser.add_argument('--acyclicity', type=str, default='poly', choices=ACYCLICITY_METHODS,
+                    help='the acyclicity constraint on A*A, see baselines/acyclicity.py')
 parser.add_argument('--prediction-steps', type=int, default=10, metavar='N',
                     help='Num steps to predict before re-using teacher forcing.')
 parser.add_argument('--lr-decay', type=int, default=200,
@@ -260,8 +266,8 @@ rel_send = Variable(rel_send)
 
 # compute constraint h(A) value
 def _h_A(A, m):
-    expm_A = matrix_poly(A*A, m)
-    h_A = torch.trace(expm_A) - m
+    # m is the number of variables, i.e., the size of A
+    h_A = acyclicity_torch(A*A, args.acyclicity)
     return h_A
 
 prox_plus = torch.nn.Threshold(0.,0.)
@@ -0,0 +1,311 @@
+"""
+    File name: batched_cam.py
+    Python Version: 3.8
+    Description: In-process CAM (causal additive models) with the SEMGAM score of cam_with_score.R.
+
+    Every variable gets a cubic B-spline basis once. The score of a node is -log var(residual) of
+    the additive regression on the bases of its parents, fitted on the samples in which the node
+    is not intervened on. For a node with parents P, the gains of all candidate parents come from
+    one batched solve: the residual of the node and the candidate bases are projected off the span
+    of the parents' bases, and the rank-k reductions of the residual sum of squares are solved for
+    all candidates at once. Gains are kept between greedy steps and only the column of the node
+    that received a parent is recomputed, as in the R implementation.
+
+    Variable selection (PNS) uses componentwise L2 boosting with the spline bases as base
+    learners, and pruning uses an F-test per parent, in place of mboost and the p-values of mgcv.
+"""
+
+import networkx as nx
+import numpy as np
+
+from scipy.interpolate import BSpline
+from scipy.stats import f as f_dist
+from typing import List, Tuple
+
+
+class SplineBasis:
+    def __init__(self, values: np.ndarray, num_basis: int = 10, degree: int = 3):
+        """ Cubic B-spline basis of a variable with knots at the quantiles of its training values.
+        One function is dropped, since the basis sums to one and an intercept is always fitted.
+
+        Args:
+            values (np.ndarray): [n] training values of the variable.
+            num_basis (int, optional): Number of basis functions. Defaults to 10.
+            degree (int, optional): Degree of the splines. Defaults to 3.
+        """
+
+        self.low, self.high = float(values.min()), float(values.max())
+        num_inner = max(num_basis - degree - 1, 0)
+        inner = np.quantile(values, np.linspace(0, 1, num_inner + 2)[1:-1])
+        self.knots = np.concatenate([np.full(degree + 1, self.low), inner, np.full(degree + 1, self.high)])
+        self.degree = degree
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        """ [n, num_basis - 1] basis evaluated on values, clipped to the training range.
+        """
+
+        values = np.clip(values, self.low, self.high)
+        design = BSpline.design_matrix(values, self.knots, self.degree).toarray()
+        return design[:, :-1]
+
+
+class BatchedCAM:
+    def __init__(self, num_basis: int = 10, variablesel: bool = False, pruning: bool = False,
+                 cutoff: float = 0.001, max_num_parents: int = None, ridge: float = 1e-8,
+                 sel_at_least: float = 0.02, sel_at_most: int = 10, boosting_steps: int = 100,
+                 boosting_nu: float = 0.1):
+        """ CAM engine with batched candidate fits and cached score gains.
+
+        Args:
+            num_basis (int, optional): Number of spline basis functions per parent. Defaults to 10.
+            variablesel (bool, optional): Restrict the candidate parents by PNS. Defaults to False.
+            pruning (bool, optional): Prune the edges of the greedy DAG. Defaults to False.
+            cutoff (float, optional): p-value threshold of pruning. Defaults to 0.001.
+            max_num_parents (int, optional): Maximum number of parents per node. Defaults to None,
+                which uses min(d - 1, round(n / 20)) as cam_with_score.R.
+            ridge (float, optional): Ridge penalty of the spline regressions. Defaults to 1e-8.
+            sel_at_least (float, optional): Minimum selection frequency of a PNS candidate.
+                Defaults to 0.02.
+            sel_at_most (int, optional): Maximum number of PNS candidates per node. Defaults to 10.
+            boosting_steps (int, optional): Number of boosting steps of PNS. Defaults to 100.
+            boosting_nu (float, optional): Step size of the boosting of PNS. Defaults to 0.1.
+        """
+
+        self.num_basis = num_basis
+        self.variablesel = variablesel
+        self.pruning = pruning
+        self.cutoff = cutoff
+        self.max_num_parents = max_num_parents
+        self.ridge = ridge
+        self.sel_at_least = sel_at_least
+        self.sel_at_most = sel_at_most
+        self.boosting_steps = boosting_steps
+        self.boosting_nu = boosting_nu
+
+    def get_score(self, train_data, valid_data, train_mask=None, valid_mask=None):
+        """ Apply CAM on data and return the DAG with its training and validation score, with the
+        interface of CAM_with_score.get_score.
+
+        Args:
+            train_data (pandas.DataFrame): Training samples.
+            valid_data (pandas.DataFrame): Validation samples.
+            train_mask (pandas.DataFrame, optional): 1 where a variable is observed, 0 where it
+                is intervened on. Defaults to None, i.e., observational data.
+            valid_mask (pandas.DataFrame, optional): Mask of the validation samples. Defaults to None.
+
+        Returns:
+            networkx.DiGraph, float, float: DAG, training score and validation score.
+        """
+
+        adj_mat, train_score, val_score = self.fit(train_data.values, valid_data.values,
+                                                   None if train_mask is None else train_mask.values,
+                                                   None if valid_mask is None else valid_mask.values)
+        return nx.relabel_nodes(nx.DiGraph(adj_mat), {idx: i for idx, i in enumerate(train_data.columns)}), \
+            train_score, val_score
+
+    def fit(self, X: np.ndarray, X_val: np.ndarray = None, mask: np.ndarray = None,
+            mask_val: np.ndarray = None) -> Tuple[np.ndarray, float, float]:
+        """ Greedy edge additions, optionally after variable selection and followed by pruning.
+
+        Args:
+            X (np.ndarray): [n, d] training samples.
+            X_val (np.ndarray, optional): [n_val, d] validation samples. Defaults to None.
+            mask (np.ndarray, optional): [n, d] 1 where a variable is observed. Defaults to None.
+            mask_val (np.ndarray, optional): [n_val, d] mask of the validation samples. Defaults to None.
+
+        Returns:
+            Tuple[np.ndarray, float, float]: Adjacency matrix, training and validation score
+                (None without validation samples).
+        """
+
+        X = np.asarray(X, dtype=float)
+        n, d = X.shape
+        max_num_parents = self.max_num_parents if self.max_num_parents is not None \
+            else min(d - 1, int(round(n / 20)))
+
+        self.bases = [SplineBasis(X[:, v], self.num_basis) for v in range(d)]
+        self.design = [basis(X[:, v]) for v, basis in enumerate(self.bases)]
+        self.rows = [np.flatnonzero(mask[:, v] != 0) if mask is not None else np.arange(n) for v in range(d)]
+
+        allowed = self.select_candidates(X) if self.variablesel else ~np.eye(d, dtype=bool)
+
+        adj_mat = np.zeros((d, d), dtype=bool)
+        path = np.eye(d, dtype=bool)
+        node_scores = np.array([self.node_score(X, v, []) for v in range(d)])
+        gains = np.full((d, d), -np.inf)
+        for v in range(d):
+            gains[:, v] = self.candidate_gains(X, v, [], allowed[:, v]) - node_scores[v]
+
+        while np.isfinite(gains).any():
+            i, j = np.unravel_index(np.argmax(gains), gains.shape)
+            adj_mat[i, j] = True
+            node_scores[j] += gains[i, j]
+
+            # Avoid cycles: block every edge from a descendant of j to an ancestor of i
+            path[np.ix_(path[:, i], path[j, :])] = True
+            allowed &= ~path.T & ~adj_mat
+
+            parents = list(np.flatnonzero(adj_mat[:, j]))
+            if len(parents) < max_num_parents:
+                gains[:, j] = self.candidate_gains(X, j, parents, allowed[:, j]) - node_scores[j]
+            else:
+                gains[:, j] = -np.inf
+            gains[~allowed] = -np.inf
+
+        if self.pruning:
+            adj_mat = self.prune(X, adj_mat)
+
+        train_score = sum(self.node_score(X, v, list(np.flatnonzero(adj_mat[:, v]))) for v in range(d))
+        val_score = None
+        if X_val is not None:
+            X_val = np.asarray(X_val, dtype=float)
+            val_score = sum(self.node_score(X, v, list(np.flatnonzero(adj_mat[:, v])), X_val, mask_val)
+                            for v in range(d))
+
+        return adj_mat.astype(int), float(train_score), val_score
+
+    def centered_design(self, v: int, rows: np.ndarray) -> np.ndarray:
+        design = self.design[v][rows]
+        return design - design.mean(axis=0)
+
+    def parents_span(self, parents: List[int], rows: np.ndarray) -> np.ndarray:
+        """ Orthonormal basis of the centered spline bases of the parents on the given rows.
+        """
+
+        if len(parents) == 0:
+            return np.zeros((len(rows), 0))
+        q, r = np.linalg.qr(np.hstack([self.centered_design(p, rows) for p in parents]))
+        diag = np.abs(np.diag(r))
+        return q[:, diag > 1e-10 * max(diag.max(), 1e-300)]
+
+    def candidate_gains(self, X: np.ndarray, v: int, parents: List[int], candidates: np.ndarray) -> np.ndarray:
+        """ Score of node v with each candidate added to its parents, in one batched solve.
+
+        Args:
+            X (np.ndarray): Training samples.
+            v (int): The node.
+            parents (List[int]): Current parents of v.
+            candidates (np.ndarray): [d] boolean mask of the candidate parents.
+
+        Returns:
+            np.ndarray: [d] scores, -inf for non-candidates.
+        """
+
+        scores = np.full(X.shape[1], -np.inf)
+        candidate_ids = np.flatnonzero(candidates)
+        if candidate_ids.size == 0:
+            return scores
+
+        rows = self.rows[v]
+        span = self.parents_span(parents, rows)
+        y = X[rows, v] - X[rows, v].mean()
+        residual = y - span @ (span.T @ y)
+        rss = residual @ residual
+
+        # Gram matrices of the [n, C, k] candidate bases projected off the span of the parents,
+        # without forming the projected bases. The residual is already orthogonal to the span.
+        bases = np.stack([self.centered_design(c, rows) for c in candidate_ids], axis=1)
+        num_candidates, k = bases.shape[1:]
+        in_span = (span.T @ bases.reshape(len(rows), -1)).reshape(-1, num_candidates, k)
+        grams = np.einsum('nck,ncl->ckl', bases, bases) - np.einsum('rck,rcl->ckl', in_span, in_span)
+        grams += self.ridge * np.eye(k)
+        projections = (residual @ bases.reshape(len(rows), -1)).reshape(num_candidates, k)
+        coefs = np.linalg.solve(grams, projections[..., None])[..., 0]
+        reductions = np.einsum('ck,ck->c', projections, coefs)
+
+        scores[candidate_ids] = -np.log(np.maximum(rss - reductions, 1e-300) / (len(rows) - 1))
+        return scores
+
+    def fit_node(self, X: np.ndarray, v: int, parents: List[int]) -> Tuple[np.ndarray, np.ndarray, float]:
+        """ Coefficients, parent means and intercept of the additive regression of v on its parents.
+        """
+
+        rows = self.rows[v]
+        if len(parents) == 0:
+            return np.zeros(0), np.zeros(0), X[rows, v].mean()
+        design = np.hstack([self.design[p][rows] for p in parents])
+        means = design.mean(axis=0)
+        centered = design - means
+        y = X[rows, v]
+        gram = centered.T @ centered + self.ridge * np.eye(centered.shape[1])
+        coefs = np.linalg.lstsq(gram, centered.T @ (y - y.mean()), rcond=None)[0]
+        return coefs, means, y.mean()
+
+    def node_score(self, X: np.ndarray, v: int, parents: List[int], X_eval: np.ndarray = None,
+                   mask_eval: np.ndarray = None) -> float:
+        """ -log var(residual) of node v given its parents, on the training samples or on the
+        samples of X_eval with the regression fitted on the training samples.
+        """
+
+        coefs, means, intercept = self.fit_node(X, v, parents)
+        if X_eval is None:
+            X_eval, rows = X, self.rows[v]
+        else:
+            rows = np.flatnonzero(mask_eval[:, v] != 0) if mask_eval is not None else np.arange(X_eval.shape[0])
+
+        prediction = np.full(len(rows), intercept)
+        if len(parents) > 0:
+            design = np.hstack([self.bases[p](X_eval[rows, p]) for p in parents])
+            prediction += (design - means) @ coefs
+        return -np.log(np.var(X_eval[rows, v] - prediction, ddof=1))
+
+    def select_candidates(self, X: np.ndarray) -> np.ndarray:
+        """ Preliminary neighbourhood selection: componentwise L2 boosting of every node on the
+        spline bases of all other nodes, keeping the often selected ones.
+
+        Returns:
+            np.ndarray: [d, d] boolean matrix, [i, j] set if i is a possible parent of j.
+        """
+
+        d = X.shape[1]
+        selected = np.zeros((d, d), dtype=bool)
+        for v in range(d):
+            rows = self.rows[v]
+            others = [c for c in range(d) if c != v]
+            # Orthonormal bases make the least-squares fit of a base learner a projection
+            bases = np.stack([np.linalg.qr(self.centered_design(c, rows))[0] for c in others], axis=1)
+            residual = X[rows, v] - X[rows, v].mean()
+
+            counts = np.zeros(len(others))
+            for _ in range(self.boosting_steps):
+                projections = np.einsum('nck,n->ck', bases, residual)
+                best = np.argmax((projections ** 2).sum(axis=1))
+                residual = residual - self.boosting_nu * bases[:, best] @ projections[best]
+                counts[best] += 1
+
+            frequencies = counts / self.boosting_steps
+            keep = frequencies > self.sel_at_least
+            if keep.sum() > self.sel_at_most:
+                keep = frequencies > np.sort(frequencies)[::-1][self.sel_at_most]
+            selected[np.asarray(others)[keep], v] = True
+
+        return selected
+
+    def prune(self, X: np.ndarray, adj_mat: np.ndarray) -> np.ndarray:
+        """ Keep the parents whose spline terms are significant in an F-test against the model
+        without them.
+        """
+
+        pruned = np.zeros_like(adj_mat)
+        for v in range(X.shape[1]):
+            parents = list(np.flatnonzero(adj_mat[:, v]))
+            if len(parents) == 0:
+                continue
+
+            rows = self.rows[v]
+            y = X[rows, v] - X[rows, v].mean()
+            full_span = self.parents_span(parents, rows)
+            full_rss = np.sum((y - full_span @ (full_span.T @ y)) ** 2)
+            df_residual = len(rows) - 1 - full_span.shape[1]
+
+            for parent in parents:
+                span = self.parents_span([p for p in parents if p != parent], rows)
+                rss = np.sum((y - span @ (span.T @ y)) ** 2)
+                df_term = full_span.shape[1] - span.shape[1]
+                if df_term <= 0 or df_residual <= 0:
+                    continue
+                statistic = ((rss - full_rss) / df_term) / (full_rss / df_residual)
+                if f_dist.sf(statistic, df_term, df_residual) < self.cutoff:
+                    pruned[parent, v] = True
+
+        return pruned
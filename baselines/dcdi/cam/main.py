@@ -13,6 +13,7 @@ from dcdi.utils.save import dump
 from dcdi.utils.metrics import edge_errors
 from dcdi.data import DataManagerFile
 from cam import CAM_with_score
+from batched_cam import BatchedCAM
 
 
 def main(opt, metrics_callback, plotting_callback=None):
@@ -36,8 +37,11 @@ def main(opt, metrics_callback, plotting_callback=None):
     test_data_pd = pd.DataFrame(test.detach().cpu().numpy())
 
     # apply CAM
-    obj = CAM_with_score(opt.score, opt.cutoff, opt.variable_sel, opt.sel_method,
-                         opt.pruning, opt.prune_method)
+    if opt.engine == "batched":
+        obj = BatchedCAM(variablesel=opt.variable_sel, pruning=opt.pruning, cutoff=opt.cutoff)
+    else:
+        obj = CAM_with_score(opt.score, opt.cutoff, opt.variable_sel, opt.sel_method,
+                             opt.pruning, opt.prune_method)
     if opt.intervention:
         mask_train_pd = pd.DataFrame(mask_train.detach().cpu().numpy())
         mask_test_pd = pd.DataFrame(mask_test.detach().cpu().numpy())
@@ -105,6 +109,9 @@ if __name__ == "__main__":
     # Pruning
     parser.add_argument('--pruning', action="store_true",
                         help='Perform an initial pruning step')
+
+    parser.add_argument('--engine', type=str, default='r', choices=['r', 'batched'],
+                        help='CAM implementation: the R package or the in-process batched engine')
     opt = parser.parse_args()
     opt.score = 'nonlinear'
     opt.sel_method = 'gamboost'
@@ -17,47 +17,25 @@ COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER I
 OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 """
+import os
+import sys
 import torch
 import numpy as np
-from scipy.linalg import expm
 from .utils.gumbel import gumbel_sigmoid
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+from acyclicity import acyclicity_torch
 
-class TrExpScipy(torch.autograd.Function):
-    """
-    autograd.Function to compute trace of an exponential of a matrix
-    """
 
-    @staticmethod
-    def forward(ctx, input):
-        with torch.no_grad():
-            # send tensor to cpu in numpy format and compute expm using scipy
-            expm_input = expm(input.detach().cpu().numpy())
-            # transform back into a tensor
-            expm_input = torch.as_tensor(expm_input)
-            if input.is_cuda:
-                # expm_input = expm_input.cuda()
-                assert expm_input.is_cuda
-            # save expm_input to use in backward
-            ctx.save_for_backward(expm_input)
-
-            # return the trace
-            return torch.trace(expm_input)
-
-    @staticmethod
-    def backward(ctx, grad_output):
-        with torch.no_grad():
-            expm_input, = ctx.saved_tensors
-            return expm_input.t() * grad_output
-
-
-def compute_dag_constraint(w_adj):
+def compute_dag_constraint(w_adj, method="expm"):
     """
     Compute the DAG constraint of w_adj
     :param np.ndarray w_adj: the weighted adjacency matrix (each entry in [0,1])
+    :param str method: expm, poly or logdet (see baselines/acyclicity.py). The logdet
+    constraint uses s = d, above the spectral radius of any w_adj with entries in [0,1].
     """
     assert (w_adj >= 0).detach().cpu().numpy().all()
-    h = TrExpScipy.apply(w_adj) - w_adj.shape[0]
+    h = acyclicity_torch(w_adj, method, s=w_adj.shape[0])
     return h
 
 
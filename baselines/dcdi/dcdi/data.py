@@ -131,6 +131,7 @@ class DataManagerFile(object):
         self.adjacency = torch.as_tensor(adjacency).type(torch.Tensor)
         if self.dcd:
             assert not self.intervention, "DCD must be used with intervention==False"
+        if self.dcd or self.intervention:
             name_data = f"data_interv{self.i_dataset}.npy"
         else:
             name_data = f"data{self.i_dataset}.npy"
@@ -142,7 +143,6 @@ class DataManagerFile(object):
         # Load intervention masks and regimes
         masks = []
         if self.intervention:
-            name_data = f"data_interv{self.i_dataset}.npy"
             interv_path = os.path.join(self.file_path, f"intervention{self.i_dataset}.csv")
             regimes = np.genfromtxt(os.path.join(self.file_path, f"regime{self.i_dataset}.csv"), delimiter=",")
             regimes = regimes.astype(int)
@@ -212,3 +212,245 @@ class DataManagerFile(object):
             masks = torch.ones_like(samples)
             regimes = None
         return samples, masks, regimes
+
+    def iterate(self, chunk_size=10000):
+        """
+        Iterate over all the examples in chunks, in a fixed order and without random draws
+        :param int chunk_size: number of examples per chunk
+        :return: generator of samples, masks, regimes
+        """
+        for start in range(0, int(self.num_samples), chunk_size):
+            idxs = np.arange(start, min(start + chunk_size, int(self.num_samples)))
+            samples = self.dataset[start: start + chunk_size]
+            if self.intervention:
+                yield samples, self.convert_masks(idxs), self.regimes[idxs]
+            else:
+                yield samples, torch.ones_like(samples), None
+
+
+class MemmapDataManagerFile(object):
+    """
+    A data loader with the interface of DataManagerFile that memory-maps the samples instead of
+    loading them, so that datasets larger than the memory can be used. Masks are kept as packed
+    bits and regimes as an int array, and minibatches are gathered with vectorized indexing.
+    NOTE: the 0-th regime should always be the observational one
+    """
+    def __init__(self, file_path, i_dataset, train_samples=0.8, test_samples=None, train=True,
+                 normalize=False, mean=None, std=None, random_seed=42, intervention=False,
+                 intervention_knowledge="known", dcd=False, regimes_to_ignore=None,
+                 chunk_size=100000):
+        """
+        :param str file_path: Path to the data and the DAG
+        :param int i_dataset: Exemplar to use (usually in [1,10])
+        :param float/int train_samples: default=0.8. If float, specifies the proportion of
+            data used for training and the rest is used for testing. If an integer, specifies
+            the exact number of examples to use for training.
+        :param int test_samples: default=None. Specifies the number of examples to use for testing.
+            The default value uses all examples that are not used for training.
+        :param int random_seed: Random seed to use for data set shuffling and splitting
+        :param boolean intervention: If True, use interventional data with interventional targets
+        :param str intervention_knowledge: Determine if the intervention target are known or unknown
+        :param boolean dcd: If True, use the baseline DCD that use interventional data, but
+            with a loss that doesn't take it into account (intervention should be set to False)
+        :param list regimes_to_ignore: Regimes that are ignored during training
+        :param int chunk_size: Number of rows read at once when parsing masks and normalizing
+        """
+        self.random = np.random.RandomState(random_seed)
+        self.dcd = dcd
+        self.file_path = file_path
+        self.i_dataset = i_dataset
+        self.intervention = intervention
+        self.chunk_size = chunk_size
+        if intervention_knowledge == "known":
+            self.interv_known = True
+        elif intervention_knowledge == "unknown":
+            self.interv_known = False
+        else:
+            raise ValueError("intervention_knowledge should either be 'known' \
+                             or 'unknown'")
+
+        self.data, masks, regimes = self.load_data()
+        self.dim = self.data.shape[1]
+
+        # index of all regimes, even if not used in the regimes_to_ignore case
+        self.all_regimes = np.unique(regimes)
+
+        # Remove some regimes, rows of the file are referred to by index from here on
+        indices = np.arange(self.data.shape[0])
+        if regimes_to_ignore is not None and self.intervention:
+            for regime_to_ignore in regimes_to_ignore:
+                if regime_to_ignore not in self.all_regimes:
+                    raise ValueError(f"Regime {regime_to_ignore} is not in the possible regimes: {self.all_regimes}")
+            indices = indices[~np.isin(regimes, regimes_to_ignore)]
+
+        # Determine train/test partitioning
+        if isinstance(train_samples, float):
+            train_samples = int(indices.shape[0] * train_samples)
+        if test_samples is None:
+            test_samples = indices.shape[0] - train_samples
+        assert train_samples + test_samples <= indices.shape[0], "The number of examples to load must be " + \
+            "smaller than the total size of the dataset"
+
+        # Shuffle and filter examples, with the same random draws as DataManagerFile
+        shuffle_idx = np.arange(indices.shape[0])
+        self.random.shuffle(shuffle_idx)
+        indices = indices[shuffle_idx[: train_samples + test_samples]]
+
+        # Train/test split
+        if train:
+            self.indices = indices[: train_samples]
+        else:
+            self.indices = indices[train_samples: train_samples + test_samples]
+        self.masks = masks[self.indices]
+        self.regimes = regimes[self.indices]
+
+        # Normalize data
+        self.mean, self.std = mean, std
+        self.normalize = normalize
+        if normalize and (self.mean is None or self.std is None):
+            self.mean, self.std = self.compute_mean_std()
+
+        self.num_regimes = np.unique(self.regimes).shape[0]
+        self.num_samples = self.indices.shape[0]
+
+        self.initialize_interv_matrix()
+
+    def load_data(self):
+        """
+        Load the graph, memory-map the data, and load the packed masks and the regimes
+        """
+        # Load the graph
+        adjacency = np.load(os.path.join(self.file_path, f"DAG{self.i_dataset}.npy"))
+        self.adjacency = torch.as_tensor(adjacency).type(torch.Tensor)
+        if self.dcd:
+            assert not self.intervention, "DCD must be used with intervention==False"
+        if self.dcd or self.intervention:
+            name_data = f"data_interv{self.i_dataset}.npy"
+        else:
+            name_data = f"data{self.i_dataset}.npy"
+
+        # Memory-map data
+        self.data_path = os.path.join(self.file_path, name_data)
+        data = np.load(self.data_path, mmap_mode='r')
+        num_samples, dim = data.shape
+
+        # Load intervention masks and regimes
+        if self.intervention:
+            interv_path = os.path.join(self.file_path, f"intervention{self.i_dataset}.csv")
+            regimes = np.loadtxt(os.path.join(self.file_path, f"regime{self.i_dataset}.csv"),
+                                 delimiter=",", ndmin=1).astype(int)
+            masks = self.read_masks(interv_path, num_samples, dim)
+        else:
+            regimes = np.zeros(num_samples, dtype=int)
+            masks = np.packbits(np.ones((num_samples, dim), dtype=bool), axis=1)
+
+        return data, masks, regimes
+
+    def read_masks(self, interv_path, num_samples, dim):
+        """
+        Read the intervention targets of each sample into packed masks
+        :param str interv_path: Path to the csv file with the targets of each sample on a row
+        :param int num_samples: Number of samples
+        :param int dim: Number of variables
+        :return: [num_samples, ceil(dim / 8)] packed bits of the masks, a bit is 0 for an
+            intervened variable
+        """
+        masks = np.empty((num_samples, (dim + 7) // 8), dtype=np.uint8)
+        with open(interv_path, 'r') as f:
+            interventions_csv = csv.reader(f)
+            for start in range(0, num_samples, self.chunk_size):
+                chunk = np.ones((min(self.chunk_size, num_samples - start), dim), dtype=bool)
+                for i, row in zip(range(chunk.shape[0]), interventions_csv):
+                    chunk[i, [int(x) for x in row]] = False
+                masks[start: start + chunk.shape[0]] = np.packbits(chunk, axis=1)
+
+        return masks
+
+    def compute_mean_std(self):
+        """
+        Mean and (unbiased) standard deviation of the samples, accumulated over chunks of rows
+        :return: mean and std of shape [1, dim]
+        """
+        total = np.zeros(self.dim)
+        total_sq = np.zeros(self.dim)
+        for start in range(0, self.indices.shape[0], self.chunk_size):
+            chunk = self.read_rows(self.indices[start: start + self.chunk_size]).astype(np.float64)
+            total += chunk.sum(0)
+            total_sq += (chunk ** 2).sum(0)
+
+        n = self.indices.shape[0]
+        mean = total / n
+        var = (total_sq - n * mean ** 2) / (n - 1)
+        return torch.as_tensor(mean[None]).type(torch.Tensor), \
+            torch.as_tensor(np.sqrt(np.maximum(var, 0))[None]).type(torch.Tensor)
+
+    def read_rows(self, rows):
+        """
+        Read rows of the memory-mapped data, in file order for locality
+        :param np.ndarray rows: indices of the rows in the file
+        :return: the rows as float32, in the given order
+        """
+        order = np.argsort(rows)
+        samples = np.empty((rows.shape[0], self.dim), dtype=np.float32)
+        samples[order] = self.data[rows[order]]
+        return samples
+
+    def initialize_interv_matrix(self):
+        """
+        Generate the intervention matrix I*. It is useful in the unknown case
+        to compare learned target to the ground truth
+        """
+        if self.intervention:
+            regimes = np.sort(np.unique(self.regimes))
+            first_idx = np.array([np.where(self.regimes == regime)[0][0] for regime in regimes])
+            interv_matrix = self.convert_masks(first_idx).numpy().T
+
+            self.gt_interv = 1 - interv_matrix
+        else:
+            self.gt_interv = None
+
+    def convert_masks(self, idxs):
+        """
+        Unpack the masks of some samples
+        :param np.ndarray idxs: indices of the samples
+        :return: masks, 0 for intervened variables and 1 otherwise
+        """
+        masks = np.unpackbits(self.masks[idxs], axis=1, count=self.dim)
+        return torch.as_tensor(masks).type(torch.Tensor)
+
+    def sample(self, batch_size):
+        """
+        Sample without replacement `batch_size` examples from the data and
+        return the corresponding masks and regimes
+        :param int batch_size: number of samples to sample
+        :return: samples, masks, regimes
+        """
+        sample_idxs = self.random.choice(np.arange(int(self.num_samples)), size=(int(batch_size),), replace=False)
+        samples = torch.as_tensor(self.read_rows(self.indices[sample_idxs])).type(torch.Tensor)
+        if self.normalize:
+            samples = (samples - self.mean) / self.std
+        if self.intervention:
+            masks = self.convert_masks(sample_idxs)
+            regimes = self.regimes[sample_idxs]
+        else:
+            masks = torch.ones_like(samples)
+            regimes = None
+        return samples, masks, regimes
+
+    def iterate(self, chunk_size=None):
+        """
+        Iterate over all the examples in chunks, in a fixed order and without random draws, so that
+        a full split is never held in memory
+        :param int chunk_size: number of examples per chunk, defaults to self.chunk_size
+        :return: generator of samples, masks, regimes
+        """
+        chunk_size = self.chunk_size if chunk_size is None else chunk_size
+        for start in range(0, self.num_samples, chunk_size):
+            idxs = np.arange(start, min(start + chunk_size, self.num_samples))
+            samples = torch.as_tensor(self.read_rows(self.indices[idxs])).type(torch.Tensor)
+            if self.normalize:
+                samples = (samples - self.mean) / self.std
+            if self.intervention:
+                yield samples, self.convert_masks(idxs), self.regimes[idxs]
+            else:
+                yield samples, torch.ones_like(samples), None
@@ -26,8 +26,8 @@ import numpy as np
 
 from .models.learnables import LearnableModel_NonLinGaussANM
 from .models.flows import DeepSigmoidalFlowModel
-from .train import train, retrain, compute_loss
-from .data import DataManagerFile
+from .train import train, retrain, compute_loss_full
+from .data import DataManagerFile, MemmapDataManagerFile
 from .utils.save import dump
 
 def _print_metrics(stage, step, metrics, throttle=None):
@@ -91,20 +91,21 @@ def main(opt, metrics_callback=_print_metrics, plotting_callback=None):
         opt.intervention_knowledge = "known"
 
     # create DataManager for training
-    train_data = DataManagerFile(opt.data_path, opt.i_dataset, opt.train_samples, opt.test_samples, train=True,
-                                 normalize=opt.normalize_data,
-                                 random_seed=opt.random_seed,
-                                 intervention=opt.intervention,
-                                 intervention_knowledge=opt.intervention_knowledge,
-                                 dcd=opt.dcd,
-                                 regimes_to_ignore=opt.regimes_to_ignore)
-    test_data = DataManagerFile(opt.data_path, opt.i_dataset, opt.train_samples, opt.test_samples, train=False,
-                                normalize=opt.normalize_data, mean=train_data.mean, std=train_data.std,
-                                random_seed=opt.random_seed,
-                                intervention=opt.intervention,
-                                intervention_knowledge=opt.intervention_knowledge,
-                                dcd=opt.dcd,
-                                regimes_to_ignore=opt.regimes_to_ignore)
+    data_manager = MemmapDataManagerFile if opt.memmap_data else DataManagerFile
+    train_data = data_manager(opt.data_path, opt.i_dataset, opt.train_samples, opt.test_samples, train=True,
+                              normalize=opt.normalize_data,
+                              random_seed=opt.random_seed,
+                              intervention=opt.intervention,
+                              intervention_knowledge=opt.intervention_knowledge,
+                              dcd=opt.dcd,
+                              regimes_to_ignore=opt.regimes_to_ignore)
+    test_data = data_manager(opt.data_path, opt.i_dataset, opt.train_samples, opt.test_samples, train=False,
+                             normalize=opt.normalize_data, mean=train_data.mean, std=train_data.std,
+                             random_seed=opt.random_seed,
+                             intervention=opt.intervention,
+                             intervention_knowledge=opt.intervention_knowledge,
+                             dcd=opt.dcd,
+                             regimes_to_ignore=opt.regimes_to_ignore)
 
     # create learning model and ground truth model
     if opt.model == "DCDI-G":
@@ -151,34 +152,31 @@ def main(opt, metrics_callback=_print_metrics, plotting_callback=None):
 
         # take all data, but ignore data on which we trained (want to test on unseen regime)
         regimes_to_ignore = np.setdiff1d(all_regimes, np.array(opt.regimes_to_ignore))
-        new_data = DataManagerFile(opt.data_path, opt.i_dataset, 1., None, train=True,
-                                   normalize=opt.normalize_data,
-                                   random_seed=opt.random_seed,
-                                   intervention=opt.intervention,
-                                   intervention_knowledge=opt.intervention_knowledge,
-                                   dcd=opt.dcd,
-                                   regimes_to_ignore=regimes_to_ignore)
+        new_data = data_manager(opt.data_path, opt.i_dataset, 1., None, train=True,
+                                normalize=opt.normalize_data,
+                                random_seed=opt.random_seed,
+                                intervention=opt.intervention,
+                                intervention_knowledge=opt.intervention_knowledge,
+                                dcd=opt.dcd,
+                                regimes_to_ignore=regimes_to_ignore)
 
         with torch.no_grad():
             weights, biases, extra_params = best_model.get_parameters(mode="wbx")
 
             # evaluate on train
-            x, masks, regimes = train_data.sample(train_data.num_samples)
-            loss_train, mean_std_train = compute_loss(x, masks, regimes, best_model, weights, biases, extra_params,
-                                                  intervention=True, intervention_type='structural',
-                                                  intervention_knowledge="known", mean_std=True)
+            loss_train, mean_std_train = compute_loss_full(train_data, best_model, weights, biases, extra_params,
+                                                           intervention=True, intervention_type='structural',
+                                                           intervention_knowledge="known", mean_std=True)
 
             # evaluate on valid
-            x, masks, regimes = test_data.sample(test_data.num_samples)
-            loss_test, mean_std_test = compute_loss(x, masks, regimes, best_model, weights, biases, extra_params,
-                                                    intervention=True, intervention_type='structural',
-                                                    intervention_knowledge="known", mean_std=True)
+            loss_test, mean_std_test = compute_loss_full(test_data, best_model, weights, biases, extra_params,
+                                                         intervention=True, intervention_type='structural',
+                                                         intervention_knowledge="known", mean_std=True)
 
             # evaluate on new intervention
-            x, masks, regimes = new_data.sample(new_data.num_samples)
-            loss_new, mean_std_new = compute_loss(x, masks, regimes, best_model, weights, biases, extra_params,
-                                                  intervention=True, intervention_type='structural',
-                                                  intervention_knowledge="known", mean_std=True)
+            loss_new, mean_std_new = compute_loss_full(new_data, best_model, weights, biases, extra_params,
+                                                       intervention=True, intervention_type='structural',
+                                                       intervention_knowledge="known", mean_std=True)
 
             # logging final result
             metrics_callback(stage="test_on_new_regimes", step=0,
@@ -59,6 +59,42 @@ def compute_loss(x, mask, regime, model, weights, biases, extra_params, interven
         return loss, torch.sqrt(torch.var(joint_log_likelihood) / joint_log_likelihood.size(0))
 
 
+@torch.no_grad()
+def compute_loss_full(data, model, weights, biases, extra_params, intervention,
+                      intervention_type, intervention_knowledge, mean_std=False, chunk_size=10000):
+    """
+    Compute the loss of compute_loss over all the examples of a data manager, accumulated over
+    chunks of examples so that the full split is never loaded at once.
+    """
+    dim = data.dim
+    total, num_samples = torch.zeros(dim), 0
+    mask_sum, mask_outer = torch.zeros(dim), torch.zeros(dim, dim)
+    for x, mask, regime in data.iterate(chunk_size):
+        if intervention and intervention_type == "perfect" and intervention_knowledge == "known":
+            log_likelihood = model.compute_log_likelihood(x, weights, biases, extra_params) * mask
+        else:
+            log_likelihood = model.compute_log_likelihood(x, weights, biases,
+                                                          extra_params, mask=mask,
+                                                          regime=regime)
+        total += torch.sum(log_likelihood, dim=0)
+        num_samples += mask.size(0)
+        if mean_std:
+            mask_sum += torch.sum(mask, dim=0)
+            mask_outer += mask.t() @ mask
+
+    log_likelihood = total / num_samples
+    loss = - torch.mean(log_likelihood)
+
+    if not mean_std:
+        return loss
+    else:
+        # variance over the examples of mean(log_likelihood * mask[i]), from the sums of the masks
+        joint_sum = log_likelihood @ mask_sum / dim
+        joint_sq_sum = log_likelihood @ mask_outer @ log_likelihood / dim ** 2
+        joint_var = (joint_sq_sum - joint_sum ** 2 / num_samples) / (num_samples - 1)
+        return loss, torch.sqrt(torch.clamp(joint_var, min=0) / num_samples)
+
+
 def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_callback, plotting_callback):
     """
     Applying augmented Lagrangian to solve the continuous constrained problem.
@@ -118,7 +154,7 @@ def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_ca
     # compute constraint normalization
     with torch.no_grad():
         full_adjacency = torch.ones((model.num_vars, model.num_vars)) - torch.eye(model.num_vars)
-        constraint_normalization = compute_dag_constraint(full_adjacency).item()
+        constraint_normalization = compute_dag_constraint(full_adjacency, opt.acyclicity).item()
 
     # Learning loop:
     for iter in range(opt.num_train_iter):
@@ -136,7 +172,7 @@ def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_ca
 
         # constraint related
         w_adj = model.get_w_adj()
-        h = compute_dag_constraint(w_adj) / constraint_normalization
+        h = compute_dag_constraint(w_adj, opt.acyclicity) / constraint_normalization
         constraint_violation = h.item()
 
         # compute regularizer
@@ -177,11 +213,10 @@ def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_ca
         # compute loss on whole validation set
         if iter % opt.stop_crit_win == 0:
             with torch.no_grad():
-                x, mask, regime = test_data.sample(test_data.num_samples)
-                loss_val = compute_loss(x, mask, regime, model, weights, biases,
-                                        extra_params, opt.intervention,
-                                        opt.intervention_type,
-                                        opt.intervention_knowledge).item()
+                loss_val = compute_loss_full(test_data, model, weights, biases,
+                                             extra_params, opt.intervention,
+                                             opt.intervention_type,
+                                             opt.intervention_knowledge).item()
 
                 nlls_val.append(loss_val)
                 aug_lagrangians_val.append([iter, loss_val + not_nlls[-1]])
@@ -301,11 +336,10 @@ def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_ca
                     # compute loss on whole validation set
                     # and then aug lagrangian
                     with torch.no_grad():
-                        x, mask, regime = test_data.sample(test_data.num_samples)
-                        loss_val = compute_loss(x, mask, regime, model, weights, biases,
-                                                extra_params, opt.intervention,
-                                                opt.intervention_type,
-                                                opt.intervention_knowledge).item()
+                        loss_val = compute_loss_full(test_data, model, weights, biases,
+                                                     extra_params, opt.intervention,
+                                                     opt.intervention_type,
+                                                     opt.intervention_knowledge).item()
                     aug_lagrangian_val = loss_val + not_nlls[-1]
 
                     if aug_lagrangian_val < best_lagrangian_val:
@@ -336,11 +370,10 @@ def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_ca
                 if iter % 1000 == 0:
                     # compute loss on whole validation set
                     with torch.no_grad():
-                        x, mask, regime = test_data.sample(test_data.num_samples)
-                        loss_val = compute_loss(x, mask, regime, model, weights, biases,
-                                                extra_params, opt.intervention,
-                                                opt.intervention_type,
-                                                opt.intervention_knowledge).item()
+                        loss_val = compute_loss_full(test_data, model, weights, biases,
+                                                     extra_params, opt.intervention,
+                                                     opt.intervention_type,
+                                                     opt.intervention_knowledge).item()
 
                     # nll_val the best?
                     if loss_val < best_nll_val:
@@ -358,18 +391,16 @@ def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_ca
 
                 # compute nll on train and validation set
                 weights, biases, extra_params = model.get_parameters(mode="wbx")
-                x, mask, regime = train_data.sample(train_data.num_samples)
                 # Since we do not have a DAG yet, this is not really a negative log likelihood.
-                nll_train = compute_loss(x, mask, regime, model, weights, biases,
-                                         extra_params, opt.intervention,
-                                         opt.intervention_type,
-                                         opt.intervention_knowledge)
+                nll_train = compute_loss_full(train_data, model, weights, biases,
+                                              extra_params, opt.intervention,
+                                              opt.intervention_type,
+                                              opt.intervention_knowledge)
 
-                x, mask, regime = test_data.sample(test_data.num_samples)
-                nll_val = compute_loss(x, mask, regime, model, weights, biases,
-                                       extra_params, opt.intervention,
-                                       opt.intervention_type,
-                                       opt.intervention_knowledge)
+                nll_val = compute_loss_full(test_data, model, weights, biases,
+                                            extra_params, opt.intervention,
+                                            opt.intervention_type,
+                                            opt.intervention_knowledge)
 
                 if opt.intervention_knowledge == "unknown":
                     with torch.no_grad():
@@ -430,14 +461,12 @@ def train(model, gt_adjacency, gt_interv, train_data, test_data, opt, metrics_ca
 
                 # save results
                 model.eval()
-                _, mask, regime = train_data.sample(train_data.num_samples)
 
                 # evaluate on validation set
-                x, mask, regime = test_data.sample(test_data.num_samples)
                 weights, biases, extra_params = model.get_parameters(mode="wbx")
-                nll_val = compute_loss(x, mask, regime, model, weights, biases, extra_params,
-                                       opt.intervention, opt.intervention_type,
-                                       opt.intervention_knowledge).item()
+                nll_val = compute_loss_full(test_data, model, weights, biases, extra_params,
+                                            opt.intervention, opt.intervention_type,
+                                            opt.intervention_knowledge).item()
 
                 # Compute SHD and SID metrics
                 pred_adj_ = model.adjacency.detach().cpu().numpy()
@@ -545,11 +574,10 @@ def retrain(model, train_data, test_data, dag_folder, opt, metrics_callback, plo
         # compute loss on whole validation set
         if iter % 1000 == 0:
             with torch.no_grad():
-                x, mask, regime = test_data.sample(test_data.num_samples)
-                nll_val = compute_loss(x, mask, regime, model, weights, biases,
-                                       extra_params, opt.intervention,
-                                       opt.intervention_type,
-                                       opt.intervention_knowledge)
+                nll_val = compute_loss_full(test_data, model, weights, biases,
+                                            extra_params, opt.intervention,
+                                            opt.intervention_type,
+                                            opt.intervention_knowledge)
                 # nll_val = - torch.mean(model.compute_log_likelihood(x, weights, biases, extra_params)).item()
                 nlls_val.append(nll_val)
                 losses_val.append([iter, nll_val + reg.item()])
@@ -8,6 +8,11 @@ import numpy as np
 from pprint import pprint
 import random
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+from lowrank_hsic import hsic_lowrank_suffstat, hsic_lowrank_test
+from lowrank_hsic import hsic_lowrank_invariance_suffstat, hsic_lowrank_invariance_test
 
 def format_to_igsp(data, targets, regimes, intervention_knowledge=False):
     """
@@ -55,7 +60,7 @@ def format_to_igsp(data, targets, regimes, intervention_knowledge=False):
 
 
 def prepare_igsp(obs_samples, iv_samples_list, targets_list,
-                 alpha=1e-3, alpha_inv=1e-3, ci_test="gaussian"):
+                 alpha=1e-3, alpha_inv=1e-3, ci_test="gaussian", rank=100):
 
     # Form sufficient statistics
     if ci_test == "gaussian":
@@ -73,6 +78,14 @@ def prepare_igsp(obs_samples, iv_samples_list, targets_list,
         # Create CI and invariance
         ci_tester = MemoizedCI_Tester(hsic_test, obs_samples, alpha=alpha)
         invariance_tester = MemoizedInvarianceTester(hsic_invariance_test, invariance_suffstat, alpha=alpha_inv)
+    elif ci_test == "hsic_lowrank":
+        contexts = {i:s for i,s in enumerate(iv_samples_list)}
+        ci_suffstat = hsic_lowrank_suffstat(obs_samples, rank=rank)
+        invariance_suffstat = hsic_lowrank_invariance_suffstat(obs_samples, contexts, rank=rank)
+
+        # Create CI and invariance
+        ci_tester = MemoizedCI_Tester(hsic_lowrank_test, ci_suffstat, alpha=alpha)
+        invariance_tester = MemoizedInvarianceTester(hsic_lowrank_invariance_test, invariance_suffstat, alpha=alpha_inv)
     elif ci_test == "kci":
         contexts = {i:s for i,s in enumerate(iv_samples_list)}
         invariance_suffstat = {"obs_samples":obs_samples}
@@ -82,7 +95,7 @@ def prepare_igsp(obs_samples, iv_samples_list, targets_list,
         ci_tester = MemoizedCI_Tester(kci_test, obs_samples, alpha=alpha)
         invariance_tester = MemoizedInvarianceTester(kci_invariance_test, invariance_suffstat, alpha=alpha_inv)
     else:
-        raise ValueError(f"CI test '{ci_test}' does not exist. Choose between: [gaussian, hsic, kci]")
+        raise ValueError(f"CI test '{ci_test}' does not exist. Choose between: [gaussian, hsic, hsic_lowrank, kci]")
     return ci_tester, invariance_tester
 
 
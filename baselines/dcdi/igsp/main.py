@@ -110,7 +110,7 @@ if __name__ == "__main__":
                         help='Threshold for invariance tests')
     parser.add_argument('--ci-test', type=str, default='gaussian',
                         help='Type of conditional independance test to use \
-                        (gaussian, hsic, kci)')
+                        (gaussian, hsic, hsic_lowrank, kci)')
     parser.add_argument('--regimes-to-ignore', nargs="+", type=int,
                         help='When loading data, will remove some regimes from data set')
     opt = parser.parse_args()
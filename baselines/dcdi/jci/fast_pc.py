@@ -0,0 +1,369 @@
+"""
+    File name: fast_pc.py
+    Python Version: 3.8
+    Description: In-process JCI-PC with Gaussian CI tests, following pc.R and pc_function.R.
+
+    All tests read one correlation matrix of the system and context variables. The skeleton is the
+    stable skeleton of pcalg: within a level, the neighbourhoods are fixed at the start of the
+    level, so the removal of an edge only depends on its own tests. The conditioning sets of all
+    edges of a level are therefore tested together, as batched inverses of the correlation
+    submatrices, split over a process pool for large batches. The endpoints of an edge and the
+    conditioning sets of an endpoint are tried in the order of pcalg, so the separating sets, and
+    with them the CPDAG, are the ones of the R implementation.
+"""
+
+import itertools
+
+import numpy as np
+
+from multiprocessing import Pool
+from scipy.stats import norm
+from typing import Dict, FrozenSet, List, Tuple
+
+
+""" Correlation matrix and sample size of the pool workers """
+_worker_suffstat = dict()
+
+
+def _init_worker(corr: np.ndarray, num_samples: int):
+    _worker_suffstat['corr'] = corr
+    _worker_suffstat['num_samples'] = num_samples
+
+
+def _worker_pvalues(x: np.ndarray, y: np.ndarray, cond_sets: np.ndarray) -> np.ndarray:
+    return gauss_ci_pvalues(_worker_suffstat['corr'], _worker_suffstat['num_samples'], x, y, cond_sets)
+
+
+def which(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """ Indices of the set entries of a matrix in column-major order, as which(arr.ind = TRUE) of R.
+    """
+
+    cols, rows = np.nonzero(mask.T)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def gauss_ci_pvalues(corr: np.ndarray, num_samples: int, x: np.ndarray, y: np.ndarray,
+                     cond_sets: np.ndarray) -> np.ndarray:
+    """ p-values of gaussCItest for a batch of tests with conditioning sets of the same size.
+
+    Args:
+        corr (np.ndarray): [p, p] correlation matrix.
+        num_samples (int): Number of samples.
+        x (np.ndarray): [B] first variables.
+        y (np.ndarray): [B] second variables.
+        cond_sets (np.ndarray): [B, k] conditioning sets.
+
+    Returns:
+        np.ndarray: [B] p-values of the Fisher z-test of the partial correlations.
+    """
+
+    order = cond_sets.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if order == 0:
+            pcor = corr[x, y]
+        elif order == 1:
+            k = cond_sets[:, 0]
+            pcor = (corr[x, y] - corr[x, k] * corr[y, k]) / np.sqrt((1 - corr[y, k] ** 2) * (1 - corr[x, k] ** 2))
+        else:
+            idx = np.concatenate([x[:, None], y[:, None], cond_sets], axis=1)
+            sub = corr[idx[:, :, None], idx[:, None, :]]
+            try:
+                precision = np.linalg.inv(sub)
+            except np.linalg.LinAlgError:
+                precision = np.linalg.pinv(sub)
+            pcor = -precision[:, 0, 1] / np.sqrt(precision[:, 0, 0] * precision[:, 1, 1])
+
+        pcor = np.clip(np.nan_to_num(pcor, nan=0.0), -0.9999999, 0.9999999)
+        z = np.sqrt(num_samples - order - 3) * 0.5 * np.log1p(2 * pcor / (1 - pcor))
+    return 2 * norm.sf(np.abs(np.nan_to_num(z, nan=0.0)))
+
+
+class FastPC:
+    def __init__(self, num_workers: int = 1, batch_size: int = 256, min_parallel_tests: int = 4096):
+        """ JCI-PC with batched Gaussian CI tests.
+
+        Args:
+            num_workers (int, optional): Number of processes computing the tests of a level.
+                Defaults to 1.
+            batch_size (int, optional): Number of conditioning sets per endpoint that are tested
+                before checking for a separating set. Defaults to 256.
+            min_parallel_tests (int, optional): Smallest batch that is split over the pool.
+                Defaults to 4096.
+        """
+
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.min_parallel_tests = min_parallel_tests
+        self.__pool = None
+
+    def _run_pc(self, data, fixedGaps=None, regimes=None, alpha=None, indep_test="gaussCItest",
+                known=False, targets=None, verbose=True):
+        """ Run JCI-PC with the interface of PC._run_pc.
+
+        Returns:
+            np.ndarray: Adjacency matrix of a DAG in the estimated CPDAG, over the system variables
+                followed by the context variables.
+        """
+
+        if indep_test != "gaussCItest":
+            raise ValueError(f"FastPC only implements gaussCItest, not {indep_test}.")
+        if fixedGaps is not None:
+            raise ValueError("FastPC does not support fixed gaps.")
+
+        cpdag = self.run(data.values, None if regimes is None else regimes.values.ravel(), alpha, known)
+        dag, _ = self.pdag2dag(cpdag)
+        return dag
+
+    def run(self, data: np.ndarray, regimes: np.ndarray or None, alpha: float, known: bool = False) -> np.ndarray:
+        """ CPDAG over the system variables and one context variable per interventional regime.
+
+        Args:
+            data (np.ndarray): [n, d] samples of the system variables.
+            regimes (np.ndarray or None): [n] regime of each sample, 0 for observational samples.
+            alpha (float): Significance level of the CI tests.
+            known (bool, optional): The intervention targets are known. Defaults to False.
+
+        Returns:
+            np.ndarray: [p, p] adjacency matrix of the CPDAG, with [i, j] = [j, i] = 1 for undirected edges.
+        """
+
+        num_samples, d = data.shape
+        num_regimes = int(regimes.max()) if regimes is not None else 0
+        context = np.zeros((num_samples, num_regimes))
+        if num_regimes > 0:
+            interventional = regimes != 0
+            context[np.flatnonzero(interventional), regimes[interventional].astype(int) - 1] = 1
+        dataset = np.concatenate([data, context], axis=1)
+        system_vars, context_vars = np.arange(d), np.arange(d, d + num_regimes)
+
+        p = dataset.shape[1]
+        fixed_gaps = np.zeros((p, p), dtype=bool)
+        fixed_edges = np.zeros((p, p), dtype=bool)
+        fixed_gaps[np.ix_(context_vars, context_vars)] = True
+        fixed_edges[np.ix_(context_vars, context_vars)] = True
+        if known:
+            for a, b in [(system_vars, context_vars), (context_vars, system_vars)]:
+                fixed_gaps[np.ix_(a, b)] = True
+                fixed_edges[np.ix_(a, b)] = True
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.corrcoef(dataset, rowvar=False)
+
+        skeleton, sepsets = self.skeleton(corr, num_samples, alpha, fixed_gaps, fixed_edges)
+
+        # Orient the edges between context and system variables as pc_modified
+        g = skeleton.astype(int)
+        g[np.ix_(system_vars, context_vars)] = 0
+        g[np.ix_(context_vars, context_vars)] = 1
+        g[context_vars, context_vars] = 0
+        if known:
+            g[np.ix_(context_vars, system_vars)] = 0
+            g[context_vars, system_vars[:len(context_vars)]] = 1
+
+        return self.udag2pdag_relaxed(g, sepsets, set(context_vars.tolist()))
+
+    def pvalues(self, corr: np.ndarray, num_samples: int, x: np.ndarray, y: np.ndarray,
+                cond_sets: np.ndarray) -> np.ndarray:
+        """ p-values of a batch of tests, split over the pool if it is large.
+        """
+
+        if self.__pool is None or len(x) < self.min_parallel_tests:
+            return gauss_ci_pvalues(corr, num_samples, x, y, cond_sets)
+
+        chunks = np.array_split(np.arange(len(x)), self.num_workers)
+        return np.concatenate(self.__pool.starmap(_worker_pvalues, [(x[c], y[c], cond_sets[c]) for c in chunks]))
+
+    def find_separating_sets(self, corr: np.ndarray, num_samples: int, alpha: float, order: int,
+                             sides: List[Tuple[int, int, List[int]]]) -> List[Tuple[int, ...] or None]:
+        """ For every endpoint x of an edge x - y, the first conditioning set of the given size among
+        its neighbours, in the order of pcalg's getNextSet, that makes x and y independent.
+
+        Args:
+            sides (List[Tuple[int, int, List[int]]]): x, y and the neighbours of x without y.
+
+        Returns:
+            List[Tuple[int, ...] or None]: Separating set of every endpoint, None if there is none.
+        """
+
+        subsets = [itertools.combinations(nbrs, order) for _, _, nbrs in sides]
+        separating: List[Tuple[int, ...] or None] = [None] * len(sides)
+        pending = list(range(len(sides)))
+
+        while pending:
+            x, y, cond_sets, owners = list(), list(), list(), list()
+            for side in pending:
+                chunk = list(itertools.islice(subsets[side], self.batch_size))
+                x += [sides[side][0]] * len(chunk)
+                y += [sides[side][1]] * len(chunk)
+                cond_sets += chunk
+                owners.append((side, len(chunk)))
+            if not cond_sets:
+                break
+
+            pvals = self.pvalues(corr, num_samples, np.asarray(x), np.asarray(y),
+                                 np.asarray(cond_sets, dtype=int).reshape(len(cond_sets), order))
+
+            next_pending, start = list(), 0
+            for side, length in owners:
+                independent = np.flatnonzero(pvals[start: start + length] >= alpha)
+                if independent.size > 0:
+                    separating[side] = tuple(cond_sets[start + independent[0]])
+                elif length == self.batch_size:
+                    next_pending.append(side)
+                start += length
+            pending = next_pending
+
+        return separating
+
+    def skeleton(self, corr: np.ndarray, num_samples: int, alpha: float, fixed_gaps: np.ndarray,
+                 fixed_edges: np.ndarray) -> Tuple[np.ndarray, Dict[FrozenSet[int], set]]:
+        """ Stable PC skeleton of pcalg with separating sets.
+
+        Returns:
+            Tuple[np.ndarray, Dict[FrozenSet[int], set]]: Boolean adjacency matrix of the skeleton
+                and the separating set of every removed edge.
+        """
+
+        p = corr.shape[0]
+        G = ~fixed_gaps
+        np.fill_diagonal(G, False)
+        sepsets: Dict[FrozenSet[int], set] = dict()
+
+        if self.num_workers > 1:
+            self.__pool = Pool(processes=self.num_workers, initializer=_init_worker, initargs=(corr, num_samples))
+
+        try:
+            order, done = 0, False
+            while not done and G.any():
+                done = True
+                level_adj = G.copy()
+
+                # The first and the second endpoint of every edge in the iteration order of pcalg,
+                # which stably sorts the column-major edge list by the first endpoint
+                first_sides, second_sides, seen = list(), list(), set()
+                for x, y in sorted(which(level_adj), key=lambda pair: pair[0]):
+                    if fixed_edges[y, x]:
+                        continue
+                    edge = frozenset((x, y))
+                    (second_sides if edge in seen else first_sides).append((x, y))
+                    seen.add(edge)
+
+                for sides in (first_sides, second_sides):
+                    tested = list()
+                    for x, y in sides:
+                        if not G[y, x]:
+                            continue
+                        nbrs = [v for v in np.flatnonzero(level_adj[:, x]) if v != y]
+                        if len(nbrs) >= order:
+                            if len(nbrs) > order:
+                                done = False
+                            tested.append((x, y, nbrs))
+
+                    separating = self.find_separating_sets(corr, num_samples, alpha, order, tested)
+                    for (x, y, _), sepset in zip(tested, separating):
+                        if sepset is not None:
+                            G[x, y] = G[y, x] = False
+                            sepsets[frozenset((x, y))] = set(sepset)
+
+                order += 1
+        finally:
+            if self.__pool is not None:
+                self.__pool.close()
+                self.__pool.join()
+                self.__pool = None
+
+        return G, sepsets
+
+    @staticmethod
+    def udag2pdag_relaxed(g: np.ndarray, sepsets: Dict[FrozenSet[int], set], context_vars: set) -> np.ndarray:
+        """ Orient colliders, where a context variable is never a collider, and apply the rules
+        1-3 of Meek as udag2pdagRelaxed of pc_function.R without conflict solving.
+        """
+
+        pdag = g.copy()
+        if g.sum() == 0:
+            return pdag
+
+        for x, y in which(g == 1):
+            for z in np.flatnonzero(g[y, :] == 1):
+                if z == x:
+                    continue
+                if g[x, z] == 0 and y not in sepsets.get(frozenset((x, z)), set()):
+                    if y not in context_vars:
+                        pdag[x, y] = pdag[z, y] = 1
+                        pdag[y, x] = pdag[y, z] = 0
+                    else:
+                        if x not in context_vars:
+                            pdag[y, x], pdag[x, y] = 1, 0
+                        if z not in context_vars:
+                            pdag[y, z], pdag[z, y] = 1, 0
+
+        def rule1(pdag):
+            search = pdag.copy()
+            for a, b in which((pdag == 1) & (pdag.T == 0)):
+                for c in np.flatnonzero((search[b, :] == 1) & (search[:, b] == 1) &
+                                        (search[a, :] == 0) & (search[:, a] == 0)):
+                    pdag[b, c], pdag[c, b] = 1, 0
+                search = pdag.copy()
+            return pdag
+
+        def rule2(pdag):
+            search = pdag.copy()
+            for a, b in which((search == 1) & (search.T == 1)):
+                if np.any((search[a, :] == 1) & (search[:, a] == 0) & (search[:, b] == 1) & (search[b, :] == 0)):
+                    pdag[a, b], pdag[b, a] = 1, 0
+                search = pdag.copy()
+            return pdag
+
+        def rule3(pdag):
+            search = pdag.copy()
+            for a, b in which((search == 1) & (search.T == 1)):
+                c = np.flatnonzero((search[a, :] == 1) & (search[:, a] == 1) & (search[:, b] == 1) & (search[b, :] == 0))
+                for c1, c2 in itertools.combinations(c, 2):
+                    if search[c1, c2] == 0 and search[c2, c1] == 0:
+                        pdag[a, b], pdag[b, a] = 1, 0
+                        search = pdag.copy()
+                        break
+            return pdag
+
+        while True:
+            old_pdag = pdag.copy()
+            pdag = rule3(rule2(rule1(pdag)))
+            if (pdag == old_pdag).all():
+                return pdag
+
+    @staticmethod
+    def pdag2dag(pdag: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """ Consistent extension of a PDAG to a DAG by repeatedly removing sinks, as pdag2dag of pcalg.
+
+        Returns:
+            Tuple[np.ndarray, bool]: Adjacency matrix of the DAG and whether the extension succeeded.
+                Without success, the remaining undirected edges follow the node order.
+        """
+
+        dag = pdag.copy()
+        remaining = list(range(pdag.shape[0]))
+        success = True
+        while len(remaining) > 0:
+            sub = pdag[np.ix_(remaining, remaining)]
+            undirected = (sub == 1) & (sub.T == 1)
+            directed_out = ((sub == 1) & ~undirected).sum(axis=1)
+
+            removed = False
+            for x in np.flatnonzero(directed_out == 0):
+                nbrs = np.flatnonzero((sub[x, :] == 1) | (sub[:, x] == 1))
+                if all(set(nbrs) - {y} <= set(np.flatnonzero((sub[y, :] == 1) | (sub[:, y] == 1))) - {x}
+                       for y in np.flatnonzero(undirected[x])):
+                    real_x = remaining[x]
+                    for y in np.flatnonzero(undirected[x]):
+                        dag[remaining[y], real_x], dag[real_x, remaining[y]] = 1, 0
+                    remaining.pop(x)
+                    removed = True
+                    break
+
+            if not removed:
+                success = False
+                dag = np.triu(np.maximum(pdag, pdag.T), k=1)
+                break
+
+        return dag, success
@@ -13,6 +13,7 @@ from dcdi.utils.save import dump
 from dcdi.utils.metrics import edge_errors
 from dcdi.data import DataManagerFile
 from pc import PC
+from fast_pc import FastPC
 
 
 def main(opt, metrics_callback=None, plotting_callback=None, verbose=False):
@@ -28,7 +29,10 @@ def main(opt, metrics_callback=None, plotting_callback=None, verbose=False):
     train_data_pd = pd.DataFrame(train_data.dataset.detach().cpu().numpy())
     regimes_pd = pd.DataFrame(train_data.regimes)
 
-    obj = PC()
+    if opt.engine == "native":
+        obj = FastPC(num_workers=opt.num_workers)
+    else:
+        obj = PC()
     targets = None
     if opt.knowledge == "known":
         known = True
@@ -93,6 +97,10 @@ if __name__ == "__main__":
                         help='When loading data, will remove some regimes from data set')
     parser.add_argument('--knowledge', type=str, default="unknown",
                         help='Are intervention targets known or unknown?')
+    parser.add_argument('--engine', type=str, default='r', choices=['r', 'native'],
+                        help='PC implementation: the R script or the in-process engine (gaussCItest only)')
+    parser.add_argument('--num-workers', type=int, default=1,
+                        help='Processes computing the CI tests of a level with the native engine')
 
     opt = parser.parse_args()
 
@@ -63,6 +63,8 @@ if __name__ == "__main__":
                         help='(x - mu) / std')
     parser.add_argument('--regimes-to-ignore', nargs="+", type=int,
                         help='When loading data, will remove some regimes from data set')
+    parser.add_argument('--memmap-data', action="store_true",
+                        help='Memory-map the data instead of loading it, for datasets larger than memory')
     parser.add_argument('--test-on-new-regimes', action="store_true",
                         help='When using --regimes-to-ignore, we evaluate performance on new regimes never seen during'
                              ' training (use after retraining).')
@@ -122,6 +124,9 @@ if __name__ == "__main__":
                         help='initial value of gamma')
     parser.add_argument('--h-threshold', type=float, default=1e-8,
                         help='Stop when |h|<X. Zero means stop AL procedure only when h==0')
+    parser.add_argument('--acyclicity', type=str, default="expm", choices=["expm", "poly", "logdet"],
+                        help='acyclicity constraint, trace of the matrix exponential, of the matrix polynomial '
+                             'or log-determinant (see baselines/acyclicity.py)')
 
     # misc
     parser.add_argument('--patience', type=int, default=10,
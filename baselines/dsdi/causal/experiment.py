@@ -64,7 +64,8 @@ class ExperimentBase(nauka.exp.Experiment):
         nauka.utils.numpy.random.set_state    (password)
         nauka.utils.torch.random.manual_seed  (password)
         nauka.utils.torch.cuda.manual_seed_all(password)
-        causal._causal.seed(nauka.utils.pbkdf2int(64, password))
+        if hasattr(causal, "_causal"):
+            causal._causal.seed(nauka.utils.pbkdf2int(64, password))
         return self
 
     def brk(self, it, max=None):
@@ -260,6 +261,31 @@ class Experiment(ExperimentBase):
             self.interval().snapshot().purge()
         return self
 
+    def train(self, gamma_belief=None):
+        """
+        Train from scratch in the calling process, starting from a belief
+        matrix of edge probabilities (default initialization if None).
+
+        Unlike run(), no snapshots are taken, so the same experiment can be
+        trained again, e.g., once per federated round with a new belief.
+        Returns the learned edge probabilities.
+        """
+        self.a.gammaBelief = "default" if gamma_belief is None else np.asarray(gamma_belief)
+        self.fromScratch()
+
+        # Interventions of a limited set belong to the model of the last call
+        self.__dict__.pop("interventions_superlist", None)
+        self.readyDataset()
+        while not self.isDone:
+            self.interval()
+        return self.learned_gamma
+
+    @property
+    def learned_gamma(self):
+        """Edge probabilities, i.e., the sigmoid of gamma, as numpy array."""
+        with torch.no_grad():
+            return self.S.model.gamma.sigmoid().cpu().numpy()
+
     def intervention(self):
         """Select intervention, randomly sampled or from a limited set."""
         if self.a.limit_interventions > 0:
@@ -401,8 +427,8 @@ class Experiment(ExperimentBase):
                             smpiter = self.S.model.sampleiter()
                             cfgiter = self.S.model.configiter()
                             for batch in self.brk(smpiter, max=self.a.predict):
-                                for config in self.brk(cfgiter, max=self.a.predict_cpb):
-                                    accnll -= self.S.model.logprob_nograd(batch, config).mean(1)
+                                configs = torch.stack(list(self.brk(cfgiter, max=self.a.predict_cpb)))
+                                accnll -= self.S.model.logprob_batched(batch, configs).mean(2).sum(0)
                             selnode = torch.argmax(accnll).item()
 
                             if self.a.verbose:
@@ -424,16 +450,14 @@ class Experiment(ExperimentBase):
                         for b, batch in self.brk(enumerate(smpiter), max=self.a.xfer_epi_size):
                             """Access Certain Segment of Dataset"""
                             if b in accessible_indices_interventional:
-                                gammagrad = 0
-                                logregret = 0
-
-                                """Configurations Loop"""
+                                """Configurations, all scored in one call"""
                                 cfgiter = self.S.model.configiter()
-                                for config in self.brk(cfgiter, max=self.a.cpi):
-                                    """Accumulate Gamma Gradient"""
-                                    logpn = self.S.model.logprob_nograd(batch, config, block=intervention)
-                                    gammagrad += gammasigmoid - config
-                                    logregret += logpn.mean(1)
+                                configs = torch.stack(list(self.brk(cfgiter, max=self.a.cpi)))
+
+                                """Accumulate Gamma Gradient"""
+                                logpn     = self.S.model.logprob_batched(batch, configs, block=intervention)
+                                gammagrad = (gammasigmoid - configs).sum(0)
+                                logregret = logpn.mean(2).sum(0)
 
                                 gammagrads.append(gammagrad)
                                 logregrets.append(logregret)
@@ -59,12 +59,17 @@ class CategoricalWorld(World):
         ### Gamma Initiliazation
 
         # CUSTOM --> Load custom probabilistic-belief matrix (specified as argument in .npy file)
-        if self.a.gammaBelief != "default" and os.path.isfile(self.a.gammaBelief):
+        # The belief may also be given directly as an array by an in-process caller
+        if isinstance(self.a.gammaBelief, np.ndarray) or \
+                (self.a.gammaBelief != "default" and os.path.isfile(self.a.gammaBelief)):
 
             # Read predefined belief (in [0,1]) and set gamma using logit function
             torch.nn.init.ones_(self.gamma)
             with torch.no_grad():
-                belief = torch.from_numpy(np.load(self.a.gammaBelief))
+                if isinstance(self.a.gammaBelief, np.ndarray):
+                    belief = torch.from_numpy(self.a.gammaBelief)
+                else:
+                    belief = torch.from_numpy(np.load(self.a.gammaBelief))
                 belief_logit = torch.logit(belief, eps=1e-6)
                 self.gamma.mul_(belief_logit)
 
@@ -417,11 +422,94 @@ class CategoricalWorld(World):
                                           out=s,         alpha=0.1)
                 yield torch.from_numpy(s)
 
-    def logprob_nograd(self, sample, config, block=(), weightset="slow"):
+    def _block_mask(self, block):
         block  = [block] if isinstance(block, int) else list(set(iter(block)))
         mask   = np.zeros((self.M,), dtype=np.float32)
         mask[block] = 1
-        block  = mask
+        return mask
+
+    def _torch_weightset(self, weightset="slow"):
+        if weightset=="slow":
+            return self.W0slow, self.B0slow, self.W1slow, self.B1slow
+        else:
+            return self.W0gt,   self.B0gt,   self.W1gt,   self.B1gt
+
+    def _logprob_torch(self, sample, configs, weightset="slow"):
+        """
+        Pure-PyTorch equivalent of causal._causal.logprob_mlp, evaluated for
+        C configurations at once.
+
+        sample is a (M, bs) tensor of categories and configs a (C, M, M)
+        tensor whose row i selects the parents of variable i. Returns the
+        (C, M, bs) log-probabilities, differentiable w.r.t. the weightset.
+        """
+        W0,B0,W1,B1 = self._torch_weightset(weightset)
+        M, Nm    = self.M, self.Nm
+        N        = torch.from_numpy(self.N.astype(np.int64))
+        Nc       = torch.from_numpy(self.Nc.astype(np.int64))
+        sample   = sample.long()
+
+        # One-hot encoding (bs, Ns) of the sample, masked by the parents of
+        # each variable, selects the additive rows of W0 for the hidden layer.
+        var      = torch.repeat_interleave(torch.arange(M), N)
+        onehot   = (sample + Nc[:,None]).t()
+        onehot   = torch.zeros(onehot.shape[0], self.Ns).scatter_(1, onehot, 1.0)
+        parents  = configs.ne(0).float().index_select(2, var)
+        hidden   = torch.matmul(onehot * parents.unsqueeze(2), W0).add_(B0.unsqueeze(1))
+        hidden   = torch.nn.functional.leaky_relu_(hidden, negative_slope=0.1)
+
+        # Output layer padded to Nm categories for all variables.
+        v        = torch.arange(Nm)
+        valid    = v[None,:] < N[:,None]
+        rows     = Nc[:,None] + torch.min(v[None,:], N[:,None]-1)
+        W1p      = W1[rows]
+        B1p      = B1[rows].masked_fill(~valid, float("-inf"))
+        logits   = torch.einsum("cklh,kvh->cklv", hidden, W1p).add_(B1p.unsqueeze(1))
+        logits   = logits.div_(self.a.temperature).log_softmax(-1)
+        index    = sample.unsqueeze(0).expand(configs.shape[0], M, -1).unsqueeze(-1)
+        return logits.gather(-1, index).squeeze(-1)
+
+    def logprob_batched(self, sample, configs, block=(), weightset="slow", out=None):
+        """
+        Log-probabilities of one minibatch of samples under C configurations
+        in a single call, without gradient.
+
+        sample is a (M, bs) tensor and configs a (C, M, M) tensor. Returns a
+        (C, M, bs) tensor with zeros for the blocked variables. The result is
+        written into out, or into a buffer reused by the next call if out is
+        None. Without the C extension, a PyTorch implementation is used.
+        """
+        C, bs = configs.shape[0], sample.shape[1]
+        if out is None:
+            out = getattr(self, "_logprob_out", None)
+            if out is None or out.shape != (C, self.M, bs):
+                out = self._logprob_out = torch.empty((C, self.M, bs), dtype=torch.float32)
+        block  = torch.from_numpy(1-self._block_mask(block))
+
+        if not hasattr(causal, "_causal"):
+            with torch.no_grad():
+                torch.mul(self._logprob_torch(sample, configs, weightset), block[:,None], out=out)
+            return out
+
+        W0,B0,W1,B1 = (self._np_W0slow, self._np_B0slow, self._np_W1slow, self._np_B1slow) \
+                      if weightset=="slow" else \
+                      (self._np_W0gt,   self._np_B0gt,   self._np_W1gt,   self._np_B1gt)
+        nblock  = np.zeros((self.M,), dtype=np.float32)
+        sample  = sample.contiguous().numpy()
+        configs = configs.contiguous().numpy()
+        logp    = out.numpy()
+        for c in range(C):
+            causal._causal.logprob_mlp(W0, B0, W1, B1, self.N,
+                                       nblock,sample,configs[c],logp[c],
+                                       alpha=0.1,temp=self.a.temperature)
+        return out.mul_(block[:,None])
+
+    def logprob_nograd(self, sample, config, block=(), weightset="slow"):
+        if not hasattr(causal, "_causal"):
+            return self.logprob_batched(sample, config.unsqueeze(0), block, weightset,
+                                        out=torch.empty((1, self.M, sample.shape[1])))[0]
+
+        block  = self._block_mask(block)
 
         sample = sample.numpy()
         config = config.numpy()
@@ -447,10 +535,18 @@ class CategoricalWorld(World):
         return torch.from_numpy(logp*(1-block[:,np.newaxis]))
 
     def logprob_simplegrad(self, sample, config, block=(), weightset="slow"):
-        block  = [block] if isinstance(block, int) else list(set(iter(block)))
-        mask   = np.zeros((self.M,), dtype=np.float32)
-        mask[block] = 1
-        block  = mask
+        if not hasattr(causal, "_causal"):
+            # Accumulate the same gradients as the C extension, i.e. of the
+            # batch mean of the unblocked log-probabilities.
+            block   = torch.from_numpy(1-self._block_mask(block))
+            weights = self._torch_weightset(weightset)
+            logp    = self._logprob_torch(sample, config.unsqueeze(0), weightset)[0]
+            grads   = torch.autograd.grad(logp.mean(1).mul(block).sum(), weights)
+            for w, g in zip(weights, grads):
+                w.grad.add_(g)
+            return logp.detach()*block[:,None]
+
+        block  = self._block_mask(block)
 
         sample = sample.numpy()
         config = config.numpy()
@@ -24,6 +24,7 @@
 # ========================================================================
 
 import os.path
+import sys
 from abc import ABC, abstractmethod
 from typing import List
 
@@ -318,6 +319,11 @@ class DSDIAlg(InferenceAlgorithm):
 
         super().__init__()
 
+        # The in-process DSDI experiment, kept for the next rounds
+        self.__experiment = None
+        self.accessible_percentage: int = 100
+        self.learned_gamma: np.ndarray or None = None
+
     def load_local_dataset(self, accessible_data: List[str] or float,
                            assignment_type: str = 'observation_assignment',
                            dataset_name: str = "sachs", import_from_directory: bool = False):
@@ -328,6 +334,41 @@ class DSDIAlg(InferenceAlgorithm):
 
         pass
 
+    @staticmethod
+    def get_train_arguments(accessible_percentage: int = 100, num_clients: int = 5,
+                            client_id: int = 0, round_id: int = 0,
+                            experiment_id: int = 0, seed: int = 0, num_epochs: int = 50,
+                            dpe: int = 10, train_functional: int = 6000, epi_size: int = 10,
+                            ipd: int = 100, graph: str = 'chain3', store_folder: str = 'default_experiments',
+                            verbose: int = 0, predict: int = 0) -> List[str]:
+        """
+        Arguments of the train command of the DSDI run.py file, without the gamma belief.
+        """
+
+        return ['--seed', f'{seed}',
+                '--num-epochs', f'{num_epochs}',
+                '--dpe', f'{dpe}',
+                '--train_functional', f'{train_functional}',
+                '--accessible-percentage', f'{accessible_percentage}',
+                '--num-clients', f'{num_clients}',
+                '--client-id', f'{client_id}',
+                '--round-id', f'{round_id}',
+                '--experiment-id', f'{experiment_id}',
+                '--store-folder', f'{store_folder}',
+                '--ipd', f'{ipd}',
+                '--xfer-epi-size', f'{epi_size}',
+                '--mopt', 'adam:5e-2,0.9',
+                '--gopt', 'adam:5e-3,0.1',
+                '-v', f'{verbose}',
+                '--lsparse', '0.1',
+                '--bs', '256',
+                '--ldag', '0.5',
+                '--predict', f'{predict}',
+                '--temperature', '1',
+                '--limit-samples', '500',
+                '-N', '2',
+                '-p', f'{graph}']
+
     def infer_causal_structure(self, accessible_percentage: int = 100, num_clients: int = 5,
                                client_id: int = 0, round_id: int = 0,
                                experiment_id: int = 0, seed: int = 0, num_epochs: int = 50,
@@ -345,30 +386,10 @@ class DSDIAlg(InferenceAlgorithm):
 
         logger.info(f'Entering directory {os.getcwd()}')
 
-        execution_command = f'python run.py train ' \
-                            f'--seed {seed} ' \
-                            f'--num-epochs {num_epochs} ' \
-                            f'--dpe {dpe} ' \
-                            f'--train_functional {train_functional} ' \
-                            f'--accessible-percentage {accessible_percentage} ' \
-                            f'--num-clients {num_clients} ' \
-                            f'--client-id {client_id} ' \
-                            f'--round-id {round_id} ' \
-                            f'--experiment-id {experiment_id} ' \
-                            f'--store-folder {store_folder} ' \
-                            f'--ipd {ipd} ' \
-                            f'--xfer-epi-size {epi_size} ' \
-                            f'--mopt adam:5e-2,0.9 ' \
-                            f'--gopt adam:5e-3,0.1 ' \
-                            f'-v {verbose} ' \
-                            f'--lsparse 0.1 ' \
-                            f'--bs 256 ' \
-                            f'--ldag 0.5 ' \
-                            f'--predict {predict} ' \
-                            f'--temperature 1 ' \
-                            f'--limit-samples 500 ' \
-                            f'-N 2 ' \
-                            f'-p {graph} '
+        train_arguments = self.get_train_arguments(accessible_percentage, num_clients, client_id, round_id,
+                                                   experiment_id, seed, num_epochs, dpe, train_functional,
+                                                   epi_size, ipd, graph, store_folder, verbose, predict)
+        execution_command = 'python run.py train ' + ' '.join(train_arguments) + ' '
 
         if gamma_belief is not None:
             execution_command = execution_command + f'--gammaBelief {gamma_belief}'
@@ -379,3 +400,44 @@ class DSDIAlg(InferenceAlgorithm):
             os.system(command=execution_command)
         except ModuleNotFoundError:
             logger.critical('Activate conda environment according to DSDI manual!')
+
+    def train_in_process(self, gamma_belief: np.ndarray or None = None, round_id: int = 0,
+                         **train_kwargs) -> np.ndarray:
+        """
+        Run DSDI in the calling process instead of a system call, starting from a belief matrix
+        of edge probabilities.
+
+        The arguments are parsed and the DSDI experiment is built on the first call only. Later
+        calls, i.e., the next rounds of a persistent worker, train the same experiment from scratch
+        with the new belief, which saves the interpreter startup, imports and argument parsing.
+
+        Args:
+            gamma_belief (np.ndarray or None): Edge probabilities in [0, 1] to start from, None for
+                the default initialization of DSDI. Defaults to None.
+            round_id (int): The current federated round. Defaults to 0.
+            train_kwargs: Remaining arguments of get_train_arguments, only read on the first call.
+
+        Returns:
+            np.ndarray: The learned edge probabilities, also stored in learned_gamma.
+        """
+
+        if self.__experiment is None:
+            dsdi_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            if dsdi_dir not in sys.path:
+                sys.path.append(dsdi_dir)
+
+            try:
+                from run import root
+                from causal.experiment import Experiment
+            except ModuleNotFoundError:
+                logger.critical('Activate conda environment according to DSDI manual!')
+                raise
+
+            train_arguments = self.get_train_arguments(round_id=round_id, **train_kwargs)
+            self.__experiment = Experiment(root.addAllArgs().parse_args(['train'] + train_arguments))
+            self.accessible_percentage = self.__experiment.a.accessible_percentage
+
+        # Results stored by the experiment are named after the round
+        self.__experiment.a.round_id = round_id
+        self.learned_gamma = self.__experiment.train(gamma_belief)
+        return self.learned_gamma
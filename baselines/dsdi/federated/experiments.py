@@ -35,9 +35,9 @@ from logging_settings import logger
 from utils import evaluate_inferred_matrix, resume_dsdi_experiments
 from utils import generate_accessible_percentages
 from utils import save_data_object
-from utils import retrieve_dsdi_stored_data
 from typing import Callable, List
-from multiprocessing import Pool, Process
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
 
 """
 Prerequisites (related to CDT): 
@@ -64,6 +64,36 @@ Prerequisites (related to CDT):
 """
 
 
+def run_dsdi_client(client_id: int, connection: Connection):
+    """
+    Persistent process of a client, hosting its DSDI experiment over all the rounds.
+
+    The process receives (round_id, gamma_belief, train_kwargs) for every round through its end of a
+    pipe and answers with the learned edge probabilities, until it receives None.
+
+    Args:
+        client_id (int): The client hosted by this process.
+        connection (Connection): Client end of the pipe to experiment_dsdi_federated.
+    """
+
+    logger.info(f'Client {client_id} started the process')
+    client_model = DSDIAlg()
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+
+        round_id, gamma_belief, train_kwargs = task
+        try:
+            learned_gamma = client_model.train_in_process(gamma_belief, round_id=round_id, **train_kwargs)
+            connection.send((client_model.accessible_percentage, learned_gamma, client_id))
+        except Exception as e:
+            connection.send(e)
+
+    connection.close()
+
+
 class Experiments:
     """
     Implementation of all the test functions.
@@ -212,87 +242,77 @@ class Experiments:
         accessible_percentages_dict = generate_accessible_percentages(number_of_clients, accessible_segment[0],
                                                                       accessible_segment[1])
 
-        for round_id in range(number_of_rounds):
-            logger.info(f'Initiating round {round_id}')
-
-            # Accessing prior info
-            prior_dir = os.path.join('data', 'priors', f'{store_folder}')
-
-            # LOCAL LEARNING STEP
-            def run_local_learning(c_id, r_id):
-                logger.info(f'Client {c_id} started the process')
-
-                # Build a DSDI model
-                client_model = DSDIAlg()
-
-                # Infer the underlying structure and weights
-                if r_id == 0:
-                    # Clients must compute without a prior belief for the first round
-                    client_model.infer_causal_structure(accessible_percentage=int(accessible_percentages_dict[c_id]),
-                                                        num_clients=number_of_clients,
-                                                        client_id=c_id,
-                                                        round_id=r_id,
-                                                        experiment_id=experiment_id,
-                                                        num_epochs=num_epochs,
-                                                        train_functional=train_functional,
-                                                        epi_size=epi_size,
-                                                        dpe=dpe,
-                                                        ipd=ipd,
-                                                        graph=graph_structure,
-                                                        store_folder=store_folder,
-                                                        seed=seed)
-
-                if r_id != 0:
-                    # Clients must compute with a prior belief after the first round
-                    client_model.infer_causal_structure(accessible_percentage=int(accessible_percentages_dict[c_id]),
-                                                        num_clients=number_of_clients,
-                                                        client_id=c_id,
-                                                        round_id=r_id,
-                                                        experiment_id=experiment_id,
-                                                        num_epochs=num_epochs,
-                                                        train_functional=train_functional,
-                                                        epi_size=epi_size,
-                                                        dpe=dpe,
-                                                        ipd=ipd,
-                                                        gamma_belief=os.path.join(prior_dir, f'prior_info_{experiment_id}.npy'),
-                                                        graph=graph_structure,
-                                                        store_folder=store_folder,
-                                                        seed=seed)
-
-            process_list = list()
-            for client_id in range(1, number_of_clients + 1):
-                process_list.append(Process(target=run_local_learning, args=(client_id, round_id,)))
-                process_list[-1].start()
-
-            for process in process_list:
-                process.join()
-            process_list.clear()
-
-            # AGGREGATION STEP
-            logging.info(f'Calculated matrices:\n')
-            aggregated_adjacency_matrix: np.ndarray = None
-            access_sum: int = 0
-
-            data_dir = os.path.join('work', store_folder)
-            logger.info(f'Stored data directory: {data_dir}')
-
-            for data in retrieve_dsdi_stored_data(data_dir, experiment_id, round_id):
-                print(data)
-
-                if aggregated_adjacency_matrix is None:
-                    aggregated_adjacency_matrix = data[0] * data[1]
-                else:
-                    aggregated_adjacency_matrix += data[0] * data[1]
-
-                access_sum += data[0]
-            print('\n')
-
-            logging.info(f'Voting result: {access_sum}, \n{aggregated_adjacency_matrix}')
-            prior_info: np.ndarray = aggregated_adjacency_matrix / access_sum
-            logging.info(f'Prior matrix: \n{prior_info}')
-
-            os.makedirs(prior_dir, exist_ok=True)
-            save_data_object(prior_info, f'prior_info_{experiment_id}', prior_dir)
+        # Accessing prior info
+        prior_dir = os.path.join('data', 'priors', f'{store_folder}')
+        prior_info: np.ndarray or None = None
+
+        # One process per client stays alive over all rounds and keeps the DSDI experiment of its client
+        clients_connections, clients_processes = dict(), list()
+        for client_id in range(1, number_of_clients + 1):
+            server_end, client_end = Pipe()
+            client_process = Process(target=run_dsdi_client, args=(client_id, client_end))
+            client_process.start()
+            clients_connections[client_id] = server_end
+            clients_processes.append(client_process)
+
+        try:
+            for round_id in range(number_of_rounds):
+                logger.info(f'Initiating round {round_id}')
+
+                # LOCAL LEARNING STEP
+                # Clients compute without a prior belief in the first round, and with the last prior afterwards
+                for client_id in range(1, number_of_clients + 1):
+                    train_kwargs = dict(accessible_percentage=int(accessible_percentages_dict[client_id]),
+                                        num_clients=number_of_clients,
+                                        client_id=client_id,
+                                        experiment_id=experiment_id,
+                                        num_epochs=num_epochs,
+                                        train_functional=train_functional,
+                                        epi_size=epi_size,
+                                        dpe=dpe,
+                                        ipd=ipd,
+                                        graph=graph_structure,
+                                        store_folder=store_folder,
+                                        seed=seed)
+                    clients_connections[client_id].send((round_id, prior_info, train_kwargs))
+
+                clients_results = [clients_connections[client_id].recv()
+                                   for client_id in range(1, number_of_clients + 1)]
+                for result in clients_results:
+                    if isinstance(result, Exception):
+                        raise result
+
+                # AGGREGATION STEP
+                logging.info(f'Calculated matrices:\n')
+                aggregated_adjacency_matrix: np.ndarray = None
+                access_sum: int = 0
+
+                for data in clients_results:
+                    print(data)
+
+                    if aggregated_adjacency_matrix is None:
+                        aggregated_adjacency_matrix = data[0] * data[1]
+                    else:
+                        aggregated_adjacency_matrix += data[0] * data[1]
+
+                    access_sum += data[0]
+                print('\n')
+
+                logging.info(f'Voting result: {access_sum}, \n{aggregated_adjacency_matrix}')
+                prior_info = aggregated_adjacency_matrix / access_sum
+                logging.info(f'Prior matrix: \n{prior_info}')
+
+                os.makedirs(prior_dir, exist_ok=True)
+                save_data_object(prior_info, f'prior_info_{experiment_id}', prior_dir)
+        finally:
+            for client_id, connection in clients_connections.items():
+                try:
+                    connection.send(None)
+                except (BrokenPipeError, OSError):
+                    logger.warning(f'Client {client_id} exited before the end of the experiment')
+                connection.close()
+            for client_process in clients_processes:
+                client_process.join()
 
         logger.info(f'\nEXPERIMENT {experiment_id} CONCLUDED: DSDI Federated \n')
 
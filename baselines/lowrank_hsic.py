@@ -0,0 +1,221 @@
+"""
+    File name: lowrank_hsic.py
+    Python Version: 3.8
+    Description: HSIC conditional independence and invariance tests for IGSP with low-rank
+        kernel approximations.
+
+    The Gaussian kernel of every variable is replaced by n x rank features, either Nystrom features
+    on random landmarks or random Fourier features, so no n x n Gram matrix is formed. The
+    statistic n * HSIC is ||Fx^T Fy||^2 / n for centered features Fx and Fy, and its null
+    distribution is approximated by a gamma distribution matching the mean tr(Cx) tr(Cy) and
+    variance 2 ||Cx||^2 ||Cy||^2 of the spectral null, where Cx = Fx^T Fx / n. Conditional tests
+    first regress the variables on the features of the conditioning set with ridge regression.
+
+    Features are cached per variable, per conditioning set and per residual, since GSP visits the
+    same variables under many conditioning sets. The tests follow the signature of the causaldag
+    tests and plug into MemoizedCI_Tester and MemoizedInvarianceTester with the sufficient
+    statistics built here:
+
+        ci_tester = MemoizedCI_Tester(hsic_lowrank_test, hsic_lowrank_suffstat(obs_samples), alpha=alpha)
+"""
+
+import numpy as np
+
+from scipy.stats import gamma
+from typing import Dict, FrozenSet, Tuple
+
+
+LOWRANK_APPROXIMATIONS = ['nystrom', 'rff']
+
+
+def median_lengthscale(samples: np.ndarray, max_points: int = 500, seed: int = 0) -> float:
+    """ Median heuristic of the Gaussian kernel lengthscale on a subsample.
+    """
+
+    if samples.shape[0] > max_points:
+        samples = samples[np.random.default_rng(seed).choice(samples.shape[0], max_points, replace=False)]
+    sq_norms = (samples ** 2).sum(axis=1)
+    sq_dists = sq_norms[:, None] + sq_norms[None, :] - 2 * samples @ samples.T
+    dists = np.sqrt(np.maximum(sq_dists[np.triu_indices(samples.shape[0], k=1)], 0))
+    dists = dists[dists > 0]
+    return float(np.median(dists)) if dists.size > 0 else 1.0
+
+
+def kernel_features(samples: np.ndarray, rank: int = 100, approximation: str = 'nystrom',
+                    seed: int = 0) -> np.ndarray:
+    """ Low-rank features F of a Gaussian kernel with K ~ F F^T, centered over the samples.
+
+    Args:
+        samples (np.ndarray): [n] or [n, k] samples.
+        rank (int, optional): Number of features. Defaults to 100.
+        approximation (str, optional): One of LOWRANK_APPROXIMATIONS. Defaults to 'nystrom'.
+        seed (int, optional): Seed of the landmarks or frequencies. Defaults to 0.
+
+    Returns:
+        np.ndarray: [n, rank] centered features, fewer for Nystrom on fewer than rank samples.
+    """
+
+    samples = np.asarray(samples, dtype=float).reshape(samples.shape[0], -1)
+    lengthscale = median_lengthscale(samples, seed=seed)
+    rng = np.random.default_rng(seed)
+
+    if approximation == 'nystrom':
+        num_landmarks = min(rank, samples.shape[0])
+        landmarks = samples[rng.choice(samples.shape[0], num_landmarks, replace=False)]
+
+        def gram(a, b):
+            sq_dists = (a ** 2).sum(axis=1)[:, None] + (b ** 2).sum(axis=1)[None, :] - 2 * a @ b.T
+            return np.exp(-np.maximum(sq_dists, 0) / (2 * lengthscale ** 2))
+
+        eigvals, eigvecs = np.linalg.eigh(gram(landmarks, landmarks))
+        keep = eigvals > 1e-10 * eigvals.max()
+        features = gram(samples, landmarks) @ (eigvecs[:, keep] / np.sqrt(eigvals[keep]))
+    elif approximation == 'rff':
+        frequencies = rng.normal(scale=1 / lengthscale, size=(samples.shape[1], rank))
+        phases = rng.uniform(0, 2 * np.pi, size=rank)
+        features = np.sqrt(2 / rank) * np.cos(samples @ frequencies + phases)
+    else:
+        raise ValueError(f'Unknown approximation {approximation}, choose from {LOWRANK_APPROXIMATIONS}.')
+
+    return features - features.mean(axis=0)
+
+
+def hsic_gamma_test(features_x: np.ndarray, features_y: np.ndarray, alpha: float = 0.05) -> Dict:
+    """ HSIC independence test on centered low-rank features with the gamma approximation.
+
+    Returns:
+        Dict: statistic, critval, p_value and reject as the causaldag tests.
+    """
+
+    n = features_x.shape[0]
+    cov_x = features_x.T @ features_x / n
+    cov_y = features_y.T @ features_y / n
+    statistic = np.sum((features_x.T @ features_y) ** 2) / n
+
+    mean = np.trace(cov_x) * np.trace(cov_y)
+    var = 2 * np.sum(cov_x ** 2) * np.sum(cov_y ** 2)
+    if mean <= 0 or var <= 0:
+        return dict(statistic=statistic, critval=np.inf, p_value=1.0, reject=False)
+
+    shape, scale = mean ** 2 / var, var / mean
+    p_value = float(gamma.sf(statistic, shape, scale=scale))
+    return dict(statistic=statistic, critval=gamma.ppf(1 - alpha, shape, scale=scale),
+                p_value=p_value, reject=p_value < alpha)
+
+
+class KernelFeatureCache:
+    def __init__(self, samples: np.ndarray, rank: int = 100, approximation: str = 'nystrom',
+                 ridge: float = 1e-2, seed: int = 0):
+        """ Samples of a CI test with their kernel features cached per variable, conditioning set
+        and residual.
+
+        Args:
+            samples (np.ndarray): [n, d] samples.
+            rank (int, optional): Number of features per kernel. Defaults to 100.
+            approximation (str, optional): One of LOWRANK_APPROXIMATIONS. Defaults to 'nystrom'.
+            ridge (float, optional): Ridge penalty of the regression on conditioning sets, relative
+                to the number of samples. Defaults to 1e-2.
+            seed (int, optional): Seed of the approximations. Defaults to 0.
+        """
+
+        self.samples = np.asarray(samples, dtype=float)
+        self.rank = rank
+        self.approximation = approximation
+        self.ridge = ridge
+        self.seed = seed
+
+        self.__features: Dict[Tuple[int, FrozenSet[int]], np.ndarray] = dict()
+        self.__projections: Dict[FrozenSet[int], Tuple[np.ndarray, np.ndarray]] = dict()
+
+    def get_features(self, columns) -> np.ndarray:
+        return kernel_features(self.samples[:, columns], self.rank, self.approximation, self.seed)
+
+    def residual(self, variable: int, cond_set: FrozenSet[int]) -> np.ndarray:
+        """ Residual of a variable after ridge regression on the features of the conditioning set.
+        """
+
+        if cond_set not in self.__projections:
+            features = self.get_features(sorted(cond_set))
+            gram = features.T @ features + self.ridge * self.samples.shape[0] * np.eye(features.shape[1])
+            self.__projections[cond_set] = (features, np.linalg.solve(gram, features.T))
+        features, solver = self.__projections[cond_set]
+
+        values = self.samples[:, variable] - self.samples[:, variable].mean()
+        return values - features @ (solver @ values)
+
+    def features(self, variable: int, cond_set: FrozenSet[int] = frozenset()) -> np.ndarray:
+        """ Centered features of a variable, or of its residual given a conditioning set.
+        """
+
+        key = (variable, cond_set)
+        if key not in self.__features:
+            if len(cond_set) == 0:
+                self.__features[key] = self.get_features([variable])
+            else:
+                residual = self.residual(variable, cond_set)
+                self.__features[key] = kernel_features(residual, self.rank, self.approximation, self.seed)
+        return self.__features[key]
+
+
+def hsic_lowrank_suffstat(samples: np.ndarray, rank: int = 100, approximation: str = 'nystrom',
+                          seed: int = 0) -> KernelFeatureCache:
+    """ Sufficient statistics of hsic_lowrank_test.
+    """
+
+    return KernelFeatureCache(samples, rank, approximation, seed=seed)
+
+
+def hsic_lowrank_test(suffstat: KernelFeatureCache, i: int, j: int, cond_set=None, alpha: float = 0.05) -> Dict:
+    """ Test X_i independent of X_j given X_cond_set.
+
+    Args:
+        suffstat (KernelFeatureCache): Built by hsic_lowrank_suffstat.
+        i (int): First variable.
+        j (int): Second variable.
+        cond_set (optional): Conditioning variables. Defaults to None.
+        alpha (float, optional): Significance level. Defaults to 0.05.
+
+    Returns:
+        Dict: statistic, critval, p_value and reject.
+    """
+
+    cond_set = frozenset(cond_set) if cond_set is not None else frozenset()
+    return hsic_gamma_test(suffstat.features(i, cond_set), suffstat.features(j, cond_set), alpha)
+
+
+def hsic_lowrank_invariance_suffstat(obs_samples: np.ndarray, contexts: Dict[int, np.ndarray],
+                                     rank: int = 100, approximation: str = 'nystrom',
+                                     seed: int = 0) -> Dict:
+    """ Sufficient statistics of hsic_lowrank_invariance_test: the pooled samples of every context
+    with the observational ones, and the centered one-hot features of the context label, which
+    represent the delta kernel exactly.
+    """
+
+    suffstat = dict()
+    for context, context_samples in contexts.items():
+        labels = np.concatenate([np.zeros(obs_samples.shape[0]), np.ones(context_samples.shape[0])])
+        label_features = np.stack([1 - labels, labels], axis=1)
+        suffstat[context] = (KernelFeatureCache(np.concatenate([obs_samples, context_samples]), rank,
+                                                approximation, seed=seed),
+                             label_features - label_features.mean(axis=0))
+    return suffstat
+
+
+def hsic_lowrank_invariance_test(suffstat: Dict, context: int, i: int, cond_set=None, alpha: float = 0.05) -> Dict:
+    """ Test whether the conditional distribution of X_i given X_cond_set is the same in the
+    observational data and in a context.
+
+    Args:
+        suffstat (Dict): Built by hsic_lowrank_invariance_suffstat.
+        context (int): The interventional context.
+        i (int): The variable.
+        cond_set (optional): Conditioning variables. Defaults to None.
+        alpha (float, optional): Significance level. Defaults to 0.05.
+
+    Returns:
+        Dict: statistic, critval, p_value and reject.
+    """
+
+    cond_set = frozenset(cond_set) if cond_set is not None else frozenset()
+    pooled, label_features = suffstat[context]
+    return hsic_gamma_test(pooled.features(i, cond_set), label_features, alpha)
@@ -1,14 +1,17 @@
 import numpy as np
-import scipy.linalg as slin
 import scipy.optimize as sopt
 from scipy.special import expit as sigmoid
 
+import os
 import sys
 sys.path.append("../../federated")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
 from utils import calculate_metrics
+from acyclicity import acyclicity_numpy
 
 
-def notears_linear(X, lambda1, loss_type, max_iter=100, h_tol=1e-8, rho_max=1e+16, w_threshold=0.3, ground_truth=None):
+def notears_linear(X, lambda1, loss_type, max_iter=100, h_tol=1e-8, rho_max=1e+16, w_threshold=0.3, ground_truth=None,
+                   acyclicity='expm'):
     """Solve min_W L(W; X) + lambda1 ‖W‖_1 s.t. h(W) = 0 using augmented Lagrangian.
     Args:
         X (np.ndarray): [n, d] sample matrix
@@ -18,6 +21,7 @@ def notears_linear(X, lambda1, loss_type, max_iter=100, h_tol=1e-8, rho_max=1e+1
         h_tol (float): exit if |h(w_est)| <= htol
         rho_max (float): exit if rho >= rho_max
         w_threshold (float): drop edge if |weight| < threshold
+        acyclicity (str): constraint on W * W, expm, poly or logdet, see acyclicity.py
     Returns:
         W_est (np.ndarray): [d, d] estimated DAG
     """
@@ -41,13 +45,8 @@ def notears_linear(X, lambda1, loss_type, max_iter=100, h_tol=1e-8, rho_max=1e+1
 
     def _h(W):
         """Evaluate value and gradient of acyclicity constraint."""
-        E = slin.expm(W * W)  # (Zheng et al. 2018)
-        h = np.trace(E) - d
-        #     # A different formulation, slightly faster at the cost of numerical stability
-        #     M = np.eye(d) + W * W / d  # (Yu et al. 2019)
-        #     E = np.linalg.matrix_power(M, d - 1)
-        #     h = (E.T * M).sum() - d
-        G_h = E.T * W * 2
+        h, G_A = acyclicity_numpy(W * W, acyclicity)
+        G_h = G_A * W * 2
         return h, G_h
 
     def _adj(w):
@@ -94,7 +93,8 @@ def notears_linear(X, lambda1, loss_type, max_iter=100, h_tol=1e-8, rho_max=1e+1
 
 
 
-def notears_linear_fed(X, lambda1, loss_type, W_prior, max_iter=100, h_tol=1e-8, rho_max=1e+16, w_threshold=0.3, ground_truth=None):
+def notears_linear_fed(X, lambda1, loss_type, W_prior, max_iter=100, h_tol=1e-8, rho_max=1e+16, w_threshold=0.3, ground_truth=None,
+                       acyclicity='expm'):
     """Solve min_W L(W; X) + lambda1 ‖W‖_1 s.t. h(W) = 0 using augmented Lagrangian.
 
     Args:
@@ -106,6 +106,7 @@ def notears_linear_fed(X, lambda1, loss_type, W_prior, max_iter=100, h_tol=1e-8,
         rho_max (float): exit if rho >= rho_max
         W_prior (np.ndarray): the prior weights for belief aggregation.
         w_threshold (float): drop edge if |weight| < threshold
+        acyclicity (str): constraint on W * W, expm, poly or logdet, see acyclicity.py
 
     Returns:
         W_est (np.ndarray): [d, d] estimated DAG
@@ -130,13 +131,8 @@ def notears_linear_fed(X, lambda1, loss_type, W_prior, max_iter=100, h_tol=1e-8,
 
     def _h(W):
         """Evaluate value and gradient of acyclicity constraint."""
-        E = slin.expm(W * W)  # (Zheng et al. 2018)
-        h = np.trace(E) - d
-        #     # A different formulation, slightly faster at the cost of numerical stability
-        #     M = np.eye(d) + W * W / d  # (Yu et al. 2019)
-        #     E = np.linalg.matrix_power(M, d - 1)
-        #     h = (E.T * M).sum() - d
-        G_h = E.T * W * 2
+        h, G_A = acyclicity_numpy(W * W, acyclicity)
+        G_h = G_A * W * 2
         return h, G_h
 
     def _adj(w):
@@ -188,6 +184,133 @@ def notears_linear_fed(X, lambda1, loss_type, W_prior, max_iter=100, h_tol=1e-8,
     return w_est
 
 
+def client_statistics(X):
+    """Summarize the samples of a client for the federated l2 problem.
+
+    Args:
+        X (np.ndarray): [n, d] local sample matrix
+
+    Returns:
+        cov (np.ndarray): [d, d] centered second moment X_c^T X_c / n
+        mean (np.ndarray): [d] sample mean
+        n (int): number of samples
+    """
+    n = X.shape[0]
+    mean = X.mean(axis=0)
+    X_c = X - mean
+    return X_c.T @ X_c / n, mean, n
+
+
+def aggregate_statistics(stats):
+    """Pool client statistics into the centered second moment of all their samples.
+
+    Args:
+        stats (list): (cov, mean, n) of each client as given by client_statistics
+
+    Returns:
+        S (np.ndarray): [d, d] centered second moment of the union of the samples
+        n (int): total number of samples
+    """
+    n = sum(n_k for _, _, n_k in stats)
+    mean = sum(n_k * mean_k for _, mean_k, n_k in stats) / n
+    S = sum(n_k * (cov_k + np.outer(mean_k - mean, mean_k - mean)) for cov_k, mean_k, n_k in stats) / n
+    return S, n
+
+
+def notears_linear_suffstat(S, lambda1, max_iter=100, h_tol=1e-8, rho_max=1e+16, w_threshold=0.3,
+                            W_init=None, ground_truth=None, acyclicity='expm'):
+    """Solve min_W L(W; X) + lambda1 ‖W‖_1 s.t. h(W) = 0 for the l2 loss given only S = X^T X / n.
+
+    Since L(W; X) = 0.5 / n ‖X - X W‖^2 = 0.5 tr((I - W)^T S (I - W)), every function call costs
+    O(d^3) regardless of n, and no samples are needed to solve the problem.
+
+    Args:
+        S (np.ndarray): [d, d] centered second moment, e.g., from aggregate_statistics
+        lambda1 (float): l1 penalty parameter
+        max_iter (int): max num of dual ascent steps
+        h_tol (float): exit if |h(w_est)| <= htol
+        rho_max (float): exit if rho >= rho_max
+        w_threshold (float): drop edge if |weight| < threshold
+        W_init (np.ndarray): [d, d] initial weights, zeros if None
+        ground_truth (np.ndarray): [d, d] true adjacency matrix to report the SHD per step, if given
+        acyclicity (str): constraint on W * W, expm, poly or logdet, see acyclicity.py
+
+    Returns:
+        W_est (np.ndarray): [d, d] estimated DAG
+    """
+    def _loss(W):
+        """Evaluate value and gradient of loss."""
+        SR = S - S @ W
+        loss = 0.5 * np.trace(SR) - 0.5 * (W * SR).sum()
+        G_loss = - SR
+        return loss, G_loss
+
+    def _h(W):
+        """Evaluate value and gradient of acyclicity constraint."""
+        h, G_A = acyclicity_numpy(W * W, acyclicity)
+        G_h = G_A * W * 2
+        return h, G_h
+
+    def _adj(w):
+        """Convert doubled variables ([2 d^2] array) back to original variables ([d, d] matrix)."""
+        return (w[:d * d] - w[d * d:]).reshape([d, d])
+
+    def _func(w):
+        """Evaluate value and gradient of augmented Lagrangian for doubled variables ([2 d^2] array)."""
+        W = _adj(w)
+        loss, G_loss = _loss(W)
+        h, G_h = _h(W)
+        obj = loss + 0.5 * rho * h * h + alpha * h + lambda1 * w.sum()
+        G_smooth = G_loss + (rho * h + alpha) * G_h
+        g_obj = np.concatenate((G_smooth + lambda1, - G_smooth + lambda1), axis=None)
+        return obj, g_obj
+
+    d = S.shape[0]
+    w_est, rho, alpha, h = np.zeros(2 * d * d), 1.0, 0.0, np.inf  # double w_est into (w_pos, w_neg)
+    if W_init is not None:
+        w_est = np.concatenate((np.maximum(W_init, 0), np.maximum(-W_init, 0)), axis=None)
+    bnds = [(0, 0) if i == j else (0, None) for _ in range(2) for i in range(d) for j in range(d)]
+    for it in range(max_iter):
+        if ground_truth is not None:
+            w_iter = _adj(w_est)
+            w_iter[np.abs(w_iter) < w_threshold] = 0
+            metrics = calculate_metrics(w_iter, ground_truth)
+            print(f'> {it} SHD = {metrics["SHD"]}')
+
+        w_new, h_new = None, None
+        while rho < rho_max:
+            sol = sopt.minimize(_func, w_est, method='L-BFGS-B', jac=True, bounds=bnds)
+            w_new = sol.x
+            h_new, _ = _h(_adj(w_new))
+            if h_new > 0.25 * h:
+                rho *= 10
+            else:
+                break
+        w_est, h = w_new, h_new
+        alpha += rho * h
+        if h <= h_tol or rho >= rho_max:
+            break
+    W_est = _adj(w_est)
+    W_est[np.abs(W_est) < w_threshold] = 0
+    return W_est
+
+
+def notears_linear_federated(X_clients, lambda1, **kwargs):
+    """Federated linear NOTEARS for the l2 loss: clients share only their statistics, and
+    the problem is solved once on the pooled statistic.
+
+    Args:
+        X_clients (list): [n_k, d] sample matrix of each client
+        lambda1 (float): l1 penalty parameter
+        kwargs: further arguments of notears_linear_suffstat
+
+    Returns:
+        W_est (np.ndarray): [d, d] estimated DAG
+    """
+    S, _ = aggregate_statistics([client_statistics(X) for X in X_clients])
+    return notears_linear_suffstat(S, lambda1, **kwargs)
+
+
 if __name__ == '__main__':
     from notears import utils
     utils.set_random_seed(1)
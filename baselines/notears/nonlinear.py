@@ -1,6 +1,9 @@
 from notears.locally_connected import LocallyConnected
 from notears.lbfgsb_scipy import LBFGSBScipy
-from notears.trace_expm import trace_expm
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from acyclicity import acyclicity_torch
 import torch
 import torch.nn as nn
 import numpy as np
@@ -8,12 +11,13 @@ import math
 
 
 class NotearsMLP(nn.Module):
-    def __init__(self, dims, bias=True):
+    def __init__(self, dims, bias=True, acyclicity='expm'):
         super(NotearsMLP, self).__init__()
         assert len(dims) >= 2
         assert dims[-1] == 1
         d = dims[0]
         self.dims = dims
+        self.acyclicity = acyclicity  # expm, poly or logdet, see acyclicity.py
         # fc1: variable splitting for l1
         self.fc1_pos = nn.Linear(d, d * dims[1], bias=bias)
         self.fc1_neg = nn.Linear(d, d * dims[1], bias=bias)
@@ -53,11 +57,7 @@ class NotearsMLP(nn.Module):
         fc1_weight = self.fc1_pos.weight - self.fc1_neg.weight  # [j * m1, i]
         fc1_weight = fc1_weight.view(d, -1, d)  # [j, m1, i]
         A = torch.sum(fc1_weight * fc1_weight, dim=1).t()  # [i, j]
-        h = trace_expm(A) - d  # (Zheng et al. 2018)
-        # A different formulation, slightly faster at the cost of numerical stability
-        # M = torch.eye(d) + A / d  # (Yu et al. 2019)
-        # E = torch.matrix_power(M, d - 1)
-        # h = (E.t() * M).sum() - d
+        h = acyclicity_torch(A, self.acyclicity)
         return h
 
     def l2_reg(self):
@@ -87,10 +87,11 @@ class NotearsMLP(nn.Module):
 
 
 class NotearsSobolev(nn.Module):
-    def __init__(self, d, k):
+    def __init__(self, d, k, acyclicity='expm'):
         """d: num variables k: num expansion of each variable"""
         super(NotearsSobolev, self).__init__()
         self.d, self.k = d, k
+        self.acyclicity = acyclicity  # expm, poly or logdet, see acyclicity.py
         self.fc1_pos = nn.Linear(d * k, d, bias=False)  # ik -> j
         self.fc1_neg = nn.Linear(d * k, d, bias=False)
         self.fc1_pos.weight.bounds = self._bounds()
@@ -132,11 +133,7 @@ class NotearsSobolev(nn.Module):
         fc1_weight = self.fc1_pos.weight - self.fc1_neg.weight  # [j, ik]
         fc1_weight = fc1_weight.view(self.d, self.d, self.k)  # [j, i, k]
         A = torch.sum(fc1_weight * fc1_weight, dim=2).t()  # [i, j]
-        h = trace_expm(A) - d  # (Zheng et al. 2018)
-        # A different formulation, slightly faster at the cost of numerical stability
-        # M = torch.eye(self.d) + A / self.d  # (Yu et al. 2019)
-        # E = torch.matrix_power(M, self.d - 1)
-        # h = (E.t() * M).sum() - self.d
+        h = acyclicity_torch(A, self.acyclicity)
         return h
 
     def l2_reg(self):
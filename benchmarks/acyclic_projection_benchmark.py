@@ -0,0 +1,205 @@
+"""
+    File name: acyclic_projection_benchmark.py
+    Python Version: 3.8
+    Description: Compare the SCC-based acyclic projection against the former permutation search
+        of find_best_acyclic_graph in runtime and log-orientation score. The former code, including
+        its cycle search, is kept here as a frozen copy.
+
+    Usage (from the repository root):
+        $ python benchmarks/acyclic_projection_benchmark.py --num-vars 25 100 400
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from causal_discovery.acyclic_projection import project_orientations, strongly_connected_components
+
+
+def legacy_find_cycles(adj_matrix):
+    """
+    Frozen copy of find_cycles before its rewrite, so that the legacy timings keep measuring
+    the former code: searches the nodes on all paths closing a backward edge, and removes
+    duplicate frames.
+    """
+    rev_edges = []
+    for i in range(adj_matrix.shape[0]):
+        for j in range(i, adj_matrix.shape[1]):
+            if adj_matrix[j, i]:
+                rev_edges.append((i, j))
+
+    rev_edges = [(i, max([j for k, j in rev_edges if k == i])) for i, _ in rev_edges]
+    cycle_frames = []
+    for i, j in rev_edges:
+        nodes = legacy_find_nodes_on_paths(adj_matrix, i, j)
+        if nodes is None:
+            continue
+        nodes = torch.where(nodes == 1)[0].numpy().tolist()
+        frame = nodes
+        if len(frame) == 0:
+            continue
+        cycle_frames.append(frame)
+
+    cycle_frames = [sorted(f) for f in cycle_frames]
+    list_2 = cycle_frames[:]
+    b = 0
+    for i, f in enumerate(list_2):
+        if f in cycle_frames[:(i-b)]:
+            del cycle_frames[i-b]
+            b += 1
+
+    return cycle_frames
+
+
+def legacy_find_nodes_on_paths(adj_matrix, source_node, target_node, nodes_on_path=None, current_path=None):
+    """
+    Frozen copy of the former recursive find_nodes_on_paths used by legacy_find_cycles.
+    """
+    if nodes_on_path is None:
+        nodes_on_path = torch.zeros(adj_matrix.shape[0])
+    if current_path is None:
+        current_path = torch.zeros(adj_matrix.shape[0])
+    current_path[source_node] = 1
+
+    if source_node == target_node:
+        nodes_on_path[source_node] = 1
+        return nodes_on_path
+    elif nodes_on_path[source_node] == 1:
+        return nodes_on_path
+    elif nodes_on_path[source_node] == -1:
+        return None
+    else:
+        children = torch.where(adj_matrix[source_node])[0]
+        for c in children:
+            if current_path[c] == 1:
+                continue
+            ret = legacy_find_nodes_on_paths(adj_matrix, c, target_node, nodes_on_path=nodes_on_path,
+                                             current_path=np.copy(current_path))
+            if ret is not None:
+                nodes_on_path[source_node] = 1
+
+        if nodes_on_path[source_node] <= 0:
+            nodes_on_path[source_node] = -1
+            return None
+        else:
+            return nodes_on_path
+
+
+@torch.no_grad()
+def legacy_find_best_acyclic_graph(gamma, theta):
+    """
+    The former implementation of find_best_acyclic_graph: brute-force over all permutations
+    of cycle frames with less than 7 nodes, and a single greedy move otherwise.
+    """
+    theta = theta.clone().float()
+    hard_matrix = ((gamma > 0.5) * (theta > 0.5))
+    for frame in legacy_find_cycles(hard_matrix):
+        if len(frame) < 7:
+            permutations = itertools.permutations(range(len(frame)))
+        else:
+            default_permut = list(range(len(frame)))
+            permutations = [default_permut]
+            for i in range(len(default_permut)):
+                e = default_permut[i]
+                rest = default_permut[:i] + default_permut[i+1:]
+                permutations += [[rest[:j]+[e]+rest[j:]] for j in range(0, len(rest)+1) if j != i]
+        small_theta = (theta[frame][:, frame]+1e-10).log()
+        best_score, best_permut = -float('inf'), None
+        for permut in permutations:
+            permut = list(permut)
+            perm_theta = small_theta[permut][:, permut]
+            score = torch.triu(perm_theta, diagonal=1).sum()
+            if score > best_score:
+                best_score = score
+                best_permut = permut
+        triu = torch.triu(torch.ones(len(frame), len(frame)), diagonal=1)
+        rev_permut = [best_permut.index(i) for i in range(len(frame))]
+        triu = triu[rev_permut][:, rev_permut]
+        for i, f in enumerate(frame):
+            theta[f, frame] = triu[i]
+    return theta.numpy()
+
+
+def sample_prediction(num_vars, edge_prob, seed):
+    """
+    Samples gamma and theta probabilities that resemble an imperfect ENCO prediction
+    with many cycles: a random DAG with a share of wrongly oriented edges.
+    """
+    rng = np.random.default_rng(seed)
+    true_adj = np.triu(rng.random((num_vars, num_vars)) < edge_prob, k=1)
+    gamma_logits = np.where(true_adj | true_adj.T, 2.0, -2.0) + rng.normal(scale=1.5, size=true_adj.shape)
+    theta_logits = np.where(true_adj, 1.0, -1.0) * rng.gamma(2.0, 1.0, size=true_adj.shape)
+    theta_logits = np.triu(theta_logits, k=1) - np.triu(theta_logits, k=1).T
+    theta_logits += np.triu(rng.normal(scale=1.5, size=true_adj.shape), k=1) * (true_adj | true_adj.T)
+    theta_logits = np.triu(theta_logits, k=1) - np.triu(theta_logits, k=1).T
+    sigmoid = lambda x: 1.0 / (1.0 + np.exp(-x))
+    return sigmoid(gamma_logits), sigmoid(theta_logits)
+
+
+def log_orientation_score(projected_theta, gamma, theta):
+    """
+    The objective both implementations maximize: the summed log orientation probabilities
+    over the orientation chosen for every pair that lies in a common strongly connected
+    component of the cyclic prediction.
+    """
+    log_theta = np.log(theta + 1e-10)
+    cyclic = (gamma > 0.5) * (theta > 0.5)
+    score = 0.0
+    for comp in strongly_connected_components(cyclic):
+        if len(comp) > 1:
+            score += (log_theta[np.ix_(comp, comp)] * (projected_theta[np.ix_(comp, comp)] > 0.5)).sum()
+    return score
+
+
+def is_acyclic(hard_matrix):
+    return all(len(c) == 1 for c in strongly_connected_components(hard_matrix)) and \
+        not hard_matrix.diagonal().any()
+
+
+def run_benchmark(num_vars_list, edge_prob, repeats, legacy_limit):
+    print('%8s %8s %12s %12s %14s %14s %10s %10s' % ('num_vars', 'seed', 'legacy [s]', 'scc [s]',
+                                                  'legacy score', 'scc score', 'legacy DAG', 'scc DAG'))
+    for num_vars in num_vars_list:
+        for seed in range(repeats):
+            gamma, theta = sample_prediction(num_vars, edge_prob, seed)
+
+            start = time.time()
+            scc_theta = project_orientations(gamma, theta)
+            scc_time = time.time() - start
+            scc_score = log_orientation_score(scc_theta, gamma, theta)
+            scc_matrix = (gamma > 0.5) * (scc_theta > 0.5)
+
+            if num_vars <= legacy_limit:
+                start = time.time()
+                legacy_theta = legacy_find_best_acyclic_graph(torch.from_numpy(gamma), torch.from_numpy(theta))
+                legacy_time = time.time() - start
+                legacy_score = log_orientation_score(legacy_theta, gamma, theta)
+                legacy_dag = str(is_acyclic((gamma > 0.5) * (legacy_theta > 0.5)))
+            else:
+                legacy_time, legacy_score, legacy_dag = float('nan'), float('nan'), '-'
+
+            print('%8i %8i %12.4f %12.4f %14.2f %14.2f %10s %10s' % (num_vars, seed, legacy_time, scc_time,
+                                                                    legacy_score, scc_score, legacy_dag,
+                                                                    str(is_acyclic(scc_matrix))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the acyclic projection used by ENCO and the '
+                                     'federated aggregation.')
+    parser.add_argument("-nv", "--num-vars", default=[25, 100, 400], type=int, nargs='+',
+                        help="Graph sizes to benchmark.")
+    parser.add_argument("-ep", "--edge-prob", default=0.1, type=float,
+                        help="Edge probability of the random graphs underlying the predictions.")
+    parser.add_argument("-r", "--repeats", default=3, type=int,
+                        help="Number of random predictions per graph size.")
+    parser.add_argument("-ll", "--legacy-limit", default=100, type=int,
+                        help="Largest graph size on which the legacy implementation is run.")
+    args = parser.parse_args()
+
+    run_benchmark(args.num_vars, args.edge_prob, args.repeats, args.legacy_limit)
@@ -0,0 +1,62 @@
+"""
+    File name: bench_acyclicity.py
+    Python Version: 3.8
+    Description: Value and gradient of the acyclicity constraints shared by the NOTEARS, DCDI and
+        DAG-GNN baselines (baselines/acyclicity.py), with NumPy and with torch, on random
+        non-negative matrices of the sizes the baselines are run with.
+
+    Usage (from the repository root):
+        $ python benchmarks/run_benchmarks.py --bench bench_acyclicity
+"""
+
+import os
+import sys
+
+import numpy as np
+import torch
+
+from common import SEED
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'baselines'))
+from acyclicity import ACYCLICITY_METHODS, acyclicity_numpy, acyclicity_torch
+
+
+MATRIX_SIZES = [20, 100, 500]
+
+
+def get_constraint_input(d):
+    """
+    W * W of a random weight matrix whose spectral radius is within the domain of all constraints.
+    """
+    rng = np.random.default_rng(SEED)
+    W = rng.normal(scale=0.5 / np.sqrt(d), size=(d, d))
+    np.fill_diagonal(W, 0)
+    return W * W
+
+
+class TimeAcyclicityNumpy:
+    """
+    h(A) and its gradient as computed by the linear NOTEARS objective.
+    """
+    params = [MATRIX_SIZES, ACYCLICITY_METHODS]
+    param_names = ['d', 'method']
+
+    def setup(self, d, method):
+        self.A = get_constraint_input(d)
+
+    def time_value_and_gradient(self, d, method):
+        acyclicity_numpy(self.A, method)
+
+
+class TimeAcyclicityTorch:
+    """
+    h(A) and the backward pass to A, as computed by the nonlinear NOTEARS, DCDI and DAG-GNN losses.
+    """
+    params = [MATRIX_SIZES, ACYCLICITY_METHODS]
+    param_names = ['d', 'method']
+
+    def setup(self, d, method):
+        self.A = torch.tensor(get_constraint_input(d), requires_grad=True)
+
+    def time_value_and_gradient(self, d, method):
+        acyclicity_torch(self.A, method).backward()
@@ -0,0 +1,142 @@
+"""
+    File name: bench_enco.py
+    Python Version: 3.8
+    Description: Throughput of the ENCO hot paths: the multivariable MLP, the embedding layer,
+        one distribution fitting update and the Monte-Carlo graph samples of the graph fitting.
+        Input masks are sampled from gamma/theta logits close to the ground truth graph, as
+        in the later epochs of ENCO, so the graph type determines the sparsity of the masks.
+
+    Usage (from the repository root):
+        $ python benchmarks/run_benchmarks.py --bench bench_enco
+"""
+
+import torch
+import torch.nn.functional as F
+import torch.utils.data as data
+
+from common import GRAPH_SIZES, GRAPH_TYPES, NUM_CATEGS, SEED, get_graph, get_graph_params, skip_unless_large
+from causal_discovery.datasets import ObservationalCategoricalData
+from causal_discovery.distribution_fitting import DistributionFitting
+from causal_discovery.graph_fitting import GraphFitting
+from causal_discovery.multivariable_mlp import EmbedLayer, InputMask, create_model
+
+
+# Defaults of ENCO
+BATCH_SIZE = 64
+HIDDEN_DIMS = [64]
+GF_NUM_GRAPHS = 100
+
+
+def get_sample_matrix(num_vars, graph_type):
+    """
+    Edge probabilities sigmoid(gamma) * sigmoid(theta) from which ENCO samples the input masks.
+    """
+    gamma, theta = get_graph_params(num_vars, graph_type)
+    return torch.sigmoid(gamma) * torch.sigmoid(theta)
+
+
+def sample_inputs(num_vars, graph_type, batch_size=BATCH_SIZE):
+    """
+    A batch of observational samples and of input masks, as used in the distribution fitting.
+    """
+    graph = get_graph(num_vars, graph_type)
+    inputs = torch.from_numpy(graph.sample(batch_size=batch_size, as_array=True)).long()
+
+    adj_matrices = torch.bernoulli(get_sample_matrix(num_vars, graph_type)[None].expand(batch_size, -1, -1))
+    adj_matrices[:, torch.arange(num_vars), torch.arange(num_vars)] = 0
+    # Transpose for mask because adj[i,j] means that i->j
+    return inputs, adj_matrices.transpose(1, 2).contiguous()
+
+
+class TimeMultivarMLP:
+    """
+    Forward and backward pass of the networks modelling all conditionals.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+
+    def setup(self, num_vars, graph_type):
+        torch.manual_seed(SEED)
+        self.model = create_model(num_vars=num_vars, num_categs=NUM_CATEGS, hidden_dims=HIDDEN_DIMS)
+        self.inputs, self.mask = sample_inputs(num_vars, graph_type)
+
+    def time_forward(self, num_vars, graph_type):
+        with torch.no_grad():
+            self.model(self.inputs, mask=self.mask)
+
+    def time_forward_backward(self, num_vars, graph_type):
+        self.model.zero_grad()
+        preds = self.model(self.inputs, mask=self.mask)
+        loss = F.cross_entropy(preds.flatten(0, -2), self.inputs.reshape(-1))
+        loss.backward()
+
+
+class TimeEmbedLayer:
+    """
+    Sparse and dense paths of the embedding layer. The dense path materializes
+    batch_size x num_vars x num_vars embeddings and is skipped for large graphs by default.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES, [False, True]]
+    param_names = ['num_vars', 'graph_type', 'sparse_embeds']
+
+    def setup(self, num_vars, graph_type, sparse_embeds):
+        if not sparse_embeds:
+            skip_unless_large(num_vars, 100)
+        torch.manual_seed(SEED)
+        self.layer = EmbedLayer(num_vars=num_vars, num_categs=NUM_CATEGS, hidden_dim=HIDDEN_DIMS[0],
+                                input_mask=InputMask(None), sparse_embeds=sparse_embeds)
+        self.inputs, self.mask = sample_inputs(num_vars, graph_type)
+
+    def time_forward(self, num_vars, graph_type, sparse_embeds):
+        with torch.no_grad():
+            self.layer(self.inputs, self.mask)
+
+    def time_forward_backward(self, num_vars, graph_type, sparse_embeds):
+        self.layer.zero_grad()
+        self.layer(self.inputs, self.mask).sum().backward()
+
+
+class TimeDistributionFitting:
+    """
+    One update step of the distribution fitting stage: sampling the masks, forward,
+    backward and the optimizer step.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+
+    def setup(self, num_vars, graph_type):
+        torch.manual_seed(SEED)
+        graph = get_graph(num_vars, graph_type)
+        model = create_model(num_vars=num_vars, num_categs=NUM_CATEGS, hidden_dims=HIDDEN_DIMS)
+        optimizer = torch.optim.Adam(model.parameters(), lr=5e-3)
+        data_loader = data.DataLoader(ObservationalCategoricalData(graph, dataset_size=BATCH_SIZE * 20),
+                                      batch_size=BATCH_SIZE, shuffle=True, drop_last=True)
+        self.module = DistributionFitting(model=model, optimizer=optimizer, data_loader=data_loader)
+        self.sample_matrix = get_sample_matrix(num_vars, graph_type)
+
+    def time_perform_update_step(self, num_vars, graph_type):
+        self.module.perform_update_step(sample_matrix=self.sample_matrix)
+
+
+class TimeGraphFitting:
+    """
+    Sampling and evaluating the graph structures of one graph fitting step. The graphs are
+    evaluated in chunks of about 500 / num_vars graphs to bound the memory on the CPU.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+
+    def setup(self, num_vars, graph_type):
+        skip_unless_large(num_vars, 100)
+        torch.manual_seed(SEED)
+        graph = get_graph(num_vars, graph_type)
+        model = create_model(num_vars=num_vars, num_categs=NUM_CATEGS, hidden_dims=HIDDEN_DIMS)
+        self.module = GraphFitting(model=model, graph=graph, num_batches=1, num_graphs=GF_NUM_GRAPHS,
+                                   theta_only_num_graphs=4, batch_size=BATCH_SIZE, lambda_sparse=0.004,
+                                   sample_size_inters=BATCH_SIZE * 4,
+                                   max_graph_stacking=max(1, 500 // num_vars))
+        self.gamma, self.theta = get_graph_params(num_vars, graph_type)
+
+    def time_get_MC_samples(self, num_vars, graph_type):
+        self.module.get_MC_samples(self.gamma, self.theta, num_batches=1, num_graphs=GF_NUM_GRAPHS,
+                                   batch_size=BATCH_SIZE, var_idx=0)
@@ -0,0 +1,124 @@
+"""
+    File name: bench_federated.py
+    Python Version: 3.8
+    Description: Throughput of the server-side locality aggregation and of a complete two-round
+        federated simulation. The simulation trains ENCO with its default iterations on every
+        client and takes about half an hour per case, so it only runs with CFL_BENCHMARK_LARGE=1.
+
+    Usage (from the repository root):
+        $ python benchmarks/run_benchmarks.py --bench bench_federated
+"""
+
+import logging
+import shutil
+import tempfile
+
+import numpy as np
+
+from common import GRAPH_SIZES, GRAPH_TYPES, RUN_LARGE, SEED, get_edge_prob, get_graph, get_graph_params
+from federated.causal_learning import ENCOAlg
+from federated.federated_simulation import FederatedSimulator
+from federated.logging_settings import logger
+
+
+NUM_CLIENTS = 10
+
+
+class AggregationClient:
+    """
+    Stands in for an ENCOAlg client after its local inference, i.e., only holds the
+    matrices and properties read by the aggregation.
+    """
+    def __init__(self, client_id, gamma, theta, interventions_list):
+        self.inferred_existence_mat = gamma
+        self.inferred_orientation_mat = theta
+        self.binary_adjacency_mat = ((gamma > 0) * (theta > 0)).astype(int)
+        self.__client_id = client_id
+        self.__interventions_list = interventions_list
+
+    def get_client_id(self):
+        return self.__client_id
+
+    def get_accessible_percentage(self):
+        return 100
+
+    def get_interventions_list(self):
+        return self.__interventions_list
+
+
+def split_interventions(num_vars, num_clients):
+    """
+    Disjoint, equally sized sets of intervened variables for the clients.
+    """
+    return {cid: [int(v) for v in chunk] for cid, chunk in
+            enumerate(np.array_split(np.arange(num_vars), num_clients))}
+
+
+class TimeLocalityAggregation:
+    """
+    Locality aggregation of the client updates in a round after the first one, i.e., with the
+    aggregated adjacency matrix of the last round as reference.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+
+    def setup(self, num_vars, graph_type):
+        logger.setLevel(logging.ERROR)
+        self.output_dir = tempfile.mkdtemp()
+        interventions_dict = split_interventions(num_vars, NUM_CLIENTS)
+        self.simulator = FederatedSimulator(interventions_dict, num_clients=NUM_CLIENTS,
+                                            output_dir=self.output_dir)
+
+        clients = list()
+        for client_id in range(NUM_CLIENTS):
+            gamma, theta = get_graph_params(num_vars, graph_type, seed=SEED + client_id)
+            clients.append(AggregationClient(client_id, gamma.double().numpy(), theta.double().numpy(),
+                                             interventions_dict[client_id]))
+        self.simulator._FederatedSimulator__clients = clients
+        self.simulator._FederatedSimulator__num_vars = num_vars
+
+        self.simulator.results['round_adjs'].append(get_graph(num_vars, graph_type).adj_matrix.astype(int))
+        self.initial_mass = np.full(NUM_CLIENTS, 16.0)
+
+    def teardown(self, num_vars, graph_type):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def time_locality_aggregation(self, num_vars, graph_type):
+        self.simulator.locality_aggregation(self.initial_mass, alpha=0.2, round_id=1)
+
+
+class TimeFederatedSimulation:
+    """
+    Two federated rounds with two clients and one ENCO epoch per round, from the client setup
+    to the saved results. The global dataset is built once in setup. With a single CPU thread,
+    one run takes about half an hour for 25 variables, so the case is skipped unless
+    CFL_BENCHMARK_LARGE=1 is set.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+    number = 1
+    repeat = 1
+    timeout = 3600
+
+    num_clients = 2
+
+    def setup(self, num_vars, graph_type):
+        if not RUN_LARGE:
+            raise NotImplementedError('Set CFL_BENCHMARK_LARGE=1 to run the federated simulation.')
+        logger.setLevel(logging.ERROR)
+        self.output_dir = tempfile.mkdtemp()
+        self.global_dataset = ENCOAlg.build_global_dataset(obs_data_size=2000 * self.num_clients,
+                                                           int_data_size=100 * num_vars * self.num_clients,
+                                                           num_vars=num_vars, graph_type=graph_type,
+                                                           edge_prob=get_edge_prob(num_vars), seed=SEED)
+
+    def teardown(self, num_vars, graph_type):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def time_two_rounds(self, num_vars, graph_type):
+        simulator = FederatedSimulator(split_interventions(num_vars, self.num_clients),
+                                       num_clients=self.num_clients, num_rounds=2,
+                                       output_dir=self.output_dir)
+        simulator.initialize_clients_data(external_global_dataset=self.global_dataset)
+        simulator.execute_simulation(aggregation_method="locality", num_epochs=1,
+                                     initial_mass=np.full(self.num_clients, 16.0), alpha=0.2)
@@ -0,0 +1,66 @@
+"""
+    File name: bench_graphs.py
+    Python Version: 3.8
+    Description: Throughput of ancestral sampling from a CausalDAG, of the acyclic projection
+        of predicted gamma/theta and of the evaluation metrics.
+
+    Usage (from the repository root):
+        $ python benchmarks/run_benchmarks.py --bench bench_graphs
+"""
+
+import numpy as np
+import torch
+
+from common import GRAPH_SIZES, GRAPH_TYPES, SEED, get_graph, get_graph_params
+from causal_discovery.utils import find_best_acyclic_graph
+from federated.utils import calculate_metrics
+
+
+class TimeCausalDAGSample:
+    """
+    Ancestral sampling of observational data, as for building the global datasets.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+
+    def setup(self, num_vars, graph_type):
+        self.graph = get_graph(num_vars, graph_type)
+        np.random.seed(SEED)
+
+    def time_sample(self, num_vars, graph_type):
+        self.graph.sample(batch_size=1000, as_array=True)
+
+    def time_sample_intervention(self, num_vars, graph_type):
+        self.graph.sample(interventions={self.graph.variables[0].name: np.zeros(1000, dtype=np.int32)},
+                          batch_size=1000, as_array=True)
+
+
+class TimeFindBestAcyclicGraph:
+    """
+    Acyclic projection of noisy predictions, as for the acyclic metrics of each round.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+
+    def setup(self, num_vars, graph_type):
+        gamma, theta = get_graph_params(num_vars, graph_type)
+        self.gamma, self.theta = torch.sigmoid(gamma), torch.sigmoid(theta)
+
+    def time_find_best_acyclic_graph(self, num_vars, graph_type):
+        find_best_acyclic_graph(gamma=self.gamma, theta=self.theta)
+
+
+class TimeCalculateMetrics:
+    """
+    Metrics of a predicted adjacency matrix against the ground truth.
+    """
+    params = [GRAPH_SIZES, GRAPH_TYPES]
+    param_names = ['num_vars', 'graph_type']
+
+    def setup(self, num_vars, graph_type):
+        gamma, theta = get_graph_params(num_vars, graph_type)
+        self.predicted_mat = ((gamma > 0) * (theta > 0)).numpy().astype(int)
+        self.ground_truth = get_graph(num_vars, graph_type).adj_matrix
+
+    def time_calculate_metrics(self, num_vars, graph_type):
+        calculate_metrics(self.predicted_mat, self.ground_truth)
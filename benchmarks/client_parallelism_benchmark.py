@@ -0,0 +1,72 @@
+"""
+    File name: client_parallelism_benchmark.py
+    Python Version: 3.8
+    Description: Throughput of one federated inference stage for a sweep over the number of
+        parallel clients and the threads each client receives from the CPU budget. The
+        sequential path with the default thread count is reported as reference.
+
+    Usage (from the repository root):
+        $ python benchmarks/client_parallelism_benchmark.py --num-clients 1 2 4 8 --threads 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'federated'))
+from federated.federated_simulation import FederatedSimulator
+
+
+def time_inference_stage(num_clients, num_vars, num_epochs, output_dir, client_parallelism,
+                         cpu_budget=None, pin_cpus=False):
+    """
+    Builds a federated setup in which every client can intervene on all variables, and
+    returns the wall-clock time of a single inference stage of all clients.
+    """
+    interventions_dict = {cid: list(range(num_vars)) for cid in range(num_clients)}
+    simulator = FederatedSimulator(interventions_dict, num_clients=num_clients, num_rounds=1,
+                                   output_dir=output_dir, client_parallelism=client_parallelism,
+                                   cpu_budget=cpu_budget, pin_cpus=pin_cpus)
+    simulator.initialize_clients_data(num_vars=num_vars, graph_type="random", edge_prob=0.3,
+                                      obs_data_size=2000 * num_clients, int_data_size=100 * num_vars * num_clients)
+
+    start = time.time()
+    simulator.infer_local_models(None, None, num_epochs)
+    return time.time() - start
+
+
+def run_benchmark(num_clients_list, threads_list, num_vars, num_epochs, pin_cpus):
+    print('%8s %16s %14s %12s %16s' % ('clients', 'threads/client', 'total threads', 'time [s]', 'clients / min'))
+    with tempfile.TemporaryDirectory() as output_dir:
+        for num_clients in num_clients_list:
+            seq_time = time_inference_stage(num_clients, num_vars, num_epochs, output_dir, False)
+            print('%8i %16s %14i %12.2f %16.2f' % (num_clients, 'sequential', torch.get_num_threads(),
+                                                   seq_time, 60 * num_clients / seq_time))
+
+            for num_threads in threads_list:
+                par_time = time_inference_stage(num_clients, num_vars, num_epochs, output_dir, True,
+                                                cpu_budget=num_clients * num_threads, pin_cpus=pin_cpus)
+                print('%8i %16i %14i %12.2f %16.2f' % (num_clients, num_threads, num_clients * num_threads,
+                                                       par_time, 60 * num_clients / par_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the CPU budget division among parallel clients.')
+    parser.add_argument("-nc", "--num-clients", default=[1, 2, 4, 8], type=int, nargs='+',
+                        help="Numbers of parallel clients to benchmark.")
+    parser.add_argument("-t", "--threads", default=[1, 2, 4], type=int, nargs='+',
+                        help="Numbers of threads per client to benchmark.")
+    parser.add_argument("-nv", "--num-vars", default=20, type=int,
+                        help="Size of the graph.")
+    parser.add_argument("-ne", "--num-epochs", default=1, type=int,
+                        help="Number of ENCO epochs of every client.")
+    parser.add_argument("-p", "--pin-cpus", action='store_true',
+                        help="Pin every client to its own CPUs.")
+    args = parser.parse_args()
+
+    run_benchmark(args.num_clients, args.threads, args.num_vars, args.num_epochs, args.pin_cpus)
@@ -0,0 +1,80 @@
+"""
+    File name: common.py
+    Python Version: 3.8
+    Description: Parameters and fixtures shared by the benchmark suite (bench_*.py). The suite
+        follows the asv conventions: classes with a setup method, time_* methods, and params /
+        param_names class attributes. A setup raising NotImplementedError skips a combination.
+        All cases run on the CPU.
+
+    Usage (from the repository root):
+        $ python benchmarks/run_benchmarks.py
+"""
+
+import functools
+import os
+import sys
+
+# Benchmarks are CPU-only, hide GPUs before torch is imported anywhere
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'federated'))
+from causal_graphs.graph_generation import generate_categorical_graph, get_graph_func
+
+
+GRAPH_SIZES = [25, 100, 400]
+GRAPH_TYPES = ['chain', 'jungle', 'random']
+NUM_CATEGS = 10
+SEED = 42
+
+# Cases that take minutes per repeat at the largest sizes only run when this is set
+RUN_LARGE = os.environ.get('CFL_BENCHMARK_LARGE', '0') == '1'
+
+
+def skip_unless_large(num_vars: int, max_default_vars: int):
+    """
+    Skips the calling setup for graphs with more than max_default_vars variables, unless
+    CFL_BENCHMARK_LARGE=1 is set.
+    """
+    if num_vars > max_default_vars and not RUN_LARGE:
+        raise NotImplementedError(f'Set CFL_BENCHMARK_LARGE=1 to run with {num_vars} variables.')
+
+
+def get_edge_prob(num_vars: int) -> float:
+    """
+    Edge probability of random graphs, keeping the expected number of parents bounded for large graphs.
+    """
+    return min(0.3, 10.0 / num_vars)
+
+
+@functools.lru_cache(maxsize=None)
+def get_graph(num_vars: int, graph_type: str):
+    """
+    A categorical CausalDAG with neural conditionals, generated once per process for each size and type.
+    """
+    return generate_categorical_graph(num_vars=num_vars,
+                                      min_categs=NUM_CATEGS,
+                                      max_categs=NUM_CATEGS,
+                                      use_nn=True,
+                                      graph_func=get_graph_func(graph_type),
+                                      edge_prob=get_edge_prob(num_vars),
+                                      seed=SEED)
+
+
+def get_graph_params(num_vars: int, graph_type: str, seed: int = SEED):
+    """
+    Gamma and theta logits as ENCO would predict them for the graph: confident on the true edges,
+    noisy elsewhere, with a diagonal masked like in ENCO.
+    """
+    adj_matrix = get_graph(num_vars, graph_type).adj_matrix.astype(np.float64)
+    rng = np.random.RandomState(seed)
+
+    gamma = rng.normal(-3.0, 2.0, size=(num_vars, num_vars)) + 6.0 * (adj_matrix + adj_matrix.T)
+    np.fill_diagonal(gamma, -9e15)
+    theta = rng.normal(0.0, 2.0, size=(num_vars, num_vars)) + 4.0 * (adj_matrix - adj_matrix.T)
+    theta = np.triu(theta, k=1) - np.triu(theta, k=1).T
+
+    return torch.from_numpy(gamma).float(), torch.from_numpy(theta).float()
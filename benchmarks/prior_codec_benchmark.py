@@ -0,0 +1,86 @@
+"""
+    File name: prior_codec_benchmark.py
+    Python Version: 3.8
+    Description: Bytes exchanged per federated round against the SHD of the aggregated graph
+        for several codecs of the gamma/theta exchange. All codecs run the same simulation, i.e.,
+        the same graph, data and seed.
+
+    Usage (from the repository root):
+        $ python benchmarks/prior_codec_benchmark.py --num-vars 20 --num-rounds 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'federated'))
+from federated.federated_simulation import FederatedSimulator
+from federated.prior_codecs import PriorExchangeCodec
+
+
+CODECS = {
+    'dense-float64': None,
+    'float32': PriorExchangeCodec(dtype='float32'),
+    'float16': PriorExchangeCodec(dtype='float16'),
+    'int8': PriorExchangeCodec(dtype='int8'),
+    'float16-top10%': PriorExchangeCodec(dtype='float16', top_k=0.1),
+    'int8-top10%': PriorExchangeCodec(dtype='int8', top_k=0.1),
+    'int8-threshold0.5': PriorExchangeCodec(dtype='int8', threshold=0.5),
+}
+
+
+def run_simulation(codec, num_vars, num_clients, num_rounds, num_epochs, edge_prob, seed, output_dir):
+    """
+    Runs a federated simulation with naive aggregation and returns its results dictionary.
+    """
+    interventions_dict = {cid: list(range(num_vars)) for cid in range(num_clients)}
+    simulator = FederatedSimulator(interventions_dict, num_clients=num_clients, num_rounds=num_rounds,
+                                   output_dir=output_dir, prior_codec=codec)
+    simulator.initialize_clients_data(num_vars=num_vars, graph_type="random", edge_prob=edge_prob,
+                                      obs_data_size=2000 * num_clients,
+                                      int_data_size=100 * num_vars * num_clients, seed=seed)
+    simulator.execute_simulation(aggregation_method="naive", num_epochs=num_epochs)
+    return simulator.results
+
+
+def run_benchmark(codec_names, num_vars, num_clients, num_rounds, num_epochs, edge_prob, seed):
+    rows = list()
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in codec_names:
+            results = run_simulation(CODECS[name], num_vars, num_clients, num_rounds, num_epochs,
+                                     edge_prob, seed, output_dir)
+            round_bytes = [b['upload'] + b['download'] for b in results['round_bytes']]
+            shds = [metrics['SHD'] for metrics in results['round_metrics']]
+            rows.append((name, np.mean(round_bytes), shds))
+
+    print('%20s %16s %10s   %s' % ('codec', 'bytes / round', 'ratio', 'SHD per round'))
+    dense_bytes = rows[0][1] if codec_names[0] == 'dense-float64' else None
+    for name, mean_bytes, shds in rows:
+        ratio = '%.3f' % (mean_bytes / dense_bytes) if dense_bytes else '-'
+        print('%20s %16.0f %10s   %s' % (name, mean_bytes, ratio, shds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Communication/accuracy tradeoff of the prior exchange codecs.')
+    parser.add_argument("-c", "--codecs", default=list(CODECS.keys()), type=str, nargs='+',
+                        choices=list(CODECS.keys()), help="Codecs to compare, the first one is the reference.")
+    parser.add_argument("-nv", "--num-vars", default=20, type=int,
+                        help="Size of the graph.")
+    parser.add_argument("-nc", "--num-clients", default=2, type=int,
+                        help="Number of clients.")
+    parser.add_argument("-nr", "--num-rounds", default=3, type=int,
+                        help="Number of federated rounds.")
+    parser.add_argument("-ne", "--num-epochs", default=1, type=int,
+                        help="Number of ENCO epochs per round.")
+    parser.add_argument("-ep", "--edge-prob", default=0.3, type=float,
+                        help="Edge probability of the random graph.")
+    parser.add_argument("-s", "--seed", default=0, type=int,
+                        help="Seed of the graph and the data.")
+    args = parser.parse_args()
+
+    run_benchmark(args.codecs, args.num_vars, args.num_clients, args.num_rounds, args.num_epochs,
+                  args.edge_prob, args.seed)
@@ -0,0 +1,198 @@
+"""
+    File name: run_benchmarks.py
+    Python Version: 3.8
+    Description: Runs the benchmark suite (bench_*.py) on the CPU and reports the time per call
+        of every case and parameter combination. Results can be saved as JSON and compared
+        against a saved baseline; the exit status is 1 if any case got slower than the threshold.
+        The bench_*.py files follow the asv conventions, so they can be run with asv as well.
+
+    Usage (from the repository root):
+        $ python benchmarks/run_benchmarks.py --output baseline.json
+        $ python benchmarks/run_benchmarks.py --compare baseline.json --threshold 1.2
+        $ python benchmarks/run_benchmarks.py --bench bench_graphs --sizes 25 100 --filter acyclic
+"""
+
+import argparse
+import contextlib
+import glob
+import importlib
+import inspect
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import sys
+import timeit
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+import common  # Hides the GPUs and sets up the import paths
+import torch
+from federated.thread_budget import apply_thread_limits
+
+
+def get_benchmark_modules(names):
+    """
+    Imports the given benchmark modules, or all bench_*.py files next to this script.
+    """
+    if not names:
+        names = sorted(os.path.splitext(os.path.basename(path))[0]
+                       for path in glob.glob(os.path.join(BENCHMARK_DIR, 'bench_*.py')))
+    return [importlib.import_module(name) for name in names]
+
+
+def get_cases(module):
+    """
+    Yields (name, class, method name, parameter dict) of every time_* method and parameter combination.
+    """
+    for class_name, bench_class in inspect.getmembers(module, inspect.isclass):
+        if bench_class.__module__ != module.__name__:
+            continue
+        methods = sorted(name for name in dir(bench_class) if name.startswith('time_'))
+        params = getattr(bench_class, 'params', [])
+        param_names = getattr(bench_class, 'param_names', [])
+        for values in itertools.product(*params):
+            param_dict = dict(zip(param_names, values))
+            for method in methods:
+                param_str = ', '.join(f'{key}={value!r}' for key, value in param_dict.items())
+                yield f'{module.__name__}.{class_name}.{method}({param_str})', bench_class, method, param_dict
+
+
+def time_case(bench_class, method, param_dict, min_time, default_repeat):
+    """
+    Times one case. The number of calls per repeat is chosen such that a repeat takes
+    at least min_time seconds, unless the class fixes it with the number attribute.
+
+    Returns
+    -------
+    Dictionary with the min and median time per call in seconds, None if the case was skipped,
+    or the error message if it failed.
+    """
+    bench = bench_class()
+    args = list(param_dict.values())
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            if hasattr(bench, 'setup'):
+                bench.setup(*args)
+        except NotImplementedError:
+            return None
+        except Exception as e:
+            return {'error': f'{type(e).__name__} in setup: {e}'}
+
+        try:
+            timer = timeit.Timer(lambda: getattr(bench, method)(*args))
+            number = getattr(bench, 'number', 0)
+            if number <= 0:
+                # The first call doubles as warm-up
+                first_call = timer.timeit(number=1)
+                number = max(1, int(np.ceil(min_time / max(first_call, 1e-9))))
+            repeat = getattr(bench, 'repeat', default_repeat)
+            times = np.array(timer.repeat(repeat=repeat, number=number)) / number
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            if hasattr(bench, 'teardown'):
+                bench.teardown(*args)
+
+    return {'min': float(times.min()), 'median': float(np.median(times)), 'number': number, 'repeat': repeat}
+
+
+def format_time(seconds):
+    for unit, scale in [('s', 1.0), ('ms', 1e-3), ('us', 1e-6)]:
+        if seconds >= scale:
+            return '%.3f%s' % (seconds / scale, unit)
+    return '%.1fns' % (seconds / 1e-9)
+
+
+def run_benchmarks(args):
+    apply_thread_limits(args.threads)
+    results, failures = dict(), list()
+    for module in get_benchmark_modules(args.bench):
+        for name, bench_class, method, param_dict in get_cases(module):
+            if args.filter and not re.search(args.filter, name):
+                continue
+            if 'num_vars' in param_dict and param_dict['num_vars'] not in args.sizes:
+                continue
+            if 'graph_type' in param_dict and param_dict['graph_type'] not in args.graph_types:
+                continue
+
+            result = time_case(bench_class, method, param_dict, args.min_time, args.repeat)
+            if result is None:
+                print('%-100s %12s' % (name, 'skipped'), flush=True)
+                continue
+            if 'error' in result:
+                failures.append(name)
+                print('%-100s %12s  %s' % (name, 'failed', result['error'][:200]), flush=True)
+                continue
+            results[name] = result
+            print('%-100s %12s' % (name, format_time(result['min'])), flush=True)
+    return results, failures
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Prints the ratio of the min times to the baseline and returns the names of the regressed cases.
+    """
+    regressions = list()
+    print('\n%-100s %12s %12s %8s' % ('case', 'baseline', 'current', 'ratio'))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['min'] / baseline[name]['min']
+        flag = ''
+        if ratio > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('%-100s %12s %12s %8.2f%s' % (name, format_time(baseline[name]['min']),
+                                           format_time(result['min']), ratio, flag))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the CPU benchmark suite.')
+    parser.add_argument("-b", "--bench", default=None, type=str, nargs='+',
+                        help="Benchmark modules to run, e.g., bench_enco. Defaults to all bench_*.py files.")
+    parser.add_argument("-f", "--filter", default=None, type=str,
+                        help="Only run cases whose name matches this regular expression.")
+    parser.add_argument("-s", "--sizes", default=common.GRAPH_SIZES, type=int, nargs='+',
+                        help="Graph sizes to run.")
+    parser.add_argument("-gt", "--graph-types", default=common.GRAPH_TYPES, type=str, nargs='+',
+                        help="Graph types to run.")
+    parser.add_argument("-t", "--threads", default=1, type=int,
+                        help="Number of torch and BLAS threads, fixed for comparable timings.")
+    parser.add_argument("-r", "--repeat", default=5, type=int,
+                        help="Number of repeats, the reported time is the minimum over them.")
+    parser.add_argument("-mt", "--min-time", default=0.2, type=float,
+                        help="Minimum duration of a repeat in seconds.")
+    parser.add_argument("-o", "--output", default=None, type=str,
+                        help="Save the results as JSON.")
+    parser.add_argument("-c", "--compare", default=None, type=str,
+                        help="JSON results of an earlier run to compare against.")
+    parser.add_argument("-th", "--threshold", default=1.2, type=float,
+                        help="Ratio to the baseline above which a case counts as regression.")
+    args = parser.parse_args()
+
+    results, failures = run_benchmarks(args)
+
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump({'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+                                   'python': platform.python_version(), 'torch': torch.__version__,
+                                   'numpy': np.__version__, 'threads': args.threads},
+                       'results': results}, output_file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} case(s) slower than {args.threshold}x the baseline.')
+            sys.exit(1)
+
+    if failures:
+        print(f'\n{len(failures)} case(s) failed.')
+        sys.exit(1)
@@ -0,0 +1,236 @@
+"""
+Projection of a predicted (possibly cyclic) graph onto an acyclic graph. The graph is
+decomposed into its strongly connected components (SCCs), since only nodes that share
+an SCC can lie on a common cycle. For every SCC, we search for the variable order that
+maximizes the summed log orientation probabilities of theta, exactly for small SCCs
+(dynamic programming over subsets) and with a feedback arc set heuristic otherwise.
+All functions operate on NumPy arrays.
+"""
+import numpy as np
+
+
+def strongly_connected_components(adj_matrix):
+    """
+    Returns the strongly connected components of a graph using an iterative version of
+    Tarjan's algorithm. Each component is returned as a sorted array of node indices.
+
+    Parameters
+    ----------
+    adj_matrix : np.ndarray, shape [num_vars, num_vars], type np.bool
+                 Adjacency matrix where an entry (i,j) represents an edge i->j.
+    """
+    num_vars = adj_matrix.shape[0]
+    children = [np.nonzero(adj_matrix[i])[0] for i in range(num_vars)]
+    index = np.full(num_vars, -1, dtype=np.int64)
+    lowlink = np.zeros(num_vars, dtype=np.int64)
+    on_stack = np.zeros(num_vars, dtype=bool)
+    stack, components = [], []
+    next_index = 0
+
+    for root in range(num_vars):
+        if index[root] >= 0:
+            continue
+        # Each frame holds a node and the position of the next child to visit
+        work = [(root, 0)]
+        while len(work) > 0:
+            node, child_pos = work.pop()
+            if child_pos == 0:
+                index[node] = lowlink[node] = next_index
+                next_index += 1
+                stack.append(node)
+                on_stack[node] = True
+            recurse = False
+            node_children = children[node]
+            while child_pos < len(node_children):
+                c = node_children[child_pos]
+                child_pos += 1
+                if index[c] < 0:
+                    work.append((node, child_pos))
+                    work.append((c, 0))
+                    recurse = True
+                    break
+                elif on_stack[c]:
+                    lowlink[node] = min(lowlink[node], index[c])
+            if recurse:
+                continue
+            if lowlink[node] == index[node]:  # Node is the root of a component
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp.append(w)
+                    if w == node:
+                        break
+                components.append(np.sort(np.array(comp, dtype=np.int64)))
+            if len(work) > 0:  # Propagate lowlink to the parent frame
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+    return components
+
+
+def order_score(log_probs, order):
+    """
+    Returns the score of a variable order, i.e., the sum of log_probs[i,j] over all
+    pairs where i comes before j in the order.
+    """
+    order = np.asarray(order)
+    return np.triu(log_probs[order][:, order], k=1).sum()
+
+
+def find_best_order_exact(log_probs):
+    """
+    Finds the order maximizing 'order_score' by dynamic programming over subsets. The best
+    score of a set S is the best score of S without v plus the log-probabilities of all
+    edges into v, maximized over the last node v. Runs in O(2^n * n) and is therefore
+    only used for small components.
+    """
+    n = log_probs.shape[0]
+    if n <= 1:
+        return np.arange(n)
+    num_masks = 1 << n
+    masks = np.arange(num_masks, dtype=np.int64)
+    bits = ((masks[:, None] >> np.arange(n)) & 1).astype(bool)
+    # in_scores[S, v] = sum of log_probs[u, v] for u in S
+    in_scores = bits.astype(log_probs.dtype) @ log_probs
+    popcount = bits.sum(axis=1)
+
+    best = np.full(num_masks, -np.inf)
+    best[0] = 0.0
+    last_node = np.zeros(num_masks, dtype=np.int64)
+    for size in range(1, n+1):
+        layer = masks[popcount == size]
+        layer_bits = bits[layer]
+        prev = layer[:, None] ^ (1 << np.arange(n))[None, :]
+        cand = best[prev] + in_scores[prev, np.arange(n)[None, :]]
+        cand[~layer_bits] = -np.inf
+        last_node[layer] = cand.argmax(axis=1)
+        best[layer] = cand.max(axis=1)
+
+    # Backtrack the order from the full set
+    order = []
+    mask = num_masks - 1
+    while mask > 0:
+        v = last_node[mask]
+        order.append(v)
+        mask ^= (1 << v)
+    return np.array(order[::-1], dtype=np.int64)
+
+
+def find_order_greedy_fas(log_probs):
+    """
+    Weighted version of the Eades-Lin-Smyth heuristic for the minimum feedback arc set.
+    Sources are repeatedly moved to the front and sinks to the back. If neither exists,
+    the node with the largest difference between outgoing and incoming preference
+    is moved to the front.
+    """
+    n = log_probs.shape[0]
+    pref = log_probs - log_probs.T  # pref[i,j] > 0 => i before j is preferred
+    remaining = np.ones(n, dtype=bool)
+    front, back = [], []
+    while remaining.any():
+        sub = pref[remaining][:, remaining]
+        nodes = np.nonzero(remaining)[0]
+        outgoing = (sub > 0).any(axis=1)
+        incoming = (sub > 0).any(axis=0)
+        sinks = nodes[~outgoing]
+        if len(sinks) > 0:
+            back += sinks.tolist()
+            remaining[sinks] = False
+            continue
+        sources = nodes[~incoming]
+        if len(sources) > 0:
+            front += sources.tolist()
+            remaining[sources] = False
+            continue
+        v = nodes[sub.sum(axis=1).argmax()]
+        front.append(v)
+        remaining[v] = False
+    return np.array(front + back[::-1], dtype=np.int64)
+
+
+def improve_order_by_insertion(log_probs, order, max_sweeps=20):
+    """
+    Local search on a variable order. In every sweep, each node is removed from the order
+    and reinserted at the position that maximizes the score. Stops when a sweep does not
+    improve the score anymore, or after 'max_sweeps' sweeps.
+    """
+    order = list(order)
+    n = len(order)
+    for _ in range(max_sweeps):
+        improved = False
+        for v in list(order):
+            pos = order.index(v)
+            rest = order[:pos] + order[pos+1:]
+            into_v = log_probs[rest, v]
+            from_v = log_probs[v, rest]
+            # Score of v at position t: v after rest[:t] and before rest[t:]
+            gains = np.concatenate([[0.0], np.cumsum(into_v)]) + \
+                np.concatenate([np.cumsum(from_v[::-1])[::-1], [0.0]])
+            best_pos = int(gains.argmax())
+            if gains[best_pos] > gains[pos] + 1e-12:
+                order = rest[:best_pos] + [v] + rest[best_pos:]
+                improved = True
+        if not improved or n <= 2:
+            break
+    return np.array(order, dtype=np.int64)
+
+
+def find_best_order(log_probs, max_exact_size=12):
+    """
+    Returns the order of the nodes in a component that maximizes the summed log orientation
+    probabilities. Components up to 'max_exact_size' nodes are solved exactly. For larger ones,
+    the greedy feedback arc set order and the index order are both refined by insertion
+    moves, and the better of both is returned.
+    """
+    n = log_probs.shape[0]
+    if n <= max_exact_size:
+        return find_best_order_exact(log_probs)
+    candidates = [improve_order_by_insertion(log_probs, find_order_greedy_fas(log_probs)),
+                  improve_order_by_insertion(log_probs, np.arange(n))]
+    scores = [order_score(log_probs, o) for o in candidates]
+    return candidates[int(np.argmax(scores))]
+
+
+def project_orientations(gamma, theta, max_exact_size=12):
+    """
+    Returns a copy of the orientation probabilities theta in which all pairs within a strongly
+    connected component of the predicted graph are set to 0/1 according to the best order of
+    that component. Edges between components already follow the acyclic condensation of the
+    graph and are left unchanged.
+
+    Parameters
+    ----------
+    gamma : np.ndarray, shape [num_vars, num_vars]
+            Edge existence probabilities, i.e., sigmoid of the gamma parameters.
+    theta : np.ndarray, shape [num_vars, num_vars]
+            Edge orientation probabilities, i.e., sigmoid of the theta parameters.
+    max_exact_size : int
+                     Largest component size for which the optimal order is determined exactly.
+    """
+    gamma = np.asarray(gamma)
+    theta = np.array(theta, dtype=np.float64)
+    hard_matrix = (gamma > 0.5) * (theta > 0.5)
+    # For numerical stability, we add the log probabilities instead of
+    # multiplying the raw probabilities
+    log_theta = np.log(theta + 1e-10)
+    if np.isnan(log_theta).any():
+        print('Found some NaNs...', log_theta)
+
+    for comp in strongly_connected_components(hard_matrix):
+        if len(comp) < 2:
+            continue
+        order = comp[find_best_order(log_theta[comp][:, comp], max_exact_size=max_exact_size)]
+        rank = np.empty(theta.shape[0], dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        theta[np.ix_(comp, comp)] = (rank[comp][:, None] < rank[comp][None, :])
+    return theta
+
+
+def project_to_acyclic(gamma, theta, max_exact_size=12):
+    """
+    Given the edge existence probabilities gamma and orientation probabilities theta,
+    returns the most likely acyclic graph as binary adjacency matrix of type np.bool.
+    See 'project_orientations' for details.
+    """
+    theta = project_orientations(gamma, theta, max_exact_size=max_exact_size)
+    return (np.asarray(gamma) > 0.5) * (theta > 0.5)
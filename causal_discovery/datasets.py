@@ -2,6 +2,10 @@ import torch
 import torch.utils.data as data
 import numpy as np
 import time
+import sys
+sys.path.append("../")
+
+from causal_graphs.graph_utils import compact_categorical_data
 
 
 class ObservationalCategoricalData(data.Dataset):
@@ -158,8 +162,13 @@ class InterventionalDataset(object):
 
 
 def correct_data_types(data):
-    if data.dtype in [torch.uint8, torch.int16, torch.int32]:
-        data = data.long()
+    """
+    Brings a dataset tensor into its storage type. Categorical data is kept in the
+    smallest integer type that fits (usually uint8), and is only widened to long
+    per batch right before the embedding lookup. Continuous data is cast to float32.
+    """
+    if data.dtype in [torch.int32, torch.long]:
+        data = torch.from_numpy(compact_categorical_data(data.numpy()))
     elif data.dtype in [torch.float16, torch.float64]:
         data = data.float()
     return data
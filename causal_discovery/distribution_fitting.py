@@ -88,8 +88,8 @@ class DistributionFitting(object):
         mask_adj_matrices = adj_matrices.transpose(1, 2)
         preds = self.model(inputs, mask=mask_adj_matrices)
 
-        if inputs.dtype == torch.long:
-            loss = self.loss_module(preds.flatten(0,-2), inputs.reshape(-1))
+        if not inputs.is_floating_point():  # Categorical inputs are stored in compact integer types
+            loss = self.loss_module(preds.flatten(0,-2), inputs.reshape(-1).long())
         else:  # If False, our input was continuous, and we return log likelihoods as preds
             loss = preds.mean()
 
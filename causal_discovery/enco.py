@@ -4,6 +4,7 @@ import torch.utils.data as data
 import numpy as np
 import time
 import sys
+from contextlib import nullcontext
 sys.path.append("../")
 
 from causal_discovery.distribution_fitting import DistributionFitting
@@ -15,6 +16,13 @@ from causal_discovery.datasets import ObservationalCategoricalData
 from causal_discovery.optimizers import AdamTheta, AdamGamma
 
 
+def no_stage_timer(name, **attributes):
+    """
+    Default stage timer of ENCO, which does not record anything.
+    """
+    return nullcontext()
+
+
 class ENCO(object):
 
     def __init__(self,
@@ -42,7 +50,8 @@ class ENCO(object):
                  theta_only_iters=1000,
                  max_graph_stacking=200,
                  sample_size_obs=1000000,
-                 sample_size_inters=20000):
+                 sample_size_inters=20000,
+                 stage_timer=None):
         """
         Creates ENCO object for performing causal structure learning.
 
@@ -116,6 +125,10 @@ class ENCO(object):
                          from. This should be used to apply ENCO on intervention sets on a subset of
                          the variable set. If None, an empty list will be assumed, i.e., interventions
                          on all variables will be used.
+        stage_timer : callable
+                      Called as stage_timer(name, epoch=epoch) around the distribution and graph
+                      fitting stages, and must return a context manager, e.g., the stage method of
+                      a profiler. If None, the stages are not recorded.
         """
         self.graph = graph
         self.num_vars = graph.num_vars
@@ -167,6 +180,10 @@ class ENCO(object):
         self.metric_log = []
         self.iter_time = -1
         self.dist_fit_time = -1
+        self.epochs_run = 0
+        self.convergence_log = []
+
+        self.stage_timer = stage_timer if stage_timer is not None else no_stage_timer
 
         # Some debugging info for user
         print(f'Distribution fitting model:\n{str(model)}')
@@ -195,24 +212,48 @@ class ENCO(object):
 
         self.theta_optimizer = AdamTheta(self.theta, lr=lr_theta, beta1=betas_theta[0], beta2=betas_theta[1])
 
-    def discover_graph(self, num_epochs=30, stop_early=False):
+    def discover_graph(self, num_epochs=30, stop_early=False, convergence_tol=None, convergence_patience=2):
         """
         Main training function. It starts the loop of distribution and graph fitting.
         Returns the predicted binary adjacency matrix.
+
+        Parameters
+        ----------
+        num_epochs : int
+                     Maximum number of epochs to train.
+        stop_early : bool
+                     If True, training stops once the prediction has been correct for 5 epochs.
+                     This requires the ground truth graph and is meant for prototyping.
+        convergence_tol : float
+                          If not None, training stops once the binary adjacency matrix has not changed and
+                          no edge probability sigmoid(gamma) or sigmoid(theta) has changed by more than
+                          this value for convergence_patience consecutive epochs. Unlike stop_early,
+                          this criterion does not use the ground truth graph.
+        convergence_patience : int
+                               Number of consecutive converged epochs before stopping.
         """
         num_stops = 0
+        num_converged = 0
+        self.epochs_run = 0
+        self.convergence_log = []
         for epoch in track(range(num_epochs), leave=False, desc="Epoch loop"):
             self.epoch = epoch
             start_time = time.time()
+            if convergence_tol is not None:
+                last_state = self.get_convergence_state()
 
             # Update Model
-            self.distribution_fitting_step()
+            with self.stage_timer('distribution_fitting', epoch=epoch):
+                self.distribution_fitting_step()
             self.dist_fit_time = time.time() - start_time
 
             # Update graph parameters
-            self.graph_fitting_step()
+            with self.stage_timer('graph_fitting', epoch=epoch):
+                self.graph_fitting_step()
             self.iter_time = time.time() - start_time
 
+            self.epochs_run = epoch + 1
+
             # Print stats
             self.print_graph_statistics(epoch=epoch+1, log_metrics=True)
 
@@ -225,6 +266,17 @@ class ENCO(object):
             else:
                 num_stops = 0
 
+            # Early stopping if the graph parameters stopped moving
+            if convergence_tol is not None:
+                deltas = self.get_convergence_deltas(*last_state)
+                self.convergence_log.append(deltas)
+                converged = (deltas["adj_changes"] == 0 and deltas["gamma_delta"] <= convergence_tol
+                             and deltas["theta_delta"] <= convergence_tol)
+                num_converged = num_converged + 1 if converged else 0
+                if num_converged >= convergence_patience:
+                    print("Stopping early due to convergence after %i of %i epochs" % (epoch+1, num_epochs))
+                    break
+
     def distribution_fitting_step(self):
         """
         Performs on iteration of distribution fitting.
@@ -261,6 +313,25 @@ class ENCO(object):
                     self.gamma_optimizer.step()
             self.theta_optimizer.step(theta_mask)
 
+    @torch.no_grad()
+    def get_convergence_state(self):
+        """
+        Returns the edge probabilities sigmoid(gamma), sigmoid(theta) and the binary adjacency matrix,
+        which are compared across epochs to detect convergence.
+        """
+        return torch.sigmoid(self.gamma).clone(), torch.sigmoid(self.theta).clone(), self.get_binary_adjmatrix()
+
+    @torch.no_grad()
+    def get_convergence_deltas(self, last_gamma_probs, last_theta_probs, last_adj_matrix):
+        """
+        Returns the largest absolute change of the edge probabilities of gamma and theta, and the number
+        of changed edges of the binary adjacency matrix, since the given state of get_convergence_state.
+        """
+        gamma_probs, theta_probs, adj_matrix = self.get_convergence_state()
+        return {"gamma_delta": (gamma_probs - last_gamma_probs).abs().max().item(),
+                "theta_delta": (theta_probs - last_theta_probs).abs().max().item(),
+                "adj_changes": (adj_matrix != last_adj_matrix).sum().item()}
+
     def get_gamma_matrix(self):
         """
         Returns the predicted, gamma matrix of the causal graph.
@@ -247,7 +247,7 @@ class GraphFitting(object):
         theta_zero_mask = self.theta_grad_mask.clone().to(theta_grads.device)
         theta_zero_mask[var_idx] = 1.
         theta_grads *= theta_zero_mask
-        theta_grads -= theta_grads.transpose(0, 1)  # theta_ij = -theta_ji
+        theta_grads = theta_grads - theta_grads.transpose(0, 1)  # theta_ij = -theta_ji
 
         # Creating a mask which theta's are actually updated for the optimizer
         # 0.1 multiplier reduces learning rate for variables without interventions
@@ -302,9 +302,9 @@ class GraphFitting(object):
         preds = self.model(int_sample, mask=mask_adj_matrix)
 
         # Evaluate negative log-likelihood of predictions
-        if int_sample.dtype == torch.long:
+        if not int_sample.is_floating_point():  # Categorical inputs are stored in compact integer types
             preds = preds.flatten(0, 1)
-            labels = int_sample.clone()
+            labels = int_sample.to(torch.long, copy=True)
             labels[:, var_idx] = -1  # Perfect interventions => no predictions of the intervened variable
             labels = labels.reshape(-1)
             nll = F.cross_entropy(preds, labels, reduction='none', ignore_index=-1)
@@ -252,8 +252,9 @@ class EmbedLayer(nn.Module):
             assert x.shape[-2] == self.num_vars
 
         # Number of variables
+        # Categorical inputs are stored in compact integer types and only widened here for indexing
         pos_trans = self.pos_trans.view((1,)*(len(x.shape)-2) + (self.num_vars, self.num_vars))
-        x = x + pos_trans
+        x = x.long() + pos_trans
 
         if self.sparse_embeds:
             # Selects the non-zero embedding tensors and stores them in a separate tensor instead of masking.
@@ -7,12 +7,13 @@ handling.
 """
 import torch
 import numpy as np
-from copy import deepcopy
+from copy import copy
 import importlib
 import sys
 sys.path.append("../")
 
-from causal_graphs.graph_utils import adj_matrix_to_edges, edges_or_adj_matrix, sort_graph_by_vars, get_node_relations
+from causal_graphs.graph_utils import adj_matrix_to_edges, edges_or_adj_matrix, sort_graph_by_vars, get_node_relations, \
+    compact_categorical_data
 from causal_graphs.variable_distributions import ProbDist, ConstantDist, CategoricalDist, DiscreteProbDist, ContinuousProbDist
 
 
@@ -168,16 +169,23 @@ class CausalDAG(object):
                         interventions[variable_name] is a ProbDist object. Otherwise, it is assumed to be
                         a constant value and is assigned a ConstantDist object.
         """
-        intervened_graph = deepcopy(self)
+        # Only the intervened variables are replaced, all others are shared with this graph
+        intervened_graph = copy(self)
+        intervened_graph.variables = list(self.variables)
+        intervened_graph.adj_matrix = np.copy(self.adj_matrix)
+        var_idxs = {v.name: idx for idx, v in enumerate(self.variables)}
         for v_name in interventions:
-            v_idx = [idx for idx, v in enumerate(intervened_graph.variables) if v.name == v_name][0]
+            v_idx = var_idxs[v_name]
             if isinstance(interventions[v_name], ProbDist):
-                intervened_graph.variables[v_idx].prob_dist = interventions[v_name]
+                prob_dist = interventions[v_name]
             else:
                 intervened_graph.adj_matrix[:, v_idx] = False
-                intervened_graph.variables[v_idx].prob_dist = ConstantDist(interventions[v_name])
+                prob_dist = ConstantDist(interventions[v_name])
+            intervened_graph.variables[v_idx] = CausalVariable(v_name, prob_dist)
+        intervened_graph.name_to_var = {v.name: v for v in intervened_graph.variables}
         intervened_graph.edges = adj_matrix_to_edges(intervened_graph.adj_matrix)
-        intervened_graph._sort_variables()
+        # The variables are already in causal order, and removing edges keeps it valid
+        intervened_graph.sorted_idxs = list(range(self.num_vars))
         return intervened_graph
 
     def __str__(self):
@@ -239,14 +247,13 @@ class CausalDAGDataset(CausalDAG):
         """
         A CausalDAG but with existing pre-sampled data and unknown conditional distributions.
         """
-        if data_obs.dtype in [np.uint8, np.int16, np.int64]:
-            data_obs = data_obs.astype(np.int32)
-        if data_int.dtype in [np.uint8, np.int16, np.int64]:
-            data_int = data_int.astype(np.int32)
+        # Categorical data is stored in the smallest integer type that fits (usually uint8)
+        data_obs = compact_categorical_data(data_obs)
+        data_int = compact_categorical_data(data_int)
 
-        if data_obs.dtype == np.int32:
+        if np.issubdtype(data_obs.dtype, np.integer):
             num_categs = data_obs.max(axis=-1)
-            new_dist = lambda i : CategoricalDist(num_categs[i]+1, None)
+            new_dist = lambda i : CategoricalDist(int(num_categs[i])+1, None)
         elif data_obs.dtype == np.float32:
             new_dist = lambda i : ContinuousProbDist()
         else:
@@ -256,7 +263,7 @@ class CausalDAGDataset(CausalDAG):
         super().__init__(variables=variables, adj_matrix=adj_matrix, latents=latents)
         self.data_obs = data_obs[:,self.sorted_idxs]  # Observational dataset, shape [num_samples, num_vars]
         self.data_int = data_int[self.sorted_idxs][...,self.sorted_idxs]  # Interventional dataset, shape [num_vars, num_samples, num_vars]. First dim is the intervened variable.
-        self.is_categorical = (self.data_obs.dtype == np.int32)
+        self.is_categorical = np.issubdtype(self.data_obs.dtype, np.integer)
         self.exclude_inters = exclude_inters
 
     def sample(self, *args, **kwargs):
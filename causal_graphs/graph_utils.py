@@ -2,8 +2,18 @@
 Utility functions for the graphs, such as edge<->adj_matrix conversion
 and sorting variables according to the global causal order.
 """
+import hashlib
+import heapq
+from collections import OrderedDict
+
 import numpy as np
 
+# Causal orders and node relations only depend on the graph structure. Since every client
+# in the federated setup builds a graph with the same adjacency matrix, they are cached
+# here (least recently used entries are evicted first).
+STRUCTURE_CACHE_SIZE = 64
+_STRUCTURE_CACHE = OrderedDict()
+
 
 def adj_matrix_to_edges(adj_matrix):
     """
@@ -40,49 +50,122 @@ def edges_or_adj_matrix(edges, adj_matrix, num_vars):
     return edges, adj_matrix
 
 
+def get_causal_order(adj_matrix, latents=None):
+    """
+    Determines a causal order of the variables with Kahn's algorithm. Among all nodes
+    without unsorted parents, the one with the smallest index is taken first, which gives
+    a deterministic order independent of the implementation. If latent confounders are
+    given, the first latent variable is placed first. Results are cached per graph structure.
+
+    Parameters
+    ----------
+    adj_matrix : np.ndarray, shape [num_vars, num_vars], type np.bool
+                 The adjacency matrix of the graph.
+    latents : np.ndarray, shape [num_latents, 3]
+              Latent confounders of the graph as used in CausalDAG, or None.
+
+    Returns
+    -------
+    sorted_idxs : list[int]
+                  The variable indices in causal order.
+    """
+    adj_matrix = np.asarray(adj_matrix).astype(bool)
+    first_node = None
+    if latents is not None and latents.shape[0] > 0 and latents[0, 0] >= 0:
+        first_node = int(latents[0, 0])
+
+    cache_key = ("causal_order", _get_structure_hash(adj_matrix), first_node)
+    if cache_key in _STRUCTURE_CACHE:
+        _STRUCTURE_CACHE.move_to_end(cache_key)
+        return list(_STRUCTURE_CACHE[cache_key])
+
+    num_vars = adj_matrix.shape[0]
+    children = [np.nonzero(adj_matrix[i])[0] for i in range(num_vars)]
+    in_degree = adj_matrix.sum(axis=0)
+    is_sorted = np.zeros(num_vars, dtype=bool)
+    sorted_idxs = []
+    empty_nodes = np.nonzero(in_degree == 0)[0].tolist()
+    heapq.heapify(empty_nodes)
+
+    def add_node(node):
+        sorted_idxs.append(node)
+        is_sorted[node] = True
+        for c in children[node]:
+            in_degree[c] -= 1
+            if in_degree[c] == 0 and not is_sorted[c]:
+                heapq.heappush(empty_nodes, int(c))
+
+    if first_node is not None:
+        add_node(first_node)
+    while len(empty_nodes) > 0:
+        node = heapq.heappop(empty_nodes)
+        if not is_sorted[node]:
+            add_node(node)
+    assert len(sorted_idxs) == num_vars, "Sorting the graph failed because it is not a DAG!"
+
+    _add_to_structure_cache(cache_key, tuple(sorted_idxs))
+    return sorted_idxs
+
+
 def sort_graph_by_vars(variables, edges=None, adj_matrix=None, latents=None):
     """
     Takes a list of variables and graph structure, and determines the causal order of the variable, 
     i.e., an order in which we can perform ancestral sampling. Returns the newly sorted graph structure.
     """
     edges, adj_matrix = edges_or_adj_matrix(edges, adj_matrix, len(variables))
-    matrix_copy = np.copy(adj_matrix)
-
-    sorted_idxs = []
-
-    def get_empty_nodes():
-        return [i for i in np.where(~matrix_copy.any(axis=0))[0] if i not in sorted_idxs]
-
-    if latents is None or latents.shape[0] == 0 or latents[0, 0] < 0:
-        empty_nodes = get_empty_nodes()
-    else:
-        empty_nodes = [latents[i, 0] for i in range(latents.shape[0])]
-    while len(empty_nodes) > 0:
-        node = empty_nodes.pop(0)
-        sorted_idxs.append(node)
-        matrix_copy[node, :] = False
-        empty_nodes = get_empty_nodes()
-    assert not matrix_copy.any(), "Sorting the graph failed because it is not a DAG!"
+    sorted_idxs = get_causal_order(adj_matrix, latents)
 
     variables = [variables[i] for i in sorted_idxs]
     adj_matrix = adj_matrix[sorted_idxs][:, sorted_idxs]
 
-    num_vars = len(variables)
-    edges = edges - num_vars  # To have a better replacement
-    if latents is not None:
-        latents = latents - num_vars
-    for v_idx, n_idx in enumerate(sorted_idxs):
-        edges[edges == (n_idx - num_vars)] = v_idx
-        if latents is not None:
-            latents[latents == (n_idx - num_vars)] = v_idx
+    # Map every old variable index to its position in the causal order
+    new_idxs = np.empty(len(variables), dtype=np.int64)
+    new_idxs[sorted_idxs] = np.arange(len(variables))
+    if edges.size > 0:
+        edges = new_idxs[edges].astype(edges.dtype)
 
     if latents is not None:
+        if latents.size > 0:
+            latents = new_idxs[latents].astype(latents.dtype)
         latents[:, 1:] = np.sort(latents[:, 1:], axis=-1)
         return variables, edges, adj_matrix, latents, sorted_idxs
     else:
         return variables, edges, adj_matrix, sorted_idxs
 
 
+def transitive_closure(adj_matrix, reflexive=True):
+    """
+    Returns the reachability matrix of a graph, computed by repeated squaring of the
+    boolean adjacency matrix. Each squaring doubles the path length covered, so only
+    O(log num_vars) matrix products are needed, and no recursion is involved.
+
+    Parameters
+    ----------
+    adj_matrix : np.ndarray, shape [num_vars, num_vars], type np.bool
+                 The adjacency matrix of the graph.
+    reflexive : bool
+                If True, every node is considered reachable from itself (paths of length zero).
+
+    Returns
+    -------
+    reachable : np.ndarray, shape [num_vars, num_vars], type np.bool
+                A matrix where an element (i,j) is True if there is a directed path from i to j.
+    """
+    reachable = np.asarray(adj_matrix).astype(bool)
+    num_vars = reachable.shape[0]
+    path_length = 1
+    while path_length < num_vars:
+        step = reachable.astype(np.float32)
+        new_reachable = reachable | ((step @ step) > 0)
+        if (new_reachable == reachable).all():
+            break
+        reachable = new_reachable
+        path_length *= 2
+    if reflexive:
+        reachable = reachable | np.eye(num_vars, dtype=bool)
+    return reachable
+
+
 def get_node_relations(adj_matrix):
     """
     Returns a matrix which describes the relations fo each node pair beyond parent-child relations.
@@ -101,14 +184,13 @@ def get_node_relations(adj_matrix):
                        node_relations[i,j] = 0: j and i are independent conditioned on the empty set
                        node_relations[i,j] = 2: j and i share a confounder
     """
+    cache_key = ("node_relations", _get_structure_hash(adj_matrix))
+    if cache_key in _STRUCTURE_CACHE:
+        _STRUCTURE_CACHE.move_to_end(cache_key)
+        return _STRUCTURE_CACHE[cache_key].copy()
+
     # Find all ancestor-descendant relations
-    ancestors = adj_matrix.T
-    changed = True
-    while changed: 
-        new_anc = np.logical_and(ancestors[..., None], ancestors[None]).any(axis=1)
-        new_anc = np.logical_or(ancestors, new_anc)
-        changed = not (new_anc == ancestors).all().item()
-        ancestors = new_anc
+    ancestors = transitive_closure(adj_matrix, reflexive=False).T
 
     # Output: matrix with (i,j)
     #         = 1: j is an ancestor of i
@@ -118,8 +200,48 @@ def get_node_relations(adj_matrix):
     ancestors = ancestors.astype(np.int32)
     descendant = ancestors.T
     node_relations = ancestors - descendant
-    confounder = (node_relations == 0) * ((ancestors[None] * ancestors[:, None]).sum(axis=-1) > 0)
+    shared_ancestors = ancestors.astype(np.float32) @ ancestors.T.astype(np.float32)
+    confounder = (node_relations == 0) * (shared_ancestors > 0)
     node_relations += 2 * confounder
     node_relations[np.arange(node_relations.shape[0]), np.arange(node_relations.shape[1])] = 0
 
+    _add_to_structure_cache(cache_key, node_relations.copy())
     return node_relations
+
+
+def _get_structure_hash(adj_matrix):
+    """
+    Returns a key identifying the structure of a graph, used for caching results
+    that only depend on the adjacency matrix.
+    """
+    adj_matrix = np.ascontiguousarray(np.asarray(adj_matrix).astype(bool))
+    return (adj_matrix.shape, hashlib.sha1(adj_matrix.tobytes()).hexdigest())
+
+
+def _add_to_structure_cache(key, value):
+    _STRUCTURE_CACHE[key] = value
+    while len(_STRUCTURE_CACHE) > STRUCTURE_CACHE_SIZE:
+        _STRUCTURE_CACHE.popitem(last=False)
+
+
+def get_compact_int_dtype(max_value):
+    """
+    Returns the smallest integer type that can store categorical values in the range [0, max_value].
+    Categorical datasets are kept in this type and only widened to long per batch.
+    """
+    if max_value <= np.iinfo(np.uint8).max:
+        return np.uint8
+    elif max_value <= np.iinfo(np.int16).max:
+        return np.int16
+    else:
+        return np.int32
+
+
+def compact_categorical_data(data):
+    """
+    Casts an integer dataset to the smallest integer type that can hold all of its categories.
+    Non-integer datasets are returned unchanged.
+    """
+    if not np.issubdtype(data.dtype, np.integer) or data.size == 0:
+        return data
+    return data.astype(get_compact_int_dtype(data.max()), copy=False)
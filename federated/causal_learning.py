@@ -34,11 +34,14 @@ from abc import ABC, abstractmethod
 
 sys.path.append("../")
 from federated.logging_settings import logger
+from federated.dataset_cache import DatasetCache
+from federated.profiling import StageProfiler
 
 from causal_discovery.enco import ENCO
 from causal_graphs.graph_definition import CausalDAG
 from causal_graphs.graph_definition import CausalDAGDataset
 from causal_graphs.graph_generation import generate_categorical_graph, get_graph_func
+from causal_graphs.graph_utils import compact_categorical_data
 from causal_graphs.variable_distributions import _random_categ
 
 class InferenceAlgorithm(ABC):
@@ -203,6 +206,13 @@ class ENCOAlg(InferenceAlgorithm):
         self.metrics_dict = dict()
         self.metrics_dict_acycle = dict()
 
+        # Epochs trained in the last inference, and epochs skipped by the convergence check
+        self.epochs_run: int = 0
+        self.epochs_saved: int = 0
+
+        # Stages of the local inference, collected by the server after each round
+        self.profiler = StageProfiler()
+
         # Initialize federated properties
         self.__client_id = client_id
         self.__accessible_p = accessible_percentage
@@ -239,20 +249,14 @@ class ENCOAlg(InferenceAlgorithm):
         local_obs_data = self.__data[start_index: end_index]
         logger.info(f'Client {self.__client_id}: Shape of the local observational data: {local_obs_data.shape}')
 
-        local_int_data: np.ndarray = None
-        for var_idx in range(num_vars):
-            data_length = (self.__data_int.shape[1] // num_clients)
-            start_index = data_length * (self.__client_id)
-
-            data_length_acc = int(data_length * (self.__accessible_p / 100))
-            end_index = start_index + data_length_acc
+        data_length = (self.__data_int.shape[1] // num_clients)
+        start_index = data_length * (self.__client_id)
 
-            int_sample = self.__data_int[var_idx][start_index: end_index]
+        data_length_acc = int(data_length * (self.__accessible_p / 100))
+        end_index = start_index + data_length_acc
 
-            local_int_data = np.array([int_sample]) if local_int_data is None \
-                                                    else np.append(local_int_data,
-                                                                   np.array([int_sample]),
-                                                                   axis=0)
+        # Slicing keeps the compact integer type of the global dataset
+        local_int_data: np.ndarray = self.__data_int[:, start_index: end_index]
         logger.info(f'Client {self.__client_id}: Shape of the local interventional data: {local_int_data.shape}')
 
         excluded_variables = [var_idx for var_idx in range(num_vars) if var_idx not in self.__int_variables]
@@ -265,7 +269,9 @@ class ENCOAlg(InferenceAlgorithm):
 
     def infer_causal_structure(self, gamma_belief: np.ndarray or None,
                                theta_belief: np.ndarray or None, num_epochs: int = 2,
-                               gpu_name: str = 'cuda:0', cache: os.DirEntry = None):
+                               gpu_name: str = 'cuda:0', cache: os.DirEntry = None,
+                               convergence_tol: float or None = None, convergence_patience: int = 2,
+                               model_iters: int = 1000, graph_iters: int = 100):
         """This function calls an inference algorithm using ENCO core functions and class,
         given a dataset_dag.
 
@@ -279,24 +285,43 @@ class ENCOAlg(InferenceAlgorithm):
             gpu_name (str, optional): In case the enco should be passed to another gpu.
                 Defaults to cuda:0.
             cache (os.DirEntry, optional): For keeping track of data during concurrency.
+            convergence_tol (float or None, optional): Stop the local training once the binary adjacency
+                matrix is stable and the edge probabilities change by at most this value per epoch.
+                Defaults to None, i.e., always train for num_epochs.
+            convergence_patience (int, optional): Number of consecutive converged epochs before stopping.
+                Defaults to 2.
+            model_iters (int, optional): Distribution fitting iterations per epoch. Defaults to 1000.
+            graph_iters (int, optional): Graph fitting iterations per epoch. Defaults to 100.
         """
 
         logger.info(f'Client {self.__client_id} started the inference process')
-        enco_module = ENCO(graph=self._local_dag_dataset, prior_gamma=gamma_belief,
-                           prior_theta=theta_belief)
+        with self.profiler.stage('enco_construction'):
+            enco_module = ENCO(graph=self._local_dag_dataset, prior_gamma=gamma_belief,
+                               prior_theta=theta_belief, model_iters=model_iters, graph_iters=graph_iters,
+                               stage_timer=self.profiler.stage)
 
-        if torch.cuda.is_available():
-            enco_module.to(torch.device(gpu_name))
+            if torch.cuda.is_available():
+                enco_module.to(torch.device(gpu_name))
 
-        enco_module.discover_graph(num_epochs=num_epochs)
+        enco_module.discover_graph(num_epochs=num_epochs, convergence_tol=convergence_tol,
+                                   convergence_patience=convergence_patience)
+
+        self.epochs_run = enco_module.epochs_run
+        self.epochs_saved = num_epochs - enco_module.epochs_run
+        if self.epochs_saved > 0:
+            logger.info(f'Client {self.__client_id} converged after {self.epochs_run} epochs, '
+                        f'saved {self.epochs_saved} of {num_epochs}')
 
         self.inferred_orientation_mat = enco_module.get_theta_matrix()
         self.inferred_existence_mat = enco_module.get_gamma_matrix()
         self.binary_adjacency_mat = ((enco_module.get_binary_adjmatrix()).detach().numpy()).astype(int)
-        self.metrics_dict = enco_module.get_metrics(enforce_acyclic_graph=False)
-        self.metrics_dict_acycle = enco_module.get_metrics(enforce_acyclic_graph=True)
+        with self.profiler.stage('metrics'):
+            self.metrics_dict = enco_module.get_metrics(enforce_acyclic_graph=False)
+            self.metrics_dict_acycle = enco_module.get_metrics(enforce_acyclic_graph=True)
 
-        self.save_results(cache)
+        if cache is not None:
+            with self.profiler.stage('transport'):
+                self.save_results(cache)
         torch.cuda.empty_cache()
 
         logger.info(f'Client {self.__client_id} finished the inference process')
@@ -309,6 +334,8 @@ class ENCOAlg(InferenceAlgorithm):
                 pickle.dump(self.binary_adjacency_mat, f)
                 pickle.dump(self.metrics_dict, f)
                 pickle.dump(self.metrics_dict_acycle, f)
+                pickle.dump(self.profiler.events, f)
+                pickle.dump((self.epochs_run, self.epochs_saved), f)
 
     def retrieve_results(self, cache):
         with open(cache, 'rb') as f:
@@ -317,6 +344,8 @@ class ENCOAlg(InferenceAlgorithm):
             self.binary_adjacency_mat = pickle.load(f)
             self.metrics_dict = pickle.load(f)
             self.metrics_dict_acycle = pickle.load(f)
+            self.profiler.events = pickle.load(f)
+            self.epochs_run, self.epochs_saved = pickle.load(f)
 
     def get_client_id(self):
         """ Getter for client id.
@@ -334,6 +363,15 @@ class ENCOAlg(InferenceAlgorithm):
         """
         return self.__accessible_p
 
+    def get_num_samples(self):
+        """ Getter for the size of the local dataset.
+
+        Returns:
+            int: number of observational and interventional samples
+        """
+        num_int_vars = self._local_dag_dataset.data_int.shape[0] - len(self._local_dag_dataset.exclude_inters)
+        return self._local_dag_dataset.data_obs.shape[0] + num_int_vars * self._local_dag_dataset.data_int.shape[1]
+
     def get_interventions_list(self):
         """ Getter for enforced interventions.
 
@@ -345,7 +383,8 @@ class ENCOAlg(InferenceAlgorithm):
     @staticmethod
     def build_global_dataset(obs_data_size: int, int_data_size: int, num_vars: int,
                              graph_type: str, seed: int = 0, num_categs: int = 10,
-                             edge_prob: float or None = None) -> CausalDAGDataset:
+                             edge_prob: float or None = None,
+                             dataset_cache: DatasetCache or None = None) -> CausalDAGDataset:
         """The function builds a graph and an external dataset using soft intervention and
         online sampling from the respective graph.
 
@@ -359,12 +398,23 @@ class ENCOAlg(InferenceAlgorithm):
 
             edge_prob (floatorNone, optional): Edge probability in case the graph is defined as "random".
             Defaults to None.
+            dataset_cache (DatasetCache or None, optional): Cache to load the dataset from, or to store it in
+            after generation. Defaults to None.
 
         Returns:
             CausalDAGDataset: A global dataset for other clients to sample from.
         """
 
         assert graph_type in ["chain", "bidiag", "random", "full", "jungle", "collider"], "Graph not defined."
+
+        if dataset_cache is not None:
+            cache_key = DatasetCache.get_key(obs_data_size=obs_data_size, int_data_size=int_data_size,
+                                             num_vars=num_vars, graph_type=graph_type, seed=seed,
+                                             num_categs=num_categs, edge_prob=edge_prob)
+            cached = dataset_cache.load(cache_key)
+            if cached is not None:
+                return CausalDAGDataset(cached['adj_matrix'], cached['data_obs'], cached['data_int'])
+
         graph: CausalDAG = generate_categorical_graph(num_vars=num_vars,
                                                       min_categs=num_categs,
                                                       max_categs=num_categs,
@@ -377,12 +427,15 @@ class ENCOAlg(InferenceAlgorithm):
         original_adjacency_mat = graph.adj_matrix
         logger.debug(f'Global dataset adjacency matrix: \n {original_adjacency_mat.astype(int)}')
 
-        data_obs = graph.sample(batch_size=obs_data_size, as_array=True)
+        data_obs = compact_categorical_data(graph.sample(batch_size=obs_data_size, as_array=True))
         logger.info(f'Shape of global observational data: {data_obs.shape}')
 
         data_int = ENCOAlg.sample_int_data(graph, int_data_size)
         logger.info(f'Shape of global interventional data: {data_int.shape}\n')
 
+        if dataset_cache is not None:
+            dataset_cache.store(cache_key, original_adjacency_mat, data_obs, data_int)
+
         return CausalDAGDataset(original_adjacency_mat, data_obs, data_int)
 
     @staticmethod
@@ -397,7 +450,7 @@ class ENCOAlg(InferenceAlgorithm):
         Returns:
             np.ndarray: The interventional dataset.
         """
-        data_int: np.ndarray = None
+        int_samples: List[np.ndarray] = list()
 
         for var_idx in range(len(graph.variables)):
 
@@ -417,9 +470,6 @@ class ENCOAlg(InferenceAlgorithm):
             intervention_dict = {var.name: value}
             int_sample = graph.sample(interventions=intervention_dict,
                                       batch_size=size, as_array=True)
+            int_samples.append(compact_categorical_data(int_sample))
 
-            data_int = np.array([int_sample]) if data_int is None \
-                                              else np.append(data_int,
-                                                              np.array([int_sample]),
-                                                              axis=0)
-        return data_int
+        return np.stack(int_samples, axis=0)
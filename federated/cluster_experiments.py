@@ -24,16 +24,21 @@
 # ========================================================================
 
 from re import split
+import os
 import sys
 import argparse
 import numpy as np
 
+from typing import Dict, List
+
 from federated_simulation import FederatedSimulator
+from dataset_cache import DatasetCache
 from logging_settings import logger
 from utils import split_variables_set
 
 
 global PROCESS_ID
+DATASET_CACHE = None
 
 
 class ParallelExperiments:
@@ -66,14 +71,63 @@ class ParallelExperiments:
         self.__default_int_data_sizes = [12, 24, 48, 96, 144, 192, 240]
 
 
-def parallel_experiments_sweep_clients_str(nodiv: bool = True):
-    """ A method to handle parallel MPI cluster experiments.
+def build_sweep_task(interventions_dict: Dict[int, List[int]], num_clients: int, num_rounds: int,
+                     experiment_id: int, repeat_id: int, output_dir: str, num_vars: int, graph_type: str,
+                     obs_data_size: int, int_data_size: int, seed: int, edge_prob: float or None = None,
+                     aggregation_method: str = "naive", **aggregation_kwargs) -> Dict:
+    """ Describe a single cell of an experiment sweep, i.e., one federated simulation.
+
+    Returns:
+        Dict: Keyword arguments for the FederatedSimulator constructor ('simulator'), the
+            initialize_clients_data method ('data') and the execute_simulation method ('simulation').
+    """
+
+    data_kwargs = dict(num_vars=num_vars, graph_type=graph_type, obs_data_size=obs_data_size,
+                       int_data_size=int_data_size, seed=seed)
+    if edge_prob is not None:
+        data_kwargs['edge_prob'] = edge_prob
+
+    return {
+        'simulator': dict(accessible_interventions=interventions_dict, num_clients=num_clients,
+                          num_rounds=num_rounds, experiment_id=experiment_id, repeat_id=repeat_id,
+                          output_dir=output_dir),
+        'data': data_kwargs,
+        'simulation': dict(aggregation_method=aggregation_method, **aggregation_kwargs)
+    }
+
+
+def get_task_id(task: Dict) -> str:
+    """ A unique identifier of a sweep task, which is the path of its results file.
+    """
+    simulator_kwargs = task['simulator']
+    return os.path.join(simulator_kwargs['output_dir'],
+                        f'results_{simulator_kwargs["experiment_id"]}_{simulator_kwargs["repeat_id"]}.pickle')
+
+
+def run_sweep_task(task: Dict, dataset_cache: DatasetCache = None):
+    """ Run a single federated simulation described by build_sweep_task.
+    """
+    federated_model = FederatedSimulator(**task['simulator'])
+    federated_model.initialize_clients_data(dataset_cache=dataset_cache, **task['data'])
+    federated_model.execute_simulation(**task['simulation'])
+
+
+def run_experiment_sequence(tasks: List[Dict]):
+    """ Run the tasks of one cluster process sequentially.
     """
     process = PROCESS_ID
     logger.info(f'Starting the experiment sequence for process {process}\n')
 
-    # Id
-    experiment_id = process
+    for task in tasks:
+        run_sweep_task(task, DATASET_CACHE)
+
+    logger.info(f'Ending the experiment sequence for process {process}\n')
+
+
+def sweep_clients_str_tasks(experiment_id: int, nodiv: bool = True) -> List[Dict]:
+    """ Tasks of the client sweep on structured graphs for one process.
+    """
+    tasks = list()
     repeat_count = 5
 
     # Federated
@@ -90,34 +144,22 @@ def parallel_experiments_sweep_clients_str(nodiv: bool = True):
 
     for graph_type in graph_types:
         for idx, num_client in enumerate(num_clients):
-            logger.info(f'NUMBER OF SAMPLES: {specifier}- NUMBER OF CLIENTS: {num_client}')
-
             obs_data_size = obs_sample_size * num_client
             int_data_size = specifier * num_vars * num_client if nodiv else specifier * num_vars
             interventions_dict = {cid: [v for v in range(num_vars)] for cid in range(num_client)}
             folder_name = f'ClientSweepNodiv-{graph_type}-{num_vars}-{specifier}' if nodiv else f'ClientSweepDiv-{graph_type}-{num_vars}-{specifier}'
 
             for seed in range(repeat_count):
-                federated_model = FederatedSimulator(interventions_dict, num_clients=num_client,
-                                                        num_rounds=num_rounds, experiment_id=idx,
-                                                        repeat_id=seed, output_dir=folder_name)
-                federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type,
-                                                        obs_data_size=obs_data_size,
-                                                        int_data_size=int_data_size,
-                                                        seed=seed)
-                if aggregation_method == "naive":
-                    federated_model.execute_simulation(aggregation_method=aggregation_method)
+                tasks.append(build_sweep_task(interventions_dict, num_client, num_rounds, idx, seed, folder_name,
+                                              num_vars, graph_type, obs_data_size, int_data_size, seed,
+                                              aggregation_method=aggregation_method))
+    return tasks
 
-    logger.info(f'Ending the experiment sequence for process {process}\n')
 
-def parallel_experiments_sweep_clients_rnd(nodiv: bool = True):
-    """ A method to handle parallel MPI cluster experiments.
+def sweep_clients_rnd_tasks(experiment_id: int, nodiv: bool = True) -> List[Dict]:
+    """ Tasks of the client sweep on random graphs for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
     repeat_count = 5
 
     # Federated
@@ -134,34 +176,22 @@ def parallel_experiments_sweep_clients_rnd(nodiv: bool = True):
 
     for graph_type in graph_types:
         for idx, num_client in enumerate(num_clients):
-            logger.info(f'NUMBER OF SAMPLES: {specifier}- NUMBER OF CLIENTS: {num_client}')
             obs_data_size = graph_type * obs_sample_size * num_client
             int_data_size = specifier * num_vars * num_client if nodiv else specifier * num_vars
             interventions_dict = {cid: [v for v in range(num_vars)] for cid in range(num_client)}
             folder_name = f'ClientSweepNodiv-{graph_type}-{num_vars}-{specifier}' if nodiv else f'ClientSweepDiv-{graph_type}-{num_vars}-{specifier}'
 
             for seed in range(repeat_count):
-                federated_model = FederatedSimulator(interventions_dict, num_clients=num_client,
-                                                        num_rounds=num_rounds, experiment_id=idx,
-                                                        repeat_id=seed, output_dir=folder_name)
-                federated_model.initialize_clients_data(num_vars=num_vars, graph_type="random",
-                                                        obs_data_size=obs_data_size,
-                                                        int_data_size=int_data_size, edge_prob=graph_type,
-                                                        seed=seed)
-                if aggregation_method == "naive":
-                    federated_model.execute_simulation(aggregation_method=aggregation_method)
-
-    logger.info(f'Ending the experiment sequence for process {process}\n')
+                tasks.append(build_sweep_task(interventions_dict, num_client, num_rounds, idx, seed, folder_name,
+                                              num_vars, "random", obs_data_size, int_data_size, seed,
+                                              edge_prob=graph_type, aggregation_method=aggregation_method))
+    return tasks
 
 
-def parallel_experiments_balanced_int_str():
-    """ A method to handle parallel MPI cluster experiments.
+def balanced_int_str_tasks(experiment_id: int) -> List[Dict]:
+    """ Tasks of the balanced interventions experiment on structured graphs for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
     repeat_count = 5
 
     # Federated
@@ -194,27 +224,16 @@ def parallel_experiments_balanced_int_str():
             folder_name = f'BalancedSetup-{graph_type}-{num_vars}-{specifier}'
 
             for seed in range(repeat_count):
-                federated_model = FederatedSimulator(interventions_dict, num_clients=num_client,
-                                                     num_rounds=num_rounds, experiment_id=experiment_id,
-                                                     repeat_id=seed, output_dir=folder_name)
-                federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type,
-                                                        obs_data_size=obs_data_size,
-                                                        int_data_size=int_data_size,
-                                                        seed=seed)
-                if aggregation_method == "naive":
-                    federated_model.execute_simulation(aggregation_method=aggregation_method)
+                tasks.append(build_sweep_task(interventions_dict, num_client, num_rounds, experiment_id, seed,
+                                              folder_name, num_vars, graph_type, obs_data_size, int_data_size,
+                                              seed, aggregation_method=aggregation_method))
+    return tasks
 
-    logger.info(f'Ending the experiment sequence for process {process}\n')
 
-
-def parallel_experiments_balanced_int_rnd():
-    """ A method to handle parallel MPI cluster experiments.
+def balanced_int_rnd_tasks(experiment_id: int) -> List[Dict]:
+    """ Tasks of the balanced interventions experiment on random graphs for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
     repeat_count = 5
 
     # Federated
@@ -248,27 +267,16 @@ def parallel_experiments_balanced_int_rnd():
             folder_name = f'BalancedSetup-{edge_prob}-{num_vars}-{specifier}'
 
             for seed in range(repeat_count):
-                federated_model = FederatedSimulator(interventions_dict, num_clients=num_client,
-                                                     num_rounds=num_rounds, experiment_id=experiment_id,
-                                                     repeat_id=seed, output_dir=folder_name)
-                federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type, edge_prob=edge_prob,
-                                                        obs_data_size=obs_data_size,
-                                                        int_data_size=int_data_size,
-                                                        seed=seed)
-                if aggregation_method == "naive":
-                    federated_model.execute_simulation(aggregation_method=aggregation_method)
-
-    logger.info(f'Ending the experiment sequence for process {process}\n')
+                tasks.append(build_sweep_task(interventions_dict, num_client, num_rounds, experiment_id, seed,
+                                              folder_name, num_vars, graph_type, obs_data_size, int_data_size,
+                                              seed, edge_prob=edge_prob, aggregation_method=aggregation_method))
+    return tasks
 
 
-def parallel_experiments_unbalanced_int_str():
-    """ A method to handle parallel MPI cluster experiments.
+def unbalanced_int_str_tasks(experiment_id: int) -> List[Dict]:
+    """ Tasks of the unbalanced interventions experiment on structured graphs for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
 
     # Graph
     graph_types = ["jungle", "collider", "chain", "full", "bidiag"]
@@ -293,30 +301,18 @@ def parallel_experiments_unbalanced_int_str():
                 interventions_dict = [{0: splits[0]}, {0: splits[1]}, # Single client setup
                                     {0: splits[0], 1: splits[1]}] # Federated collaboration
 
-                federated_model = FederatedSimulator(interventions_dict[experiment_id],
-                                                    num_clients=num_clients[experiment_id],
-                                                    num_rounds=num_rounds, experiment_id=experiment_id,
-                                                    repeat_id=seed, output_dir=folder_name)
-
-                federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type,
-                                                        obs_data_size=obs_data_size,
-                                                        int_data_size=int_data_size, seed=seed)
-
-                federated_model.execute_simulation(aggregation_method="locality",
-                                                initial_mass=np.array([16, 16]),
-                                                alpha=1, beta=0.3, min_mass=1)
-
-    logger.info(f'Ending the experiment sequence for process {process}\n')
+                tasks.append(build_sweep_task(interventions_dict[experiment_id], num_clients[experiment_id],
+                                              num_rounds, experiment_id, seed, folder_name, num_vars,
+                                              graph_type, obs_data_size, int_data_size, seed,
+                                              aggregation_method="locality", initial_mass=np.array([16, 16]),
+                                              alpha=1, beta=0.3, min_mass=1))
+    return tasks
 
 
-def parallel_experiments_unbalanced_int_rnd():
-    """ A method to handle parallel MPI cluster experiments.
+def unbalanced_int_rnd_tasks(experiment_id: int) -> List[Dict]:
+    """ Tasks of the unbalanced interventions experiment on random graphs for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
 
     # Graph
     graph_type = "random"
@@ -342,40 +338,25 @@ def parallel_experiments_unbalanced_int_rnd():
                 interventions_dict = [{0: splits[0]}, {0: splits[1]}, # Single client setup
                                     {0: splits[0], 1: splits[1]}] # Federated collaboration
 
-                federated_model = FederatedSimulator(interventions_dict[experiment_id],
-                                                    num_clients=num_clients[experiment_id],
-                                                    num_rounds=num_rounds, experiment_id=experiment_id,
-                                                    repeat_id=seed, output_dir=folder_name)
-
-                federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type,
-                                                        obs_data_size=obs_data_size,
-                                                        int_data_size=int_data_size,
-                                                        edge_prob=edge_prob, seed=seed)
+                tasks.append(build_sweep_task(interventions_dict[experiment_id], num_clients[experiment_id],
+                                              num_rounds, experiment_id, seed, folder_name, num_vars,
+                                              graph_type, obs_data_size, int_data_size, seed,
+                                              edge_prob=edge_prob, aggregation_method="locality",
+                                              initial_mass=np.array([16, 16]), alpha=1, beta=0.3, min_mass=1))
+    return tasks
 
-                federated_model.execute_simulation(aggregation_method="locality",
-                                                initial_mass=np.array([16, 16]),
-                                                alpha=1, beta=0.3, min_mass=1)
 
-    logger.info(f'Ending the experiment sequence for process {process}\n')
-
-
-def parallel_experiments_compare_aggregations(graph_size: int = 50, network_size: int = 10):
-    """ A method to handle parallel MPI cluster experiments.
+def compare_aggregations_tasks(experiment_id: int, graph_size: int = 50, network_size: int = 10) -> List[Dict]:
+    """ Tasks of the aggregation comparison experiment for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
     specifiers = [6, 12, 24, 48, 96, 144, 192, 240]
 
-
     # Graph
     graph_type = 'random'
     edge_probs = [0.1, 0.2, 0.4, 0.6, 0.8]
     num_vars = graph_size
 
-
     # Federated
     num_rounds = 10
     num_clients = network_size
@@ -398,50 +379,19 @@ def parallel_experiments_compare_aggregations(graph_size: int = 50, network_size
                     logger.info(f'The interventional variables split is {splits}.')
                     interventions_dict = {client_idx: splits[client_idx] for client_idx in range(num_clients)}
 
-                    federated_model = FederatedSimulator(interventions_dict, num_clients=num_clients,
-                                                        num_rounds=num_rounds, experiment_id=experiment_id,
-                                                        repeat_id=seed, output_dir=folder_name)
-
-                    federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type,
-                                                            obs_data_size=obs_data_size,
-                                                            int_data_size=specifiers[experiment_id] * num_vars * num_clients,
-                                                            edge_prob=edge_prob, seed=seed)
-
-                    federated_model.execute_simulation(aggregation_method=agg_method,
-                                                    initial_mass=np.array([initial_mass for _ in range(num_clients)]),
-                                                    alpha=alpha, beta=0.3, min_mass=0.00001)
-
-    logger.info(f'Ending the experiment sequence for process {process}\n')
-
-
-def get_datasets_size_locality(graph_type: str, num_clients: int, num_vars: int, edge_prob: float = 0.0):
-
-    """ Chain, Jungle, Collider, and Bidiag graphs sample sizes """
-    if graph_type == 'chain' or graph_type == 'jungle' or graph_type == 'collider' or graph_type == 'bidiag':
-        obs_data_sizes = 5000 * num_clients
-        int_data_sizes = 200 * num_vars * num_clients
-
-    """ Full graph sample sizes """
-    if graph_type == 'full':
-        obs_data_sizes = 20000 * num_clients
-        int_data_sizes = 400 * num_vars * num_clients
-
-    """ Random graphs sample sizes """
-    if graph_type == 'random':
-        obs_data_sizes = edge_prob * 20000 * num_clients
-        int_data_sizes = 200 * num_vars * num_clients
-
-    return obs_data_sizes, int_data_sizes
+                    tasks.append(build_sweep_task(interventions_dict, num_clients, num_rounds, experiment_id,
+                                                  seed, folder_name, num_vars, graph_type, obs_data_size,
+                                                  specifiers[experiment_id] * num_vars * num_clients, seed,
+                                                  edge_prob=edge_prob, aggregation_method=agg_method,
+                                                  initial_mass=np.array([initial_mass for _ in range(num_clients)]),
+                                                  alpha=alpha, beta=0.3, min_mass=0.00001))
+    return tasks
 
 
-def parallel_experiments_entropy_test_str():
-    """ A method to handle parallel MPI cluster experiments.
+def entropy_test_str_tasks(experiment_id: int) -> List[Dict]:
+    """ Tasks of the entropy experiment on structured graphs for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
     repeat_count = 5
 
     # Federated
@@ -467,27 +417,16 @@ def parallel_experiments_entropy_test_str():
         folder_name = f'EntropyTest-{graph_type}-{num_vars}'
 
         for seed in range(repeat_count):
-            federated_model = FederatedSimulator(interventions_dict, num_clients=num_client,
-                                                 num_rounds=num_rounds, experiment_id=experiment_id,
-                                                 repeat_id=seed, output_dir=folder_name)
-            federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type,
-                                                    obs_data_size=obs_data_size,
-                                                    int_data_size=int_data_size,
-                                                    seed=seed)
-            if aggregation_method == "naive":
-                federated_model.execute_simulation(aggregation_method=aggregation_method)
-
-    logger.info(f'Ending the experiment sequence for process {process}\n')
+            tasks.append(build_sweep_task(interventions_dict, num_client, num_rounds, experiment_id, seed,
+                                          folder_name, num_vars, graph_type, obs_data_size, int_data_size, seed,
+                                          aggregation_method=aggregation_method))
+    return tasks
 
 
-def parallel_experiments_entropy_test_rnd():
-    """ A method to handle parallel MPI cluster experiments.
+def entropy_test_rnd_tasks(experiment_id: int) -> List[Dict]:
+    """ Tasks of the entropy experiment on random graphs for one process.
     """
-    process = PROCESS_ID
-    logger.info(f'Starting the experiment sequence for process {process}\n')
-
-    # Id
-    experiment_id = process
+    tasks = list()
     repeat_count = 5
 
     # Federated
@@ -513,17 +452,130 @@ def parallel_experiments_entropy_test_rnd():
         folder_name = f'EntropyTest-{graph_type}-{num_vars}'
 
         for seed in range(repeat_count):
-            federated_model = FederatedSimulator(interventions_dict, num_clients=num_client,
-                                                 num_rounds=num_rounds, experiment_id=experiment_id,
-                                                 repeat_id=seed, output_dir=folder_name)
-            federated_model.initialize_clients_data(num_vars=num_vars, graph_type=graph_type,
-                                                    obs_data_size=obs_data_size,
-                                                    int_data_size=int_data_size,
-                                                    seed=seed)
-            if aggregation_method == "naive":
-                federated_model.execute_simulation(aggregation_method=aggregation_method)
+            tasks.append(build_sweep_task(interventions_dict, num_client, num_rounds, experiment_id, seed,
+                                          folder_name, num_vars, graph_type, obs_data_size, int_data_size, seed,
+                                          aggregation_method=aggregation_method))
+    return tasks
+
+
+def get_datasets_size_locality(graph_type: str, num_clients: int, num_vars: int, edge_prob: float = 0.0):
+
+    """ Chain, Jungle, Collider, and Bidiag graphs sample sizes """
+    if graph_type == 'chain' or graph_type == 'jungle' or graph_type == 'collider' or graph_type == 'bidiag':
+        obs_data_sizes = 5000 * num_clients
+        int_data_sizes = 200 * num_vars * num_clients
+
+    """ Full graph sample sizes """
+    if graph_type == 'full':
+        obs_data_sizes = 20000 * num_clients
+        int_data_sizes = 400 * num_vars * num_clients
+
+    """ Random graphs sample sizes """
+    if graph_type == 'random':
+        obs_data_sizes = edge_prob * 20000 * num_clients
+        int_data_sizes = 200 * num_vars * num_clients
+
+    return obs_data_sizes, int_data_sizes
+
+
+""" Number of cluster processes (values of PROCESS_ID) that each experiment type is split into """
+SWEEP_NUM_PROCESSES = {
+    "client_sweep_nodiv": 7,
+    "client_sweep_div": 7,
+    "balanced_interventions": 3,
+    "unbalanced_interventions": 3,
+    "compare_aggregations": 8,
+    "entropy_test": 1,
+}
+
+
+def get_sweep_tasks(exp_type: str, graph_type: str, process_id: int, graph_size: int = 50,
+                    num_clients: int = 10) -> List[Dict]:
+    """ Expand the grid of an experiment type for a single process id into tasks.
+
+    Args:
+        exp_type (str): Type of experiment, see the keys of SWEEP_NUM_PROCESSES.
+        graph_type (str): Either str (structured) or rnd (random) graphs.
+        process_id (int): The process id that the cluster would pass as PROCESS_ID.
+        graph_size (int, optional): Graph size, only used for compare_aggregations. Defaults to 50.
+        num_clients (int, optional): Number of clients, only used for compare_aggregations. Defaults to 10.
+
+    Returns:
+        List[Dict]: A list of tasks as described in build_sweep_task.
+    """
+
+    if exp_type == "balanced_interventions":
+        return balanced_int_str_tasks(process_id) if graph_type == "str" else balanced_int_rnd_tasks(process_id)
+
+    elif exp_type == "unbalanced_interventions":
+        return unbalanced_int_str_tasks(process_id) if graph_type == "str" else unbalanced_int_rnd_tasks(process_id)
+
+    elif exp_type == "compare_aggregations":
+        return compare_aggregations_tasks(process_id, graph_size, num_clients)
+
+    elif exp_type == "client_sweep_nodiv" or exp_type == "client_sweep_div":
+        nodiv = exp_type == "client_sweep_nodiv"
+        return sweep_clients_str_tasks(process_id, nodiv) if graph_type == "str" \
+            else sweep_clients_rnd_tasks(process_id, nodiv)
+
+    elif exp_type == "entropy_test":
+        return entropy_test_str_tasks(process_id) if graph_type == "str" else entropy_test_rnd_tasks(process_id)
+
+    raise ValueError(f'Experiment type {exp_type} is not defined.')
 
-    logger.info(f'Ending the experiment sequence for process {process}\n')
+
+def parallel_experiments_sweep_clients_str(nodiv: bool = True):
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(sweep_clients_str_tasks(PROCESS_ID, nodiv))
+
+
+def parallel_experiments_sweep_clients_rnd(nodiv: bool = True):
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(sweep_clients_rnd_tasks(PROCESS_ID, nodiv))
+
+
+def parallel_experiments_balanced_int_str():
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(balanced_int_str_tasks(PROCESS_ID))
+
+
+def parallel_experiments_balanced_int_rnd():
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(balanced_int_rnd_tasks(PROCESS_ID))
+
+
+def parallel_experiments_unbalanced_int_str():
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(unbalanced_int_str_tasks(PROCESS_ID))
+
+
+def parallel_experiments_unbalanced_int_rnd():
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(unbalanced_int_rnd_tasks(PROCESS_ID))
+
+
+def parallel_experiments_compare_aggregations(graph_size: int = 50, network_size: int = 10):
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(compare_aggregations_tasks(PROCESS_ID, graph_size, network_size))
+
+
+def parallel_experiments_entropy_test_str():
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(entropy_test_str_tasks(PROCESS_ID))
+
+
+def parallel_experiments_entropy_test_rnd():
+    """ A method to handle parallel MPI cluster experiments.
+    """
+    run_experiment_sequence(entropy_test_rnd_tasks(PROCESS_ID))
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Federated causal inference experiments on Tuebingen cluster. '
@@ -551,9 +603,16 @@ if __name__ == '__main__':
     parser.add_argument("-lic", "--less-informed-clients", default=2, type=int,
         help="Number of clients with access to only 10 percent of intervened variables. Can only be used with the compare_aggregations experiments.")
 
+    parser.add_argument("-dc", "--dataset-cache", default=None, type=str,
+        help="Directory for caching the generated global datasets across experiments. Disabled by default.")
+    parser.add_argument("-dcs", "--dataset-cache-size", default=10, type=float,
+        help="Maximum size of the dataset cache in GiB.")
+
     args = parser.parse_args()
 
     PROCESS_ID = args.experiment_id
+    if args.dataset_cache is not None:
+        DATASET_CACHE = DatasetCache(args.dataset_cache, int(args.dataset_cache_size * 2 ** 30))
 
     if args.exp_type == "balanced_interventions":
         if args.graph_type == "str":
@@ -0,0 +1,159 @@
+"""
+    File name: compute_budget.py
+    Python Version: 3.8
+    Description: Per-client local compute budgets of a federated round.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import numpy as np
+
+from typing import Dict, List
+
+
+class EpochBudgetScheduler:
+    def __init__(self, model_iters: int = 1000, graph_iters: int = 100, min_fraction: float = 0.25,
+                 max_fraction: float = 2.0, data_exponent: float = 0.5, equalize_finish_times: bool = True):
+        """ Assigns each client its number of epochs, distribution fitting iterations (model_iters)
+        and graph fitting iterations (graph_iters) for a round.
+
+        The number of model_iters follows the local sample count relative to the other clients, since
+        more data supports longer fitting of the conditionals. The number of graph_iters follows the
+        uncertainty about the edges the client can resolve, i.e., the entropy of the edges incident to
+        its intervened variables among the clients' last adjacency matrices. Once the time per
+        iteration of the clients is known, clients predicted to exceed the round time of the default
+        budget on the median client are shortened, so that all clients finish around the same time.
+
+        Args:
+            model_iters (int, optional): Default distribution fitting iterations per epoch. Defaults to 1000.
+            graph_iters (int, optional): Default graph fitting iterations per epoch. Defaults to 100.
+            min_fraction (float, optional): Lower bound of the budget relative to the default. Defaults to 0.25.
+            max_fraction (float, optional): Upper bound of the model_iters relative to the default.
+                Defaults to 2.0.
+            data_exponent (float, optional): model_iters scale with the relative sample count to this power.
+                Defaults to 0.5.
+            equalize_finish_times (bool, optional): Shorten the budgets of clients that would finish
+                late. Defaults to True.
+        """
+
+        assert 0 < min_fraction <= 1 <= max_fraction, "Fractions should satisfy 0 < min <= 1 <= max."
+        self.model_iters = model_iters
+        self.graph_iters = graph_iters
+        self.min_fraction = min_fraction
+        self.max_fraction = max_fraction
+        self.data_exponent = data_exponent
+        self.equalize_finish_times = equalize_finish_times
+
+        # Measured seconds per distribution fitting and graph fitting iteration of each client
+        self.__seconds_per_model_iter: Dict[int, float] = dict()
+        self.__seconds_per_graph_iter: Dict[int, float] = dict()
+
+    def get_data_factors(self, num_samples: Dict[int, int]) -> Dict[int, float]:
+        """ Relative model_iters of the clients based on their local sample counts.
+        """
+
+        mean_samples = np.mean(list(num_samples.values()))
+        return {client_id: float(np.clip((samples / mean_samples) ** self.data_exponent,
+                                         self.min_fraction, self.max_fraction))
+                for client_id, samples in num_samples.items()}
+
+    def get_uncertainty_factor(self, edge_entropy: np.ndarray or None, interventions_list: List[int]) -> float:
+        """ Relative graph_iters of a client based on the entropy of the edges it can orient with its
+        interventions, between min_fraction for certain and 1 for uniformly uncertain edges.
+
+        Args:
+            edge_entropy (np.ndarray or None): Entropy per edge as given by calculate_edge_entropy,
+                None before the first round.
+            interventions_list (List[int]): Variables the client has intervened on.
+        """
+
+        if edge_entropy is None:
+            return 1.0
+
+        num_vars = edge_entropy.shape[0]
+        mask = ~np.eye(num_vars, dtype=bool)
+        if len(interventions_list) > 0:
+            incident = np.zeros((num_vars, num_vars), dtype=bool)
+            incident[interventions_list, :] = True
+            incident[:, interventions_list] = True
+            mask &= incident
+
+        uncertainty = float(np.mean(edge_entropy[mask])) if mask.any() else 1.0
+        return self.min_fraction + (1 - self.min_fraction) * uncertainty
+
+    def observe(self, client_id: int, budget: Dict[str, int], distribution_seconds: float,
+                graph_seconds: float):
+        """ Record the measured duration of a client's distribution and graph fitting in a round.
+
+        Args:
+            client_id (int): The client.
+            budget (Dict[str, int]): The budget the client ran with.
+            distribution_seconds (float): Total wall time of its distribution fitting stages.
+            graph_seconds (float): Total wall time of its graph fitting stages.
+        """
+
+        epochs_run = budget.get('epochs_run', budget['num_epochs'])
+        if epochs_run > 0:
+            self.__seconds_per_model_iter[client_id] = distribution_seconds / (epochs_run * budget['model_iters'])
+            self.__seconds_per_graph_iter[client_id] = graph_seconds / (epochs_run * budget['graph_iters'])
+
+    def schedule(self, num_epochs: int, num_samples: Dict[int, int], interventions: Dict[int, List[int]],
+                 edge_entropy: np.ndarray or None = None) -> Dict[int, Dict[str, int]]:
+        """ Budgets of all clients for the next round.
+
+        Args:
+            num_epochs (int): Default number of epochs per round.
+            num_samples (Dict[int, int]): Local sample count of each client.
+            interventions (Dict[int, List[int]]): Intervened variables of each client.
+            edge_entropy (np.ndarray or None, optional): Entropy per edge among the clients' adjacency
+                matrices of the last round. Defaults to None.
+
+        Returns:
+            Dict[int, Dict[str, int]]: num_epochs, model_iters and graph_iters of each client.
+        """
+
+        data_factors = self.get_data_factors(num_samples)
+        budgets = {client_id: {'num_epochs': num_epochs,
+                               'model_iters': max(1, int(round(self.model_iters * data_factors[client_id]))),
+                               'graph_iters': max(1, int(round(self.graph_iters * self.get_uncertainty_factor(
+                                   edge_entropy, interventions[client_id]))))}
+                   for client_id in num_samples.keys()}
+
+        if self.equalize_finish_times and all(client_id in self.__seconds_per_model_iter for client_id in budgets):
+            self.fit_round_time(budgets, num_epochs)
+
+        return budgets
+
+    def fit_round_time(self, budgets: Dict[int, Dict[str, int]], num_epochs: int):
+        """ Shorten the budgets of clients predicted to finish after the default budget would on the
+        median client. Epochs are removed first, the remainder is taken from the iterations.
+        """
+
+        round_time = num_epochs * (self.model_iters * np.median(list(self.__seconds_per_model_iter.values())) +
+                                   self.graph_iters * np.median(list(self.__seconds_per_graph_iter.values())))
+
+        for client_id, budget in budgets.items():
+            predicted_time = budget['num_epochs'] * (budget['model_iters'] * self.__seconds_per_model_iter[client_id] +
+                                                     budget['graph_iters'] * self.__seconds_per_graph_iter[client_id])
+            if predicted_time <= round_time:
+                continue
+
+            epochs = budget['num_epochs'] * round_time / predicted_time
+            budget['num_epochs'] = max(1, int(epochs))
+            iters_fraction = max(min(1.0, epochs / budget['num_epochs']), self.min_fraction)
+            budget['model_iters'] = max(1, int(budget['model_iters'] * iters_fraction))
+            budget['graph_iters'] = max(1, int(budget['graph_iters'] * iters_fraction))
@@ -0,0 +1,180 @@
+"""
+    File name: dataset_cache.py
+    Python Version: 3.8
+    Description: On-disk cache of generated global datasets, keyed on the generation parameters.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import os, sys
+import json
+import random
+import hashlib
+import tempfile
+import zipfile
+
+import torch
+import numpy as np
+
+from typing import Dict
+
+sys.path.append("../")
+from federated.logging_settings import logger
+
+
+""" Bump when the dataset generation changes, so that stale entries are never reused """
+DATASET_CACHE_VERSION = 1
+
+
+class DatasetCache:
+    def __init__(self, cache_dir: str = 'dataset_cache', max_size: int = 10 * 2 ** 30):
+        """ Content-addressed cache of global datasets with least-recently-used eviction.
+
+        Each entry is an uncompressed npz file holding the adjacency matrix, the observational
+        and interventional data, and the random number generator states right after the dataset
+        was generated. Restoring the states on a hit keeps the subsequent training identical to
+        a run that generated the dataset itself. Entries are written atomically, so several
+        processes can share one cache directory.
+
+        Args:
+            cache_dir (str, optional): Directory of the cache entries. Defaults to 'dataset_cache'.
+            max_size (int, optional): Upper bound on the total size of the entries in bytes.
+                Defaults to 10 GiB.
+        """
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def get_key(**generation_params) -> str:
+        """ Hash the dataset generation parameters.
+
+        Returns:
+            str: A hex digest identifying the dataset.
+        """
+
+        generation_params['version'] = DATASET_CACHE_VERSION
+        return hashlib.sha1(json.dumps(generation_params, sort_keys=True).encode()).hexdigest()
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.npz')
+
+    def load(self, key: str) -> Dict[str, np.ndarray] or None:
+        """ Load a dataset and restore the random states stored with it.
+
+        Args:
+            key (str): Key returned by get_key.
+
+        Returns:
+            Dict[str, np.ndarray] or None: The arrays adj_matrix, data_obs and data_int, or None on a miss.
+        """
+
+        entry_path = self.get_entry_path(key)
+        try:
+            with np.load(entry_path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+
+            # Mark the entry as recently used for the eviction
+            os.utime(entry_path)
+        except (FileNotFoundError, zipfile.BadZipFile, ValueError, KeyError):
+            return None
+
+        self.set_random_states(arrays)
+        logger.info(f'Global dataset loaded from cache entry {key}')
+
+        return {name: arrays[name] for name in ['adj_matrix', 'data_obs', 'data_int']}
+
+    def store(self, key: str, adj_matrix: np.ndarray, data_obs: np.ndarray, data_int: np.ndarray):
+        """ Store a freshly generated dataset together with the current random states.
+
+        Args:
+            key (str): Key returned by get_key.
+            adj_matrix (np.ndarray): Adjacency matrix of the generating graph.
+            data_obs (np.ndarray): Observational data.
+            data_int (np.ndarray): Interventional data.
+        """
+
+        arrays = dict(adj_matrix=adj_matrix, data_obs=data_obs, data_int=data_int, **self.get_random_states())
+
+        file_desc, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(file_desc, 'wb') as tmp_file:
+                np.savez(tmp_file, **arrays)
+            os.replace(tmp_path, self.get_entry_path(key))
+        except OSError as e:
+            logger.warning(f'Could not store cache entry {key}: {e}')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """ Remove the least recently used entries until the cache fits into max_size.
+        """
+
+        entries = list()
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith('.npz'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_name))
+
+        total_size = sum(entry[1] for entry in entries)
+        for _, size, file_name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+                logger.info(f'Evicted dataset cache entry {file_name}')
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    @staticmethod
+    def get_random_states() -> Dict[str, np.ndarray]:
+        """ Encode the states of the numpy, torch and python generators as arrays.
+        """
+
+        _, np_keys, np_pos, np_has_gauss, np_gauss = np.random.get_state()
+        py_version, py_internal, py_gauss = random.getstate()
+
+        return {
+            'np_state': np_keys,
+            'np_state_meta': np.array([np_pos, np_has_gauss, np_gauss], dtype=np.float64),
+            'torch_state': torch.get_rng_state().numpy(),
+            'py_state': np.array(py_internal, dtype=np.int64),
+            'py_state_meta': np.array([py_version, np.nan if py_gauss is None else py_gauss], dtype=np.float64)
+        }
+
+    @staticmethod
+    def set_random_states(arrays: Dict[str, np.ndarray]):
+        """ Restore the generator states encoded by get_random_states.
+        """
+
+        np_pos, np_has_gauss, np_gauss = arrays['np_state_meta']
+        np.random.set_state(('MT19937', arrays['np_state'], int(np_pos), int(np_has_gauss), float(np_gauss)))
+
+        torch.set_rng_state(torch.from_numpy(arrays['torch_state'].copy()))
+
+        py_version, py_gauss = arrays['py_state_meta']
+        random.setstate((int(py_version), tuple(int(v) for v in arrays['py_state']),
+                         None if np.isnan(py_gauss) else float(py_gauss)))
@@ -40,10 +40,6 @@ from logging_settings import logger
       2. # kill -9 $(fuser 29500/tcp 2>/dev/null): To kill all of them!
 """
 
-# The array containing all the processes created by multiprocessing module.
-process_array: List[torch.multiprocessing.Process] = list()
-
-
 class Network:
     """
     The network class provides an elaborate interface to handle the topology and
@@ -56,7 +52,8 @@ class Network:
     """
 
     def __init__(self, network_size: int, start_method: str = "spawn",
-                 backend: dist.Backend = dist.Backend.GLOO):
+                 backend: dist.Backend = dist.Backend.GLOO, master_addr: str or None = None,
+                 master_port: int or None = None):
         """
         Initialize a network class.
 
@@ -70,6 +67,12 @@ class Network:
             backend (int, optional): The backend of distributed network environment,
             depending on build-time configurations, valid values include mpi, gloo,
             and nccl. Defaults to dist.Backend.GLOO.
+
+            master_addr (str, optional): Address of the host running the server (rank 0).
+            Defaults to the MASTER_ADDR environment variable, or 127.0.0.1.
+
+            master_port (int, optional): Free port on the server host. Defaults to the
+            MASTER_PORT environment variable, or 29500.
         """
         if not dist.is_available():
             raise ModuleNotFoundError("Pytorch distributed package is missing.")
@@ -86,8 +89,34 @@ class Network:
         # Set a default server rank
         self.server_rank = 0
 
+        # Rendezvous of the process group, all agents must agree on it
+        self.master_addr = master_addr if master_addr is not None else os.environ.get('MASTER_ADDR', '127.0.0.1')
+        self.master_port = str(master_port if master_port is not None else os.environ.get('MASTER_PORT', 29500))
+
         # Initialize the multi-processing
-        mp.set_start_method(start_method)
+        mp.set_start_method(start_method, force=True)
+
+    def __getstate__(self):
+        # Started processes cannot be pickled, which happens for every spawned agent
+        state = self.__dict__.copy()
+        state['process_array'] = []
+        return state
+
+    def init_process_group(self, agent_rank: int):
+        """
+        Join the process group of the network. Agents on other hosts call this directly
+        with their own rank instead of being spawned by execute_all_process.
+
+        Args:
+            agent_rank (int): The rank of the agent joining the network.
+        """
+
+        # The ip/port set for starting the distributed process
+        os.environ['MASTER_ADDR'] = self.master_addr
+        os.environ['MASTER_PORT'] = self.master_port
+
+        # Initialize the process group by Pytorch function
+        dist.init_process_group(self.backend, rank=agent_rank, world_size=self.network_size)
 
     def init_process(self, agent_rank: int, run_function: Callable):
         """
@@ -99,15 +128,13 @@ class Network:
             agent.
         """
 
-        # The ip/port set for starting the distributed process
-        os.environ['MASTER_ADDR'] = '127.0.0.1'
-        os.environ['MASTER_PORT'] = '29500'
-
-        # Initialize the process group by Pytorch function
-        dist.init_process_group(self.backend, rank=agent_rank, world_size=self.network_size)
+        self.init_process_group(agent_rank)
 
         # Run the process associated with this agent
-        run_function(agent_rank)
+        try:
+            run_function(agent_rank)
+        finally:
+            dist.destroy_process_group()
 
     def execute_all_process(self, run_function: Callable):
         """
@@ -117,16 +144,21 @@ class Network:
         develop a concurrent paradigm for all the agents.
         """
 
-        # Detach a thread for each agent
+        # Detach a process for each agent
+        self.process_array = list()
         for rank in range(self.network_size):
             p = mp.Process(target=self.init_process, args=(rank, run_function))
             p.start()
-            process_array.append(p)
+            self.process_array.append(p)
 
-        # Join the detached threads
-        for p in process_array:
+        # Join the detached processes
+        for p in self.process_array:
             p.join()
 
+        failed_ranks = [rank for rank, p in enumerate(self.process_array) if p.exitcode != 0]
+        if failed_ranks:
+            raise RuntimeError(f'Agents {failed_ranks} exited with an error.')
+
     def run_send_recv(self, agent_rank: int):
         """
         Simple send and receive script. The agent with the server rank will initiate
@@ -0,0 +1,354 @@
+"""
+    File name: distributed_simulation.py
+    Python Version: 3.8
+    Description: Federated ENCO with one process per client, communicating through the
+        distributed Network class. The processes may live on different hosts.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import os, sys
+import pickle
+import argparse
+
+import torch
+import torch.distributed as dist
+import numpy as np
+
+from typing import Dict, List
+
+sys.path.append("../")
+from federated.logging_settings import logger
+from federated.causal_learning import ENCOAlg
+from federated.dataset_cache import DatasetCache
+from federated.distributed_network import Network
+from federated.federated_simulation import FederatedSimulator
+
+
+class DistributedFederatedSimulator:
+    """
+    Server/client runtime of the federated simulation. Rank 0 is the server, and rank r > 0
+    hosts client r - 1. In every round, the server broadcasts the priors, the clients run ENCO
+    locally and the aggregation is computed by a sum reduction of the clients' weighted
+    gamma/theta matrices onto the server. Only float32 tensors of the size of the graph are
+    exchanged, the data never leaves the clients.
+
+    Every agent generates the global dataset from the same seed, so no data is transferred for
+    the simulation either. The server stores the same results file as FederatedSimulator.
+    """
+
+    def __init__(self, network: Network, accessible_interventions: Dict[int, List[int]],
+                 num_rounds: int = 5, experiment_id: int = 0, repeat_id: int = 0,
+                 output_dir: str = 'default_federated_experiment', convergence_tol: float or None = None,
+                 convergence_patience: int = 2):
+        """ Initialize a distributed federated setup.
+
+        Args:
+            network (Network): The network of one server and the clients.
+            accessible_interventions(Dict[int, List[int]]): A dictionary containing the number of
+                intervened variables for each client. The key is client id.
+            num_rounds (int, optional): Total number of federated rounds. Defaults to 5.
+            experiment_id (int, optional): Unique id of this experiment. Defaults to 0.
+            repeat_id (int, optional): Number of random seeds for each simulation. Defaults to 0.
+            output_dir (str, optional): Directory for saving the results on the server. Defaults to
+                'default_federated_experiment'.
+            convergence_tol (float or None, optional): Stop a client's local training once it converged,
+                see FederatedSimulator. Defaults to None.
+            convergence_patience (int, optional): Number of consecutive converged epochs before a client
+                stops. Defaults to 2.
+        """
+
+        self.network = network
+        self.num_clients = network.network_size - 1
+        assert self.num_clients > 0, "The network needs at least one client next to the server."
+
+        self.num_rounds = num_rounds
+        assert num_rounds > 0, "Number of rounds should be at least 1."
+
+        self.interventions_dict = accessible_interventions
+        assert len(self.interventions_dict.keys()) == self.num_clients, \
+            "Insufficient accessible interventions info."
+
+        self.experiment_id = experiment_id
+        self.repeat_id = repeat_id
+        self.output_dir = output_dir
+        self.convergence_tol = convergence_tol
+        self.convergence_patience = convergence_patience
+
+        self.data_kwargs: Dict = dict()
+        self.simulation_kwargs: Dict = dict()
+
+    def initialize_clients_data(self, graph_type: str = "chain", num_vars = 30,
+                                accessible_data_percentage: int = 100,
+                                obs_data_size: int = 20000, int_data_size: int = 2000,
+                                edge_prob: float or None = None, seed: int = 0,
+                                dataset_cache: DatasetCache = None):
+        """ Record the dataset parameters, the data itself is generated by every agent.
+
+        Args:
+            graph_type (str, optional): Type of the graph. Defaults to "chain".
+            num_vars (int, optional): Size of the graph. Defaults to 30.
+            accessible_data_percentage (int, optional): The amount of local dataset that clients can see.
+                Defaults to 100.
+            obs_data_size (int, optional): Global observational dataset size. Defaults to 20000.
+            int_data_size (int, optional): Global interventional dataset size. Defaults to 2000.
+            edge_prob (floatorNone, optional): Edge existence probability only for random graphs.
+                Defaults to None.
+            seed (int, optional): Define a random seed for the dataset and graph generation.
+                Defaults to 0.
+            dataset_cache (DatasetCache, optional): Cache of global datasets on each host. Defaults to None.
+        """
+
+        self.data_kwargs = dict(graph_type=graph_type, num_vars=num_vars,
+                                accessible_data_percentage=accessible_data_percentage,
+                                obs_data_size=obs_data_size, int_data_size=int_data_size,
+                                edge_prob=edge_prob, seed=seed, dataset_cache=dataset_cache)
+
+    def execute_simulation(self, aggregation_method: str = "naive", num_epochs: int = 2, **kwargs):
+        """ Spawn all agents on this host and run the simulation.
+
+        Args:
+            aggregation_method (str, optional): Type of aggregation, "locality" or "naive".
+                Defaults to "naive".
+            num_epochs (int, optional): Number of epochs for the local learning method. Defaults to 2.
+            kwargs (dict, optinal): Any other argument that should be passed to the aggregation function.
+        """
+
+        self.set_simulation_kwargs(aggregation_method, num_epochs, **kwargs)
+        self.network.execute_all_process(self.run_agent)
+
+    def join_simulation(self, agent_rank: int, aggregation_method: str = "naive", num_epochs: int = 2,
+                        **kwargs):
+        """ Run a single agent of a simulation spread over several hosts. All agents have to be
+        started with the same arguments and their own rank.
+
+        Args:
+            agent_rank (int): Rank of this agent, 0 for the server.
+            aggregation_method (str, optional): Type of aggregation, "locality" or "naive".
+                Defaults to "naive".
+            num_epochs (int, optional): Number of epochs for the local learning method. Defaults to 2.
+            kwargs (dict, optinal): Any other argument that should be passed to the aggregation function.
+        """
+
+        self.set_simulation_kwargs(aggregation_method, num_epochs, **kwargs)
+        self.network.init_process(agent_rank, self.run_agent)
+
+    def set_simulation_kwargs(self, aggregation_method: str, num_epochs: int, **kwargs):
+        assert self.data_kwargs, "Clients are not initialized."
+        assert aggregation_method in ["naive", "locality"], "Aggregation method not yet defined."
+        self.simulation_kwargs = dict(aggregation_method=aggregation_method, num_epochs=num_epochs,
+                                      aggregation_kwargs=kwargs)
+
+    def run_agent(self, agent_rank: int):
+        """ The process of a single agent, executed after joining the process group.
+
+        Args:
+            agent_rank (int): Rank of the agent.
+        """
+
+        data_kwargs = dict(self.data_kwargs)
+        accessible_data_percentage = data_kwargs.pop('accessible_data_percentage')
+        num_vars = data_kwargs['num_vars']
+        global_dataset_dag = ENCOAlg.build_global_dataset(data_kwargs['obs_data_size'],
+                                                          data_kwargs['int_data_size'], num_vars,
+                                                          data_kwargs['graph_type'],
+                                                          edge_prob=data_kwargs['edge_prob'],
+                                                          seed=data_kwargs['seed'],
+                                                          dataset_cache=data_kwargs['dataset_cache'])
+
+        if agent_rank == self.network.server_rank:
+            self.run_server(global_dataset_dag.adj_matrix, num_vars)
+        else:
+            client_id = agent_rank - 1
+            client = ENCOAlg(client_id, global_dataset_dag, accessible_data_percentage,
+                             self.num_clients, self.interventions_dict[client_id])
+            self.run_client(client, num_vars)
+
+    def broadcast_priors(self, prior_gamma: np.ndarray or None, prior_theta: np.ndarray or None,
+                         num_vars: int):
+        """ Send the priors from the server to all clients, called by every agent.
+
+        Returns:
+            np.ndarray or None, np.ndarray or None: The priors, None before the first aggregation.
+        """
+
+        has_prior = torch.tensor([float(prior_gamma is not None)])
+        dist.broadcast(has_prior, src=self.network.server_rank)
+        if not has_prior.item():
+            return None, None
+
+        priors = torch.zeros(2, num_vars, num_vars)
+        if prior_gamma is not None:
+            priors = torch.from_numpy(np.stack([prior_gamma, prior_theta])).float()
+        dist.broadcast(priors, src=self.network.server_rank)
+
+        priors = priors.numpy().astype(np.float64)
+        return priors[0], priors[1]
+
+    def run_server(self, ground_truth_matrix: np.ndarray, num_vars: int):
+        """ Broadcast the priors, reduce the clients' updates and track the results per round.
+        """
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        results = {key: list() for key in ['round_adjs', 'round_gammas', 'round_thetas', 'round_metrics',
+                                           'round_acycle_adjs', 'round_acycle_metrics']}
+        for client_id in range(self.num_clients):
+            results[f'client_{client_id}_adjs'] = list()
+            results[f'client_{client_id}_metrics'] = list()
+            results[f'client_{client_id}_metrics_acycle'] = list()
+            results[f'client_{client_id}_epochs'] = list()
+
+        prior_gamma, prior_theta = None, None
+        for round_id in range(self.num_rounds):
+            logger.info(f'Initiating round {round_id} of distributed federated setup')
+            self.broadcast_priors(prior_gamma, prior_theta, num_vars)
+
+            """ Aggregation stage """
+            updates = torch.zeros(3, num_vars, num_vars)
+            dist.reduce(updates, dst=self.network.server_rank, op=dist.ReduceOp.SUM)
+            updates = updates.numpy().astype(np.float64)
+
+            prior_gamma = updates[0] / updates[2]
+            prior_theta = updates[1] / updates[2]
+            if self.simulation_kwargs['aggregation_method'] == "locality":
+                prior_theta = FederatedSimulator.adjust_theta(prior_theta)
+
+            client_adjs = [torch.zeros(num_vars, num_vars) for _ in range(self.network.network_size)]
+            dist.gather(torch.zeros(num_vars, num_vars), gather_list=client_adjs, dst=self.network.server_rank)
+            client_metrics = [None for _ in range(self.network.network_size)]
+            dist.gather_object(None, client_metrics, dst=self.network.server_rank)
+
+            """ Store round results """
+            round_adj, round_acyclic_adj, round_metrics, round_acycle_metrics = \
+                FederatedSimulator.evaluate_priors(prior_gamma, prior_theta, ground_truth_matrix)
+            results['round_gammas'].append(prior_gamma)
+            results['round_thetas'].append(prior_theta)
+            results['round_adjs'].append(round_adj)
+            results['round_metrics'].append(round_metrics)
+            results['round_acycle_adjs'].append(round_acyclic_adj)
+            results['round_acycle_metrics'].append(round_acycle_metrics)
+
+            for client_id in range(self.num_clients):
+                results[f'client_{client_id}_adjs'].append(client_adjs[client_id + 1].numpy().astype(int))
+                results[f'client_{client_id}_metrics'].append(client_metrics[client_id + 1][0])
+                results[f'client_{client_id}_metrics_acycle'].append(client_metrics[client_id + 1][1])
+                results[f'client_{client_id}_epochs'].append(client_metrics[client_id + 1][2])
+
+            logger.info(f'End of the round results: \n {round_adj} \n {round_metrics} \n')
+
+        file_dir = os.path.join(self.output_dir, f'results_{self.experiment_id}_{self.repeat_id}.pickle')
+        with open(file_dir, 'wb') as handle:
+            pickle.dump(results, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def run_client(self, client: ENCOAlg, num_vars: int):
+        """ Run the local inference on the received priors and send the weighted updates.
+        """
+
+        aggregation_method = self.simulation_kwargs['aggregation_method']
+        aggregation_kwargs = self.simulation_kwargs['aggregation_kwargs']
+        gpu_name = f'cuda:{client.get_client_id() % max(torch.cuda.device_count(), 1)}'
+
+        for round_id in range(self.num_rounds):
+            prior_gamma, prior_theta = self.broadcast_priors(None, None, num_vars)
+
+            """ Inference stage """
+            client.infer_causal_structure(prior_gamma, prior_theta, self.simulation_kwargs['num_epochs'],
+                                          gpu_name, convergence_tol=self.convergence_tol,
+                                          convergence_patience=self.convergence_patience)
+
+            """ Aggregation stage, the weights are summed up on the server as well """
+            if aggregation_method == "naive":
+                weight_mat = np.full((num_vars, num_vars), float(client.get_accessible_percentage()))
+            else:
+                reference_adjacency_mat = client.binary_adjacency_mat if prior_gamma is None else \
+                    FederatedSimulator.get_binary_adjacency_mat(prior_gamma, prior_theta)
+                weight_mat = FederatedSimulator.get_locality_scores(
+                    reference_adjacency_mat, client.get_interventions_list(),
+                    aggregation_kwargs['initial_mass'][client.get_client_id()],
+                    aggregation_kwargs['alpha'], aggregation_kwargs.get('min_mass', 1.0))
+
+            updates = torch.from_numpy(np.stack([weight_mat * client.inferred_existence_mat,
+                                                 weight_mat * client.inferred_orientation_mat,
+                                                 weight_mat])).float()
+            dist.reduce(updates, dst=self.network.server_rank, op=dist.ReduceOp.SUM)
+
+            dist.gather(torch.from_numpy(client.binary_adjacency_mat).float(), dst=self.network.server_rank)
+            dist.gather_object((client.metrics_dict, client.metrics_dict_acycle, client.epochs_run),
+                               dst=self.network.server_rank)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Distributed federated causal discovery. Either spawn all '
+    'agents on this host (default), or pass --rank to run a single agent and start the other ranks on '
+    'other hosts with the same arguments.')
+
+    parser.add_argument("-nc", "--num-clients", default=2, type=int,
+        help="Number of clients, the network additionally contains the server.")
+    parser.add_argument("-r", "--rank", default=None, type=int,
+        help="Rank of this agent for multi-host runs, 0 is the server.")
+    parser.add_argument("-ma", "--master-addr", default=None, type=str,
+        help="Address of the server host. Defaults to MASTER_ADDR or 127.0.0.1.")
+    parser.add_argument("-mp", "--master-port", default=None, type=int,
+        help="Port on the server host. Defaults to MASTER_PORT or 29500.")
+
+    parser.add_argument("-gt", "--graph-type", default="chain", type=str,
+        help="Graph type for the experiments, random graphs use --edge-prob.")
+    parser.add_argument("-gs", "--graph-size", default=20, type=int,
+        help="Size of the graph for underlying data generation process.")
+    parser.add_argument("-ep", "--edge-prob", default=None, type=float,
+        help="Edge probability for random graphs.")
+    parser.add_argument("-ods", "--obs-data-size", default=20000, type=int,
+        help="Size of the global observational dataset.")
+    parser.add_argument("-ids", "--int-data-size", default=2000, type=int,
+        help="Size of the global interventional dataset.")
+    parser.add_argument("-s", "--seed", default=0, type=int,
+        help="Seed of the graph and dataset generation.")
+
+    parser.add_argument("-nr", "--num-rounds", default=5, type=int,
+        help="Total number of federated rounds.")
+    parser.add_argument("-ne", "--num-epochs", default=2, type=int,
+        help="Number of ENCO epochs per round.")
+    parser.add_argument("-at", "--aggregation-type", default="naive", type=str,
+        help="Type of aggregation: either naive or locality.")
+    parser.add_argument("-ct", "--convergence-tol", default=None, type=float,
+        help="Stop a client's local training once its edge probabilities change by at most this value.")
+    parser.add_argument("-od", "--output-dir", default='distributed_federated_experiment', type=str,
+        help="Directory of the results on the server.")
+
+    args = parser.parse_args()
+
+    from federated.utils import split_variables_evenly
+
+    network = Network(args.num_clients + 1, master_addr=args.master_addr, master_port=args.master_port)
+    splits = split_variables_evenly(args.graph_size, args.num_clients, args.seed)
+    interventions_dict = {client_id: list(splits[client_id]) for client_id in range(args.num_clients)}
+
+    simulator = DistributedFederatedSimulator(network, interventions_dict, num_rounds=args.num_rounds,
+                                              repeat_id=args.seed, output_dir=args.output_dir,
+                                              convergence_tol=args.convergence_tol)
+    simulator.initialize_clients_data(graph_type=args.graph_type, num_vars=args.graph_size,
+                                      obs_data_size=args.obs_data_size, int_data_size=args.int_data_size,
+                                      edge_prob=args.edge_prob, seed=args.seed)
+
+    aggregation_kwargs = dict()
+    if args.aggregation_type == "locality":
+        aggregation_kwargs = dict(initial_mass=np.full(args.num_clients, 16), alpha=0.5, beta=0.3, min_mass=1.0)
+
+    if args.rank is None:
+        simulator.execute_simulation(args.aggregation_type, args.num_epochs, **aggregation_kwargs)
+    else:
+        simulator.join_simulation(args.rank, args.aggregation_type, args.num_epochs, **aggregation_kwargs)
@@ -33,13 +33,34 @@ import shutil
 from typing import Dict, List
 
 sys.path.append("../")
-from federated.utils import calculate_metrics, find_shortest_distance_dict
+from federated.utils import calculate_metrics_batch, split_batch_metrics, find_shortest_distance_dict, \
+    calculate_edge_entropy
 from federated.logging_settings import logger
 from federated.causal_learning import ENCOAlg
+from federated.dataset_cache import DatasetCache
+from federated.thread_budget import ThreadBudget, thread_env, apply_thread_limits
+from federated.prior_codecs import PriorExchangeCodec, get_dense_size
+from federated.hierarchical_aggregation import PartialSum, aggregate_flat, aggregate_tree
+from federated.profiling import StageProfiler
+from federated.compute_budget import EpochBudgetScheduler
 from causal_graphs.graph_definition import CausalDAGDataset
 from causal_discovery.utils import find_best_acyclic_graph
 
 
+def run_client_inference(client: ENCOAlg, num_threads: int, cpu_ids: List[int] or None, *args):
+    """ Entry point of a client process, which limits its threads before the inference.
+
+    Args:
+        client (ENCOAlg): The client to run.
+        num_threads (int): Share of the CPU budget of this client.
+        cpu_ids (List[int] or None): CPUs to pin the client to, if any.
+        args: Arguments of ENCOAlg.infer_causal_structure.
+    """
+
+    apply_thread_limits(num_threads, cpu_ids)
+    client.infer_causal_structure(*args)
+
+
 class FederatedSimulator:
     """
     Design a simulation for learning causal graphs in federated setup.
@@ -56,7 +77,12 @@ class FederatedSimulator:
     def __init__(self, accessible_interventions: Dict[int, List[int]],
                  num_rounds: int = 5, num_clients: int = 2, experiment_id: int = 0,
                  repeat_id: int = 0, output_dir: str = 'default_federated_experiment',
-                 client_parallelism: bool = False, verbose: bool = False):
+                 client_parallelism: bool = False, cpu_budget: int or None = None,
+                 pin_cpus: bool = False, prior_codec: PriorExchangeCodec = None,
+                 aggregation_fan_in: int or None = None, aggregation_workers: int = 0,
+                 export_trace: bool = False, convergence_tol: float or None = None,
+                 convergence_patience: int = 2, budget_scheduler: EpochBudgetScheduler = None,
+                 verbose: bool = False):
         """ Initialize a federated setup for simulation.
 
         Args:
@@ -69,8 +95,28 @@ class FederatedSimulator:
             output_dir (str, optional): Directory for saving the results. Defaults to
                 'default_federated_experiment'.
 
-            client_parallelism (bool, optional): Set True if you have enough GPU to give each client one.
-                Defaults to False.
+            client_parallelism (bool, optional): Set True to run the clients in parallel processes. With
+                CUDA, there should be enough GPUs to give each client one. Defaults to False.
+            cpu_budget (int or None, optional): Total number of CPU threads shared by the parallel clients.
+                Defaults to None, which uses all available CPUs.
+            pin_cpus (bool, optional): Set True to pin each parallel client to its own CPUs. Defaults to False.
+            prior_codec (PriorExchangeCodec, optional): Compress the client updates and the priors exchanged
+                in each round. Defaults to None, i.e., dense float64 matrices.
+            aggregation_fan_in (int or None, optional): Aggregate over a tree of sub-aggregators, each
+                combining at most this many partial sums. The result is identical to the flat aggregation.
+                Defaults to None, i.e., a single server.
+            aggregation_workers (int, optional): Number of local processes running the sub-aggregators
+                of the tree. Defaults to 0.
+            export_trace (bool, optional): Save the recorded stages as Chrome trace JSON next to the
+                results. Defaults to False.
+            convergence_tol (float or None, optional): Stop a client's local training once its binary
+                adjacency matrix is stable and its edge probabilities change by at most this value per
+                epoch. Defaults to None, i.e., every client trains for all epochs.
+            convergence_patience (int, optional): Number of consecutive converged epochs before a client
+                stops. Defaults to 2.
+            budget_scheduler (EpochBudgetScheduler, optional): Assign each client its epochs and ENCO
+                iterations per round based on its data size, the edge entropy among the clients and
+                the measured speed of the clients. Defaults to None, i.e., num_epochs for all clients.
             verbose (bool, optional): Set True to see more detailed output. Defaults to False.
         """
 
@@ -94,10 +140,23 @@ class FederatedSimulator:
 
         if verbose: logger.setLevel(logging.DEBUG)
         if self.__client_parallelism:
-            gpu_count = torch.cuda.device_count()
-            assert gpu_count >= self.__num_clients, \
-                f'{gpu_count} GPU(s) not enough to perform {self.__num_clients}-client parallelism'
+            if torch.cuda.is_available():
+                gpu_count = torch.cuda.device_count()
+                assert gpu_count >= self.__num_clients, \
+                    f'{gpu_count} GPU(s) not enough to perform {self.__num_clients}-client parallelism'
             torch.multiprocessing.set_start_method('spawn', force=True)
+        self.__thread_budget = ThreadBudget(cpu_budget, pin_cpus)
+        self.__prior_codec = prior_codec
+        self.__aggregation_fan_in = aggregation_fan_in
+        self.__aggregation_workers = aggregation_workers
+
+        # Wall time, CPU time and memory of each stage, for every round and client
+        self.profiler = StageProfiler()
+        self.__export_trace = export_trace
+
+        self.__convergence_tol = convergence_tol
+        self.__convergence_patience = convergence_patience
+        self.__budget_scheduler = budget_scheduler
 
         self.results: Dict[str, List] = dict()
         self.initialize_results_dict()
@@ -106,7 +165,8 @@ class FederatedSimulator:
                                 accessible_data_percentage: int = 100,
                                 obs_data_size: int = 20000, int_data_size: int = 2000,
                                 edge_prob: float or None = None, seed: int = 0,
-                                external_global_dataset: CausalDAGDataset = None):
+                                external_global_dataset: CausalDAGDataset = None,
+                                dataset_cache: DatasetCache = None):
         """ Initialize client and clients' data for the number of clients in the federated setup.
 
         Args:
@@ -121,6 +181,8 @@ class FederatedSimulator:
                 Defaults to None.
             seed (int, optional): Define a random seed for the dataset and graph generation.
                 Defaults to 0.
+            dataset_cache (DatasetCache, optional): Reuse global datasets generated with identical
+                parameters. Defaults to None.
         """
 
         # handle real-world data as an externally initialized dataset
@@ -131,14 +193,16 @@ class FederatedSimulator:
 
         else:
             self.__num_vars = num_vars
-            global_dataset_dag = ENCOAlg.build_global_dataset(obs_data_size, int_data_size,
-                                                            num_vars, graph_type, edge_prob=edge_prob,
-                                                            seed=seed)
+            with self.profiler.stage('dataset_build'):
+                global_dataset_dag = ENCOAlg.build_global_dataset(obs_data_size, int_data_size,
+                                                                num_vars, graph_type, edge_prob=edge_prob,
+                                                                seed=seed, dataset_cache=dataset_cache)
 
         for client_id in range(self.__num_clients):
             try:
-                enco_module = ENCOAlg(client_id, global_dataset_dag, accessible_data_percentage,
-                                      self.__num_clients, self.__interventions_dict[client_id])
+                with self.profiler.stage('client_setup', client=client_id):
+                    enco_module = ENCOAlg(client_id, global_dataset_dag, accessible_data_percentage,
+                                          self.__num_clients, self.__interventions_dict[client_id])
             except ValueError:
                 logger.error(f'Global dataset missing for client {client_id}!')
                 return
@@ -155,10 +219,13 @@ class FederatedSimulator:
         self.results['round_metrics'] = list()
         self.results['round_acycle_adjs'] = list()
         self.results['round_acycle_metrics'] = list()
+        self.results['round_bytes'] = list()
+        self.results['round_budgets'] = list()
 
         self.results.update({f'client_{client_id}_metrics_acycle': list() for client_id in range(self.__num_clients)})
         self.results.update({f'client_{client_id}_metrics': list() for client_id in range(self.__num_clients)})
         self.results.update({f'client_{client_id}_adjs': list() for client_id in range(self.__num_clients)})
+        self.results.update({f'client_{client_id}_epochs': list() for client_id in range(self.__num_clients)})
 
     def execute_simulation(self, aggregation_method: str = "naive", num_epochs: int = 2,
                            **kwargs):
@@ -178,19 +245,41 @@ class FederatedSimulator:
 
         prior_gamma: np.ndarray = None
         prior_theta: np.ndarray = None
+        received_gamma: np.ndarray = None
+        received_theta: np.ndarray = None
 
         """ Federated loop """
         for round_id in range(self.__num_rounds):
             logger.info(f'Initiating round {round_id} of federated setup')
 
-            """ Inference stage"""
-            self.infer_local_models(prior_gamma, prior_theta, num_epochs)
-
-            """ Aggregation stage """
-            agg_gamma, agg_theta = self.aggregate_clients_updates(aggregation_method, round_id, **kwargs)
-
-            """ Store round results """
-            self.update_results(agg_gamma, agg_theta)
+            with self.profiler.scope(round=round_id):
+                """ Communication of the priors """
+                with self.profiler.stage('transport', direction='download'):
+                    received_gamma, received_theta, download_bytes = \
+                        self.transmit_priors(prior_gamma, prior_theta, received_gamma, received_theta)
+
+                """ Inference stage"""
+                budgets = self.schedule_clients_budgets(num_epochs)
+                with self.profiler.stage('local_inference'):
+                    self.infer_local_models(received_gamma, received_theta, num_epochs, budgets)
+                for client in self.__clients:
+                    client_events = client.profiler.pop_events()
+                    self.profiler.add_events(client_events, client=client.get_client_id(), round=round_id)
+                    if budgets is not None:
+                        self.observe_client_speed(client, budgets[client.get_client_id()], client_events)
+
+                """ Communication of the updates """
+                with self.profiler.stage('transport', direction='upload'):
+                    upload_bytes = self.transmit_clients_updates(received_gamma, received_theta)
+                self.results['round_bytes'].append({'download': download_bytes, 'upload': upload_bytes})
+
+                """ Aggregation stage """
+                with self.profiler.stage('aggregation'):
+                    agg_gamma, agg_theta = self.aggregate_clients_updates(aggregation_method, round_id, **kwargs)
+
+                """ Store round results """
+                with self.profiler.stage('metrics'):
+                    self.update_results(agg_gamma, agg_theta)
 
             """ Incorporate beliefs"""
             prior_gamma, prior_theta = agg_gamma, agg_theta
@@ -200,7 +289,48 @@ class FederatedSimulator:
 
         logger.info(f'Finishing experiment {self.__experiment_id}\n')
 
-    def infer_local_models(self, prior_gamma: np.ndarray, prior_theta: np.ndarray, num_epochs):
+    def schedule_clients_budgets(self, num_epochs: int) -> Dict[int, Dict[str, int]] or None:
+        """ Compute budgets of the clients for the next round, if a budget scheduler is set.
+
+        Args:
+            num_epochs (int): Default number of epochs for ENCO.
+
+        Returns:
+            Dict[int, Dict[str, int]] or None: num_epochs, model_iters and graph_iters of each client.
+        """
+
+        if self.__budget_scheduler is None:
+            return None
+
+        edge_entropy = None
+        if len(self.results['round_adjs']) > 0:
+            edge_entropy = calculate_edge_entropy([self.results[f'client_{client.get_client_id()}_adjs'][-1]
+                                                   for client in self.__clients])
+
+        budgets = self.__budget_scheduler.schedule(
+            num_epochs, {client.get_client_id(): client.get_num_samples() for client in self.__clients},
+            {client.get_client_id(): client.get_interventions_list() for client in self.__clients}, edge_entropy)
+        self.results['round_budgets'].append(budgets)
+        logger.info(f'Clients budgets of the round: {budgets}')
+
+        return budgets
+
+    def observe_client_speed(self, client: ENCOAlg, budget: Dict[str, int], client_events: List[Dict]):
+        """ Pass the measured fitting times of a client in this round to the budget scheduler.
+
+        Args:
+            client (ENCOAlg): The client.
+            budget (Dict[str, int]): The budget the client ran with.
+            client_events (List[Dict]): The stages recorded by the client in this round.
+        """
+
+        distribution_seconds = sum(e['wall'] for e in client_events if e['name'] == 'distribution_fitting')
+        graph_seconds = sum(e['wall'] for e in client_events if e['name'] == 'graph_fitting')
+        self.__budget_scheduler.observe(client.get_client_id(), dict(budget, epochs_run=client.epochs_run),
+                                        distribution_seconds, graph_seconds)
+
+    def infer_local_models(self, prior_gamma: np.ndarray, prior_theta: np.ndarray, num_epochs,
+                           budgets: Dict[int, Dict[str, int]] or None = None):
         """Execute the local learning methods for all clients.
 
         Note: Higher levels of parallelism are possible by defining client_parallelism in the instantiation step.
@@ -209,22 +339,36 @@ class FederatedSimulator:
             prior_gamma (np.ndarray): Prior for edge existence matrix.
             prior_theta (np.ndarray): Prior for edge orientation matrix.
             num_epochs (int): Number of epochs for ENCO.
+            budgets (Dict[int, Dict[str, int]] or None, optional): Epochs and ENCO iterations of each
+                client, overriding num_epochs. Defaults to None.
         """
 
+        if budgets is None:
+            budgets = {client.get_client_id(): {'num_epochs': num_epochs, 'model_iters': 1000, 'graph_iters': 100}
+                       for client in self.__clients}
+
         if self.__client_parallelism:
             setup_cache_path = os.path.join(self.__output_dir, '.mpcache', f'res-{self.__experiment_id}')
             os.makedirs(setup_cache_path, exist_ok=True)
 
+            # Divide the CPU budget among the clients to avoid oversubscription
+            allocations = self.__thread_budget.split(len(self.__clients))
+
             clients_processes = list()
-            for client in self.__clients:
+            for client, (num_threads, cpu_ids) in zip(self.__clients, allocations):
                 gpu_name = f'cuda:{client.get_client_id()}'
                 setup_cache_file = os.path.join(setup_cache_path, f'{id(client)}.pickle')
-                client_process = torch.multiprocessing.Process(target=client.infer_causal_structure,
-                                                               args=(prior_gamma, prior_theta, num_epochs, gpu_name,
-                                                                     setup_cache_file,))
+                budget = budgets[client.get_client_id()]
+                client_process = torch.multiprocessing.Process(target=run_client_inference,
+                                                               args=(client, num_threads, cpu_ids, prior_gamma,
+                                                                     prior_theta, budget['num_epochs'], gpu_name,
+                                                                     setup_cache_file, self.__convergence_tol,
+                                                                     self.__convergence_patience,
+                                                                     budget['model_iters'], budget['graph_iters'],))
                 clients_processes.append(client_process)
 
-            for client_p in clients_processes: client_p.start()
+            with thread_env(allocations[0][0]):
+                for client_p in clients_processes: client_p.start()
             for client_p in clients_processes: client_p.join()
 
             for client in self.__clients:
@@ -232,7 +376,68 @@ class FederatedSimulator:
                 client.retrieve_results(setup_cache_file)
         else:
             for client in self.__clients:
-                    client.infer_causal_structure(prior_gamma, prior_theta, num_epochs)
+                    budget = budgets[client.get_client_id()]
+                    client.infer_causal_structure(prior_gamma, prior_theta, budget['num_epochs'],
+                                                  convergence_tol=self.__convergence_tol,
+                                                  convergence_patience=self.__convergence_patience,
+                                                  model_iters=budget['model_iters'],
+                                                  graph_iters=budget['graph_iters'])
+
+        epochs_saved = sum(client.epochs_saved for client in self.__clients)
+        if epochs_saved > 0:
+            total_epochs = sum(budget['num_epochs'] for budget in budgets.values())
+            logger.info(f'Converged clients saved {epochs_saved} of {total_epochs} epochs')
+
+    def transmit_priors(self, prior_gamma: np.ndarray or None, prior_theta: np.ndarray or None,
+                        last_gamma: np.ndarray or None, last_theta: np.ndarray or None):
+        """ Send the priors from the server to all clients.
+
+        Args:
+            prior_gamma (np.ndarray or None): Prior for edge existence, None in the first round.
+            prior_theta (np.ndarray or None): Prior for edge orientation, None in the first round.
+            last_gamma (np.ndarray or None): Prior gamma the clients received in the previous round.
+            last_theta (np.ndarray or None): Prior theta the clients received in the previous round.
+
+        Returns:
+            np.ndarray or None, np.ndarray or None, int: The priors as received by the clients, and the
+                number of bytes sent to all clients.
+        """
+
+        if prior_gamma is None:
+            return None, None, 0
+
+        if self.__prior_codec is None:
+            return prior_gamma, prior_theta, get_dense_size(self.__num_vars) * self.__num_clients
+
+        received_gamma, received_theta, num_bytes = self.__prior_codec.transmit(prior_gamma, prior_theta,
+                                                                                last_gamma, last_theta,
+                                                                                is_prior=True)
+        return received_gamma, received_theta, num_bytes * self.__num_clients
+
+    def transmit_clients_updates(self, reference_gamma: np.ndarray or None,
+                                 reference_theta: np.ndarray or None) -> int:
+        """ Send the inferred gamma and theta matrices of all clients to the server. With a codec,
+        the clients' matrices are replaced by the ones the server decodes.
+
+        Args:
+            reference_gamma (np.ndarray or None): The prior gamma of this round, known to both sides.
+            reference_theta (np.ndarray or None): The prior theta of this round, known to both sides.
+
+        Returns:
+            int: Number of bytes sent by all clients.
+        """
+
+        if self.__prior_codec is None:
+            return get_dense_size(self.__num_vars) * self.__num_clients
+
+        num_bytes = 0
+        for client in self.__clients:
+            client.inferred_existence_mat, client.inferred_orientation_mat, client_bytes = \
+                self.__prior_codec.transmit(client.inferred_existence_mat, client.inferred_orientation_mat,
+                                            reference_gamma, reference_theta)
+            num_bytes += client_bytes
+
+        return num_bytes
 
     def aggregate_clients_updates(self, aggregation_method, round_id, **kwargs):
         """Perform aggregation step for all clients.
@@ -260,23 +465,35 @@ class FederatedSimulator:
             numpy.ndarray: Prior for edge orientation probabilites.
         """
 
-        weights: np.ndarray = np.zeros(shape=(self.__num_vars, 1))
-        accumulated_gamma_mat: np.ndarray = np.zeros(shape=(self.__num_vars, self.__num_vars))
-        accumulated_theta_mat: np.ndarray = np.zeros(shape=(self.__num_vars, self.__num_vars))
-
+        partial_sums: List[PartialSum] = list()
         for client in self.__clients:
-            weighted_gamma_mat = client.inferred_existence_mat * client.get_accessible_percentage()
-            accumulated_gamma_mat += weighted_gamma_mat
+            weights = np.full((self.__num_vars, 1), float(client.get_accessible_percentage()))
+            partial_sums.append(PartialSum.from_client(client.inferred_existence_mat,
+                                                       client.inferred_orientation_mat, weights))
 
-            weighted_theta_mat = client.inferred_orientation_mat * client.get_accessible_percentage()
-            accumulated_theta_mat += weighted_theta_mat
+        prior_gamma, prior_theta = self.combine_partial_sums(partial_sums)
 
-            weights += client.get_accessible_percentage()
+        return prior_gamma, prior_theta
 
-        prior_gamma: np.ndarray = accumulated_gamma_mat / weights
-        prior_theta: np.ndarray = accumulated_theta_mat / weights
+    def combine_partial_sums(self, partial_sums: List[PartialSum]):
+        """ Combine the clients' contributions, either at a single server or over a tree of sub-aggregators.
 
-        return prior_gamma, prior_theta
+        Args:
+            partial_sums (List[PartialSum]): Contributions of the clients.
+
+        Returns:
+            numpy.ndarray: Weighted average of the edge existence matrices.
+            numpy.ndarray: Weighted average of the edge orientation matrices.
+        """
+
+        if self.__aggregation_fan_in is None:
+            return aggregate_flat(partial_sums)
+
+        (agg_gamma, agg_theta), level_sizes = aggregate_tree(partial_sums, self.__aggregation_fan_in,
+                                                             self.__aggregation_workers)
+        logger.debug(f'Aggregators on each level of the tree: {level_sizes}')
+
+        return agg_gamma, agg_theta
 
     def locality_aggregation(self, initial_mass: np.ndarray, alpha: float, beta: float = 0,
                              min_mass: float = 1.0, round_id: int = 0):
@@ -303,45 +520,60 @@ class FederatedSimulator:
             reference_adjacency_mat = self.results['round_adjs'][round_id - 1]
             logger.debug(f'Setting reference adj matrix to prior: \n {reference_adjacency_mat} \n')
 
-        aggregated_gamma_mat = np.zeros(shape=(self.__num_vars, self.__num_vars))
-        aggregated_theta_mat = np.zeros(shape=(self.__num_vars, self.__num_vars))
-        sum_gamma_scores = np.zeros(shape=(self.__num_vars, self.__num_vars))
-        sum_theta_scores = np.zeros(shape=(self.__num_vars, self.__num_vars))
-
+        partial_sums: List[PartialSum] = list()
         for client in self.__clients:
-            client_score_mat = np.full((self.__num_vars, self.__num_vars), min_mass)
-
             if not reference_adj_mat_exists:
                 reference_adjacency_mat = client.binary_adjacency_mat
-                print(reference_adjacency_mat.shape)
                 logger.debug(f'Setting reference adj matrix to clients local: \n {reference_adjacency_mat} \n')
 
-            distance_to_intervened = {var_idx: find_shortest_distance_dict(var_idx, reference_adjacency_mat) \
-                                      for var_idx in client.get_interventions_list()}
-            logger.debug(f'Shortest distance {client.get_client_id()}: \n {distance_to_intervened}')
-
-            for v_i, v_j in np.transpose(np.nonzero(reference_adjacency_mat)):
-                min_dist_int = np.min([distance_to_intervened[int_var][v_i] for int_var in client.get_interventions_list()])
-                propagated_mass = np.power(alpha, min_dist_int) * initial_mass[client.get_client_id()]
-                client_score_mat[v_i][v_j] = np.max([propagated_mass, min_mass])
+            client_score_mat = FederatedSimulator.get_locality_scores(reference_adjacency_mat,
+                                                                      client.get_interventions_list(),
+                                                                      initial_mass[client.get_client_id()],
+                                                                      alpha, min_mass)
             logger.debug(f'Reliability scores for client {client.get_client_id()}: \n {client_score_mat}\n')
 
-            aggregated_gamma_mat += client_score_mat * client.inferred_existence_mat
-            sum_gamma_scores += client_score_mat
-
             logger.debug(f'Client {client.get_client_id()} orientation mat: \n {client.inferred_orientation_mat}')
-            aggregated_theta_mat += client_score_mat * client.inferred_orientation_mat
-            sum_theta_scores += client_score_mat
+            partial_sums.append(PartialSum.from_client(client.inferred_existence_mat,
+                                                       client.inferred_orientation_mat, client_score_mat))
 
-        prior_gamma = aggregated_gamma_mat / sum_gamma_scores
-        prior_theta = FederatedSimulator.adjust_theta(aggregated_theta_mat / sum_theta_scores)
+        prior_gamma, prior_theta = self.combine_partial_sums(partial_sums)
+        prior_theta = FederatedSimulator.adjust_theta(prior_theta)
 
         logger.debug(f'Aggregated gamma matrix: \n {prior_gamma}')
         logger.debug(f'Aggregated theta matrix: \n {prior_theta}')
-        logger.debug(f'Aggregated sum scores matrix: \n {sum_theta_scores}')
 
         return prior_gamma, prior_theta
 
+    @staticmethod
+    def get_locality_scores(reference_adjacency_mat: np.ndarray, interventions_list: List[int],
+                            client_mass: float, alpha: float, min_mass: float) -> np.ndarray:
+        """ Reliability scores of a client's edges, decaying with the distance to its intervened variables.
+
+        Args:
+            reference_adjacency_mat (numpy.ndarray): Adjacency matrix for measuring distances.
+            interventions_list (List[int]): Variables the client has intervened on.
+            client_mass (float): The initial mass of the client.
+            alpha (float): The reduction rate for mass flow.
+            min_mass (float): The minimum mass if no interventional info is available for an edge.
+
+        Returns:
+            numpy.ndarray: Score matrix of the client.
+        """
+
+        num_vars = reference_adjacency_mat.shape[0]
+        client_score_mat = np.full((num_vars, num_vars), min_mass)
+
+        distance_to_intervened = {var_idx: find_shortest_distance_dict(var_idx, reference_adjacency_mat) \
+                                  for var_idx in interventions_list}
+        logger.debug(f'Shortest distance: \n {distance_to_intervened}')
+
+        for v_i, v_j in np.transpose(np.nonzero(reference_adjacency_mat)):
+            min_dist_int = np.min([distance_to_intervened[int_var][v_i] for int_var in interventions_list])
+            propagated_mass = np.power(alpha, min_dist_int) * client_mass
+            client_score_mat[v_i][v_j] = np.max([propagated_mass, min_mass])
+
+        return client_score_mat
+
     def update_results(self, prior_gamma: np.ndarray, prior_theta: np.ndarray):
         """ Update the results dictionary for each round.
 
@@ -354,11 +586,8 @@ class FederatedSimulator:
         self.results['round_thetas'].append(prior_theta)
 
         ground_truth_matrix = self.__clients[0].original_adjacency_mat
-        round_discovered_matrix = FederatedSimulator.get_binary_adjacency_mat(prior_gamma, prior_theta)
-        round_acyclic_matrix = FederatedSimulator.get_acyclic_adjacency_mat(prior_gamma, prior_theta)
-
-        round_metrics = calculate_metrics(round_discovered_matrix, ground_truth_matrix)
-        round_acycle_metrics = calculate_metrics(round_acyclic_matrix, ground_truth_matrix)
+        round_discovered_matrix, round_acyclic_matrix, round_metrics, round_acycle_metrics = \
+            FederatedSimulator.evaluate_priors(prior_gamma, prior_theta, ground_truth_matrix)
 
         self.results['round_adjs'].append(round_discovered_matrix)
         self.results['round_metrics'].append(round_metrics)
@@ -369,19 +598,48 @@ class FederatedSimulator:
             self.results[f'client_{client.get_client_id()}_adjs'].append(client.binary_adjacency_mat)
             self.results[f'client_{client.get_client_id()}_metrics'].append(client.metrics_dict)
             self.results[f'client_{client.get_client_id()}_metrics_acycle'].append(client.metrics_dict_acycle)
+            self.results[f'client_{client.get_client_id()}_epochs'].append(client.epochs_run)
 
         logger.info(f'End of the round results: \n {round_discovered_matrix} \n {round_metrics} \n')
 
     def save_results(self):
         """ Save the results dictionary as a pickle file.
         """
+        self.results['stage_events'] = self.profiler.events
+
         file_dir = os.path.join(self.__output_dir, f'results_{self.__experiment_id}_{self.__repeat_id}.pickle')
         with open(file_dir, 'wb') as handle:
             pickle.dump(self.results, handle, protocol=pickle.HIGHEST_PROTOCOL)
 
+        if self.__export_trace:
+            trace_dir = os.path.join(self.__output_dir, f'trace_{self.__experiment_id}_{self.__repeat_id}.json')
+            self.profiler.export_chrome_trace(trace_dir)
+
         cache_dir = os.path.join(self.__output_dir, '.mpcache')
         # shutil.rmtree(cache_dir)
 
+    @staticmethod
+    def evaluate_priors(prior_gamma: np.ndarray, prior_theta: np.ndarray, ground_truth_matrix: np.ndarray):
+        """ Derive the binary and acyclic adjacency matrices of aggregated priors and their metrics.
+
+        Args:
+            prior_gamma (numpy.ndarray): Edge existence matrix.
+            prior_theta (numpy.ndarray): Edge orientation matrix.
+            ground_truth_matrix (numpy.ndarray): Adjacency matrix of the true graph.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray, Dict, Dict]: Binary matrix, acyclic matrix, and their metrics.
+        """
+
+        round_discovered_matrix = FederatedSimulator.get_binary_adjacency_mat(prior_gamma, prior_theta)
+        round_acyclic_matrix = FederatedSimulator.get_acyclic_adjacency_mat(prior_gamma, prior_theta)
+
+        batch_metrics = calculate_metrics_batch(np.stack([round_discovered_matrix, round_acyclic_matrix]),
+                                                ground_truth_matrix)
+        round_metrics, round_acycle_metrics = split_batch_metrics(batch_metrics)
+
+        return round_discovered_matrix, round_acyclic_matrix, round_metrics, round_acycle_metrics
+
     @staticmethod
     def get_binary_adjacency_mat(gamma: np.ndarray, theta: np.ndarray) -> np.ndarray:
         """ Calculate the adjacency matrix based on gamma and theta matrices.
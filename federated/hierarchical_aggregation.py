@@ -0,0 +1,135 @@
+"""
+    File name: hierarchical_aggregation.py
+    Python Version: 3.8
+    Description: Aggregation of client updates over a tree of sub-aggregators.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import multiprocessing
+
+import numpy as np
+
+from typing import List, Tuple
+
+
+def two_sum(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Error-free transformation of a sum: a + b = s + e exactly, with s = fl(a + b).
+    """
+
+    s = a + b
+    b_virtual = s - a
+    e = (a - (s - b_virtual)) + (b - b_virtual)
+    return s, e
+
+
+class PartialSum:
+    def __init__(self, gamma_sum: np.ndarray, theta_sum: np.ndarray, weight_sum: np.ndarray):
+        """ Weighted sums of gamma and theta matrices and of the weights, as computed by one
+        (sub-)aggregator. Every sum is kept as an unevaluated pair hi + lo of float64 arrays, a
+        double-double, so that merging partial sums in any grouping yields the same float64
+        result after the final rounding. This makes the tree aggregation identical to the flat one.
+
+        Args:
+            gamma_sum (np.ndarray): Weighted sum of the gamma matrices.
+            theta_sum (np.ndarray): Weighted sum of the theta matrices.
+            weight_sum (np.ndarray): Sum of the weights, broadcastable to the matrices.
+        """
+
+        self.hi = [np.asarray(gamma_sum, dtype=np.float64), np.asarray(theta_sum, dtype=np.float64),
+                   np.asarray(weight_sum, dtype=np.float64)]
+        self.lo = [np.zeros_like(array) for array in self.hi]
+
+    @staticmethod
+    def from_client(gamma: np.ndarray, theta: np.ndarray, weight: np.ndarray) -> 'PartialSum':
+        """ The contribution of a single client.
+
+        Note: The products are rounded once; they are identical no matter where they are computed.
+        """
+
+        return PartialSum(weight * gamma, weight * theta, weight)
+
+    def merge(self, other: 'PartialSum') -> 'PartialSum':
+        """ Add another partial sum to this one in place.
+        """
+
+        for i in range(len(self.hi)):
+            s, e = two_sum(self.hi[i], other.hi[i])
+            e = e + (self.lo[i] + other.lo[i])
+            self.hi[i], self.lo[i] = two_sum(s, e)
+        return self
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Weighted averages of gamma and theta.
+        """
+
+        gamma_sum, theta_sum, weight_sum = [hi + lo for hi, lo in zip(self.hi, self.lo)]
+        return gamma_sum / weight_sum, theta_sum / weight_sum
+
+
+def merge_group(partial_sums: List[PartialSum]) -> PartialSum:
+    """ The work of one sub-aggregator: combine the partial sums of its children.
+    """
+
+    merged = PartialSum(*[array.copy() for array in partial_sums[0].hi])
+    merged.lo = [array.copy() for array in partial_sums[0].lo]
+    for partial_sum in partial_sums[1:]:
+        merged.merge(partial_sum)
+    return merged
+
+
+def aggregate_flat(partial_sums: List[PartialSum]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Aggregate all contributions at a single server.
+    """
+
+    return merge_group(partial_sums).result()
+
+
+def aggregate_tree(partial_sums: List[PartialSum], fan_in: int, num_workers: int = 0) -> \
+        Tuple[Tuple[np.ndarray, np.ndarray], List[int]]:
+    """ Aggregate contributions over a tree in which no node has more than fan_in children.
+    Clients are grouped into sub-aggregators, whose partial sums are grouped again, until a single
+    root remains.
+
+    Args:
+        partial_sums (List[PartialSum]): Contributions of the clients.
+        fan_in (int): Maximum number of children of every aggregator.
+        num_workers (int, optional): Run the sub-aggregators of each level in this many local
+            processes. Defaults to 0, i.e., in the calling process.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray], List[int]: The aggregated gamma and theta, and the number of
+            aggregators on each level of the tree.
+    """
+
+    assert fan_in > 1, "Fan-in of the aggregators should be at least 2."
+    assert len(partial_sums) > 0, "No contributions to aggregate."
+
+    pool = multiprocessing.get_context('spawn').Pool(num_workers) if num_workers > 0 else None
+    level_sizes = list()
+    try:
+        level = partial_sums
+        while len(level) > 1 or not level_sizes:
+            groups = [level[i:i + fan_in] for i in range(0, len(level), fan_in)]
+            level = pool.map(merge_group, groups) if pool is not None else [merge_group(g) for g in groups]
+            level_sizes.append(len(level))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return level[0].result(), level_sizes
@@ -0,0 +1,214 @@
+"""
+    File name: local_sweep.py
+    Python Version: 3.8
+    Description: Run the cluster experiment sweeps on a single machine with a process pool.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+from logging_settings import logger
+from dataset_cache import DatasetCache
+from thread_budget import thread_env, apply_thread_limits
+
+
+def execute_task(task: Dict, dataset_cache: DatasetCache = None) -> Dict:
+    """ Run a single sweep task in a pool worker.
+
+    Args:
+        task (Dict): A task as built by cluster_experiments.build_sweep_task.
+        dataset_cache (DatasetCache, optional): Shared cache of global datasets. Defaults to None.
+
+    Returns:
+        Dict: The ledger record of the task.
+    """
+
+    from cluster_experiments import get_task_id, run_sweep_task
+
+    record = {'task_id': get_task_id(task), 'status': 'done', 'error': None}
+    start_time = time.time()
+    try:
+        run_sweep_task(task, dataset_cache)
+    except Exception:
+        record['status'] = 'failed'
+        record['error'] = traceback.format_exc()
+
+    record['time'] = time.time() - start_time
+    return record
+
+
+class LocalSweepRunner:
+    def __init__(self, num_workers: int = 1, threads_per_task: int = 1,
+                 ledger_file: str = 'local_sweep_ledger.jsonl', dataset_cache: DatasetCache = None):
+        """ Execute sweep tasks on a process pool, skipping the ones that a previous run already finished.
+
+        Args:
+            num_workers (int, optional): Number of concurrent tasks. Defaults to 1.
+            threads_per_task (int, optional): Number of torch/BLAS threads per task. Defaults to 1.
+            ledger_file (str, optional): JSON lines file recording the finished and failed tasks.
+                Defaults to 'local_sweep_ledger.jsonl'.
+            dataset_cache (DatasetCache, optional): Cache of global datasets shared by all workers,
+                since many tasks of a sweep generate the same dataset. Defaults to None.
+        """
+
+        self.__num_workers = num_workers
+        self.__threads_per_task = threads_per_task
+        self.__ledger_file = ledger_file
+        self.__dataset_cache = dataset_cache
+
+    def get_finished_tasks(self) -> set:
+        """ Read the ids of successfully finished tasks from the ledger.
+
+        Returns:
+            set: Ids of the finished tasks.
+        """
+
+        finished = set()
+        if not os.path.exists(self.__ledger_file):
+            return finished
+
+        with open(self.__ledger_file, 'r') as ledger:
+            for line in ledger:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run that was killed while writing leaves a partial last line
+                    continue
+                if record['status'] == 'done':
+                    finished.add(record['task_id'])
+        return finished
+
+    def append_record(self, record: Dict):
+        """ Append the record of a task to the ledger.
+
+        Args:
+            record (Dict): Ledger record with the task id, status, runtime and error.
+        """
+
+        with open(self.__ledger_file, 'a') as ledger:
+            ledger.write(json.dumps(record) + '\n')
+            ledger.flush()
+            os.fsync(ledger.fileno())
+
+    def run(self, tasks: List[Dict]) -> List[Dict]:
+        """ Run all unfinished tasks.
+
+        Args:
+            tasks (List[Dict]): Tasks as built by cluster_experiments.build_sweep_task.
+
+        Returns:
+            List[Dict]: The ledger records of the tasks executed in this run.
+        """
+
+        from cluster_experiments import get_task_id
+
+        finished = self.get_finished_tasks()
+        pending = [task for task in tasks if get_task_id(task) not in finished]
+        logger.info(f'Running {len(pending)} out of {len(tasks)} tasks on {self.__num_workers} workers '
+                    f'with {self.__threads_per_task} threads each\n')
+
+        records = list()
+        if not pending:
+            return records
+
+        # Workers inherit the environment, which bounds the BLAS thread pools before they are created
+        context = multiprocessing.get_context('spawn')
+        with thread_env(self.__threads_per_task), \
+                ProcessPoolExecutor(max_workers=self.__num_workers, mp_context=context,
+                                    initializer=apply_thread_limits, initargs=(self.__threads_per_task,)) as executor:
+            futures = [executor.submit(execute_task, task, self.__dataset_cache) for task in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                self.append_record(record)
+                records.append(record)
+
+                if record['status'] == 'failed':
+                    logger.warning(f'Task {record["task_id"]} failed:\n{record["error"]}')
+                logger.info(f'Finished {len(records)}/{len(pending)} tasks, last one took '
+                            f'{record["time"]:.1f} seconds\n')
+
+        return records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the federated causal inference experiments of '
+    'cluster_experiments.py on a single machine. The grid of every selected process id is expanded '
+    'into tasks that are executed by a pool of worker processes.')
+
+    parser.add_argument("-et", "--exp-type", default="balanced_interventions", type=str,
+        help='Type of experiment from: client_sweep_nodiv, client_sweep_div, balanced_interventions, '
+        'compare_aggregations, unbalanced_interventions, and entropy_test.')
+    parser.add_argument("-gt", "--graph-type", default="rnd", type=str,
+        help="Graph type for the experiments. Could be either str (structured) or rnd (random) graphs.")
+    parser.add_argument("-pid", "--process-ids", default=None, type=int, nargs='+',
+        help="Process ids (experiment ids of the cluster) to run. Defaults to all of them.")
+
+    parser.add_argument("-gs", "--graph-size", default=50, type=int,
+        help="Size of the graph, only used by compare_aggregations.")
+    parser.add_argument("-nc", "--num-clients", default=10, type=int,
+        help="Number of clients, only used by compare_aggregations.")
+
+    parser.add_argument("-w", "--workers", default=os.cpu_count(), type=int,
+        help="Number of tasks that run concurrently.")
+    parser.add_argument("-tpt", "--threads-per-task", default=1, type=int,
+        help="Number of torch and BLAS threads of each task.")
+    parser.add_argument("-l", "--ledger", default='local_sweep_ledger.jsonl', type=str,
+        help="JSON lines file tracking finished tasks, used to resume an interrupted sweep.")
+    parser.add_argument("-dc", "--dataset-cache", default='dataset_cache', type=str,
+        help="Directory for caching the generated global datasets. Pass an empty string to disable it.")
+    parser.add_argument("-dcs", "--dataset-cache-size", default=10, type=float,
+        help="Maximum size of the dataset cache in GiB.")
+
+    args = parser.parse_args()
+
+    from cluster_experiments import SWEEP_NUM_PROCESSES, get_sweep_tasks
+
+    if args.exp_type not in SWEEP_NUM_PROCESSES:
+        logger.error(f'Experiment type {args.exp_type} is not defined.')
+        sys.exit(1)
+
+    process_ids = args.process_ids if args.process_ids is not None \
+        else list(range(SWEEP_NUM_PROCESSES[args.exp_type]))
+
+    sweep_tasks = list()
+    for process_id in process_ids:
+        sweep_tasks += get_sweep_tasks(args.exp_type, args.graph_type, process_id,
+                                       args.graph_size, args.num_clients)
+
+    dataset_cache = DatasetCache(args.dataset_cache, int(args.dataset_cache_size * 2 ** 30)) \
+        if args.dataset_cache else None
+
+    runner = LocalSweepRunner(args.workers, args.threads_per_task, args.ledger, dataset_cache)
+    records = runner.run(sweep_tasks)
+
+    failed = [record['task_id'] for record in records if record['status'] == 'failed']
+    if failed:
+        logger.error(f'{len(failed)} tasks failed: {failed}')
+        sys.exit(1)
@@ -0,0 +1,210 @@
+"""
+    File name: prior_codecs.py
+    Python Version: 3.8
+    Description: Compressed exchange of gamma/theta matrices between clients and server.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import numpy as np
+
+from typing import Dict, Tuple
+
+
+class MatrixCodec:
+    def __init__(self, dtype: str = 'float64', top_k: int or float or None = None,
+                 threshold: float or None = None, antisymmetric: bool = False):
+        """ Encoder and decoder of a square gamma or theta logit matrix.
+
+        Only off-diagonal entries are transmitted: ENCO masks the diagonal of gamma, and the
+        diagonal of theta is zero, so neither affects the aggregation or the derived graphs.
+        The decoded diagonal is zero.
+
+        Args:
+            dtype (str, optional): Transmitted value type, one of float64, float32, float16
+                and int8. int8 values are scaled linearly by the largest absolute value.
+                Defaults to 'float64'.
+            top_k (int or float or None, optional): Only send the k entries that changed most
+                with respect to the reference, i.e., the last prior. A float in (0, 1] is a fraction
+                of the entries. Defaults to None.
+            threshold (float or None, optional): Only send entries that changed by more than this
+                value with respect to the reference. Defaults to None.
+            antisymmetric (bool, optional): Only send the upper triangle and restore the lower one as
+                its negative, valid for theta where theta_ij = -theta_ji. Defaults to False.
+        """
+
+        assert dtype in ['float64', 'float32', 'float16', 'int8'], f'Value type {dtype} is not supported.'
+        self.dtype = dtype
+        self.top_k = top_k
+        self.threshold = threshold
+        self.antisymmetric = antisymmetric
+
+    @property
+    def is_sparse(self) -> bool:
+        return self.top_k is not None or self.threshold is not None
+
+    def get_positions(self, num_vars: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Row and column indices of the transmitted entries.
+        """
+
+        if self.antisymmetric:
+            return np.triu_indices(num_vars, k=1)
+        rows, cols = np.nonzero(~np.eye(num_vars, dtype=bool))
+        return rows, cols
+
+    def encode(self, mat: np.ndarray, reference: np.ndarray or None = None) -> Dict[str, np.ndarray]:
+        """ Encode a matrix. Sparse codecs send the change with respect to the reference.
+
+        Args:
+            mat (np.ndarray): The matrix to send.
+            reference (np.ndarray or None, optional): Matrix known to both sides. Defaults to None,
+                which is equivalent to a zero matrix.
+
+        Returns:
+            Dict[str, np.ndarray]: The payload.
+        """
+
+        rows, cols = self.get_positions(mat.shape[0])
+        values = mat[rows, cols]
+        payload = dict()
+
+        if self.is_sparse:
+            if reference is not None:
+                values = values - reference[rows, cols]
+
+            selected = np.arange(len(values))
+            if self.threshold is not None:
+                selected = selected[np.abs(values[selected]) > self.threshold]
+            if self.top_k is not None:
+                k = int(np.ceil(self.top_k * len(values))) if isinstance(self.top_k, float) else self.top_k
+                if k < len(selected):
+                    selected = selected[np.argpartition(-np.abs(values[selected]), k)[:k]]
+            selected = np.sort(selected)
+
+            index_dtype = np.uint16 if len(values) <= np.iinfo(np.uint16).max else np.uint32
+            payload['indices'] = selected.astype(index_dtype)
+            values = values[selected]
+
+        if self.dtype == 'int8':
+            max_abs = np.abs(values).max() if len(values) > 0 else 0.0
+            scale = max_abs / 127.0 if max_abs > 0 else 1.0
+            payload['values'] = np.round(values / scale).astype(np.int8)
+            payload['scale'] = np.array([scale], dtype=np.float32)
+        else:
+            payload['values'] = values.astype(self.dtype)
+
+        return payload
+
+    def decode(self, payload: Dict[str, np.ndarray], num_vars: int,
+               reference: np.ndarray or None = None) -> np.ndarray:
+        """ Decode a payload of encode.
+
+        Args:
+            payload (Dict[str, np.ndarray]): The received payload.
+            num_vars (int): Size of the matrix.
+            reference (np.ndarray or None, optional): The same reference as for encoding. Defaults to None.
+
+        Returns:
+            np.ndarray: The decoded float64 matrix.
+        """
+
+        rows, cols = self.get_positions(num_vars)
+        values = payload['values'].astype(np.float64)
+        if self.dtype == 'int8':
+            values = values * payload['scale'][0].astype(np.float64)
+
+        if self.is_sparse:
+            deltas = np.zeros(len(rows))
+            deltas[payload['indices'].astype(np.int64)] = values
+            values = deltas
+            if reference is not None:
+                values = values + reference[rows, cols]
+
+        mat = np.zeros((num_vars, num_vars))
+        mat[rows, cols] = values
+        if self.antisymmetric:
+            mat[cols, rows] = -values
+
+        return mat
+
+    def transmit(self, mat: np.ndarray, reference: np.ndarray or None = None) -> Tuple[np.ndarray, int]:
+        """ Simulate sending a matrix through the codec.
+
+        Returns:
+            np.ndarray, int: The matrix as seen by the receiver and the size of the payload in bytes.
+        """
+
+        payload = self.encode(mat, reference)
+        return self.decode(payload, mat.shape[0], reference), get_payload_size(payload)
+
+
+def get_payload_size(payload: Dict[str, np.ndarray]) -> int:
+    """ Number of bytes of the arrays in a payload.
+    """
+
+    return int(sum(array.nbytes for array in payload.values()))
+
+
+class PriorExchangeCodec:
+    def __init__(self, dtype: str = 'float16', top_k: int or float or None = None,
+                 threshold: float or None = None, antisymmetric_theta: bool = True,
+                 compress_priors: bool = True):
+        """ Codecs of the client updates (gamma, theta) and the server priors in a federated round.
+
+        Args:
+            dtype (str, optional): Transmitted value type, see MatrixCodec. Defaults to 'float16'.
+            top_k (int or float or None, optional): Sparsify the changes with respect to the last prior,
+                see MatrixCodec. Defaults to None.
+            threshold (float or None, optional): Sparsify the changes with respect to the last prior,
+                see MatrixCodec. Defaults to None.
+            antisymmetric_theta (bool, optional): Only send the upper triangle of theta. Defaults to True.
+            compress_priors (bool, optional): Use the codecs for the priors as well, otherwise the
+                priors are sent as dense float64 matrices. Defaults to True.
+        """
+
+        self.gamma_codec = MatrixCodec(dtype, top_k, threshold)
+        self.theta_codec = MatrixCodec(dtype, top_k, threshold, antisymmetric=antisymmetric_theta)
+        self.compress_priors = compress_priors
+
+    def transmit(self, gamma: np.ndarray, theta: np.ndarray, reference_gamma: np.ndarray or None,
+                 reference_theta: np.ndarray or None, is_prior: bool = False) -> Tuple[np.ndarray, np.ndarray, int]:
+        """ Simulate sending a gamma/theta pair.
+
+        Args:
+            gamma (np.ndarray): Edge existence logits.
+            theta (np.ndarray): Edge orientation logits.
+            reference_gamma (np.ndarray or None): The last prior gamma, if any.
+            reference_theta (np.ndarray or None): The last prior theta, if any.
+            is_prior (bool, optional): Set True for priors sent by the server. Defaults to False.
+
+        Returns:
+            np.ndarray, np.ndarray, int: The received gamma and theta, and the number of bytes sent.
+        """
+
+        if is_prior and not self.compress_priors:
+            return gamma, theta, get_dense_size(gamma.shape[0])
+
+        gamma, gamma_size = self.gamma_codec.transmit(gamma, reference_gamma)
+        theta, theta_size = self.theta_codec.transmit(theta, reference_theta)
+        return gamma, theta, gamma_size + theta_size
+
+
+def get_dense_size(num_vars: int) -> int:
+    """ Number of bytes of an uncompressed gamma/theta pair of float64 matrices.
+    """
+
+    return 2 * num_vars * num_vars * np.dtype(np.float64).itemsize
@@ -0,0 +1,147 @@
+"""
+    File name: profiling.py
+    Python Version: 3.8
+    Description: Wall time, CPU time and memory of the stages of a federated simulation.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import os
+import json
+import time
+
+from contextlib import contextmanager
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def get_peak_rss_kb() -> int:
+    """ Peak resident set size of the calling process in kilobytes, or -1 if unknown.
+    """
+
+    if resource is None:
+        return -1
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class StageProfiler:
+    def __init__(self):
+        """ Records one event per executed stage with its wall time, CPU time of the process and the
+        peak resident set size of the process at the end of the stage. Attributes such as the round
+        or the client id are attached to the events, either per stage or for all stages of a scope.
+        """
+
+        self.events: List[Dict] = list()
+        self.__scope: Dict = dict()
+
+    @contextmanager
+    def scope(self, **attributes):
+        """ Attach attributes to all stages recorded within this context.
+        """
+
+        previous = self.__scope
+        self.__scope = {**previous, **attributes}
+        try:
+            yield
+        finally:
+            self.__scope = previous
+
+    @contextmanager
+    def stage(self, name: str, **attributes):
+        """ Record the execution of a stage.
+
+        Args:
+            name (str): Name of the stage, e.g., graph_fitting.
+            attributes: Additional attributes of the event, e.g., the epoch.
+        """
+
+        start_time = time.time()
+        start_counter = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.events.append({
+                'name': name,
+                'start': start_time,
+                'wall': time.perf_counter() - start_counter,
+                'cpu': time.process_time() - start_cpu,
+                'peak_rss_kb': get_peak_rss_kb(),
+                'pid': os.getpid(),
+                **self.__scope,
+                **attributes
+            })
+
+    def add_events(self, events: List[Dict], **attributes):
+        """ Add events recorded by another profiler, e.g., in a client process.
+
+        Args:
+            events (List[Dict]): The recorded events.
+            attributes: Attributes to attach to all of them.
+        """
+
+        self.events += [{**event, **attributes} for event in events]
+
+    def pop_events(self) -> List[Dict]:
+        """ Return the recorded events and clear them.
+        """
+
+        events, self.events = self.events, list()
+        return events
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ Total wall and CPU time and the number of executions of each stage.
+        """
+
+        summary = dict()
+        for event in self.events:
+            stage = summary.setdefault(event['name'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_rss_kb': -1})
+            stage['count'] += 1
+            stage['wall'] += event['wall']
+            stage['cpu'] += event['cpu']
+            stage['peak_rss_kb'] = max(stage['peak_rss_kb'], event['peak_rss_kb'])
+        return summary
+
+    def to_chrome_trace(self) -> Dict:
+        """ Convert the events to the Chrome trace event format, viewable in chrome://tracing or Perfetto.
+        Every client gets its own track, the server stages are on the track of their process.
+        """
+
+        trace_events = list()
+        for event in self.events:
+            args = {key: value for key, value in event.items() if key not in ['name', 'start', 'wall', 'pid']}
+            trace_events.append({
+                'name': event['name'],
+                'ph': 'X',
+                'ts': event['start'] * 1e6,
+                'dur': event['wall'] * 1e6,
+                'pid': event['pid'],
+                'tid': f'client {event["client"]}' if 'client' in event else 'server',
+                'args': args
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, file_path: str):
+        """ Write the events as Chrome trace JSON file.
+        """
+
+        with open(file_path, 'w') as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file, default=str)
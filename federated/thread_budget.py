@@ -0,0 +1,122 @@
+"""
+    File name: thread_budget.py
+    Python Version: 3.8
+    Description: Divide a CPU budget among concurrent worker processes.
+"""
+
+# ========================================================================
+# Copyright 2021, The CFL Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========================================================================
+
+import os
+
+from contextlib import contextmanager
+from typing import List, Tuple
+
+import torch
+
+
+""" Environment variables that bound the thread pools of the numerical libraries """
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"]
+
+
+def get_available_cpus() -> List[int]:
+    """ List the CPUs this process may run on.
+
+    Returns:
+        List[int]: CPU ids, respecting affinity masks of e.g. cluster schedulers where supported.
+    """
+
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+class ThreadBudget:
+    def __init__(self, cpu_budget: int or None = None, pin_cpus: bool = False):
+        """ A total number of threads that is shared by concurrent workers.
+
+        Args:
+            cpu_budget (int or None, optional): Total number of threads of all workers. Defaults to
+                None, which uses all CPUs available to this process.
+            pin_cpus (bool, optional): Set True to pin every worker to its own set of CPUs.
+                Defaults to False.
+        """
+
+        self.cpus = get_available_cpus()
+        self.cpu_budget = cpu_budget if cpu_budget is not None else len(self.cpus)
+        assert self.cpu_budget > 0, "CPU budget should be at least 1."
+        self.pin_cpus = pin_cpus
+
+    def split(self, num_workers: int) -> List[Tuple[int, List[int] or None]]:
+        """ Divide the budget among a number of concurrent workers.
+
+        Args:
+            num_workers (int): Number of workers running at the same time.
+
+        Returns:
+            List[Tuple[int, List[int] or None]]: Number of threads and the CPU ids to pin to
+                (None without pinning) for every worker.
+        """
+
+        num_threads = max(1, self.cpu_budget // num_workers)
+        allocations = list()
+        for worker_id in range(num_workers):
+            cpu_ids = None
+            if self.pin_cpus:
+                # Wrap around if the budget is smaller than the number of workers
+                first = (worker_id * num_threads) % len(self.cpus)
+                cpu_ids = [self.cpus[(first + i) % len(self.cpus)] for i in range(num_threads)]
+            allocations.append((num_threads, cpu_ids))
+
+        return allocations
+
+
+@contextmanager
+def thread_env(num_threads: int):
+    """ Temporarily set the thread environment variables, e.g., while starting worker processes
+    that inherit the environment and size their thread pools at import time.
+
+    Args:
+        num_threads (int): Number of threads of the workers.
+    """
+
+    previous = {env_var: os.environ.get(env_var) for env_var in THREAD_ENV_VARS}
+    for env_var in THREAD_ENV_VARS:
+        os.environ[env_var] = str(num_threads)
+    try:
+        yield
+    finally:
+        for env_var, value in previous.items():
+            if value is None:
+                os.environ.pop(env_var, None)
+            else:
+                os.environ[env_var] = value
+
+
+def apply_thread_limits(num_threads: int, cpu_ids: List[int] or None = None):
+    """ Limit the threads of the calling process, to be called first thing in a worker.
+
+    Args:
+        num_threads (int): Number of intra-op threads.
+        cpu_ids (List[int] or None, optional): CPUs to pin the process to. Defaults to None.
+    """
+
+    for env_var in THREAD_ENV_VARS:
+        os.environ[env_var] = str(num_threads)
+    torch.set_num_threads(num_threads)
+
+    if cpu_ids is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpu_ids)
@@ -67,6 +67,38 @@ def split_variables_set(num_vars: int, accessible_percentages: List, seed=0):
     return indices
 
 
+def split_variables_evenly(num_vars: int, num_clients: int, seed=0):
+    """Split a set of variables into disjoint, equally sized parts, one per client. The
+    remainder of num_vars / num_clients goes to the last clients, one variable each, so
+    that no variable is left out.
+
+    Args:
+        num_vars (int): Total number of variables.
+        num_clients (int): Number of clients.
+        seed (int, optional): Random seed for shuffling. Defaults to 0.
+
+    Returns:
+        List: A list of splits.
+    """
+    variables = [var for var in range(num_vars)]
+
+    random.seed(seed)
+    random.shuffle(variables)
+
+    sizes = [num_vars // num_clients] * num_clients
+    for client_id in range(num_clients - num_vars % num_clients, num_clients):
+        sizes[client_id] += 1
+
+    indices = list()
+    start, end = 0, 0
+    for size in sizes:
+        start = end
+        end = start + size
+        indices.append(variables[start: end])
+
+    return indices
+
+
 def find_shortest_distance_dict(variable_index, adjacency_mat) -> Dict:
     """ Get a dict with elements that indicate the shortest distance between
     each variable and the one determined by index.
@@ -106,30 +138,93 @@ def calculate_metrics(predicted_mat: np.ndarray, ground_truth: np.ndarray) -> Di
     Returns:
         Dict: Metrics dictionary.
     """
-    false_positives = np.logical_and(predicted_mat, np.logical_not(ground_truth))
-    false_negatives = np.logical_and(np.logical_not(predicted_mat), ground_truth)
+    batch_metrics = calculate_metrics_batch(np.asarray(predicted_mat)[None], ground_truth)
+    return split_batch_metrics(batch_metrics)[0]
+
+
+def split_batch_metrics(batch_metrics: Dict[str, np.ndarray]) -> List[Dict]:
+    """Split the output of calculate_metrics_batch into one metrics dictionary per matrix,
+    with the same types as returned by calculate_metrics.
+
+    Args:
+        batch_metrics (Dict[str, np.ndarray]): Metrics dictionary of calculate_metrics_batch.
+
+    Returns:
+        List[Dict]: A list of metrics dictionaries.
+    """
+
+    return [{key: (value[idx] if key in ["recall", "precision"] else int(value[idx]))
+             for key, value in batch_metrics.items()} for idx in range(len(batch_metrics["TP"]))]
+
+
+def pack_adjacency_mats(adj_mats: np.ndarray) -> np.ndarray:
+    """Pack a stack of adjacency matrices into bits along the last axis, e.g., to store the
+    adjacency matrices of large sweeps compactly.
+
+    Args:
+        adj_mats (np.ndarray): Adjacency matrices of shape [K, N, N].
+
+    Returns:
+        np.ndarray: Packed matrices of shape [K, N, ceil(N / 8)] and type np.uint8.
+    """
+
+    return np.packbits(np.asarray(adj_mats) != 0, axis=-1)
+
+
+def calculate_metrics_batch(predicted_mats: np.ndarray, ground_truth: np.ndarray,
+                            packed: bool = False, chunk_size: int = 1024) -> Dict[str, np.ndarray]:
+    """Vectorized version of calculate_metrics for a stack of predicted adjacency matrices.
+    All metrics are computed in one pass over the stack and returned as arrays of length K.
+
+    Args:
+        predicted_mats (np.ndarray): Predicted adjacency matrices of shape [K, N, N], or of shape
+            [K, N, ceil(N / 8)] if packed is True (see pack_adjacency_mats).
+        ground_truth (np.ndarray): The true structure of underlying causality graph, shape [N, N].
+        packed (bool, optional): Set True if predicted_mats are packed bits. Defaults to False.
+        chunk_size (int, optional): Number of packed matrices to unpack at once, which bounds
+            the memory overhead for large stacks. Defaults to 1024.
+
+    Returns:
+        Dict[str, np.ndarray]: Metrics dictionary with one entry per predicted matrix.
+    """
+    ground_truth = np.asarray(ground_truth) != 0
+    num_vars = ground_truth.shape[-1]
+
+    if packed:
+        if predicted_mats.shape[0] == 0:
+            # No chunks to concatenate, the unpacked path returns the empty arrays
+            return calculate_metrics_batch(np.zeros((0, num_vars, num_vars), dtype=bool), ground_truth)
+        chunks = [np.unpackbits(predicted_mats[i: i + chunk_size], axis=-1, count=num_vars).astype(bool)
+                  for i in range(0, predicted_mats.shape[0], chunk_size)]
+        chunk_metrics = [calculate_metrics_batch(chunk, ground_truth) for chunk in chunks]
+        return {key: np.concatenate([m[key] for m in chunk_metrics]) for key in chunk_metrics[0]}
+
+    predicted_mats = np.asarray(predicted_mats) != 0
+    sum_mats = lambda x: x.sum(axis=(-2, -1)).astype(float)
+
+    false_positives = predicted_mats & ~ground_truth
+    false_negatives = ~predicted_mats & ground_truth
 
-    TP = np.logical_and(predicted_mat, ground_truth).astype(float).sum()
-    TN = np.logical_and(np.logical_not(predicted_mat), np.logical_not(ground_truth)).astype(float).sum()
-    FP = false_positives.astype(float).sum()
-    FN = false_negatives.astype(float).sum()
-    TN = TN - predicted_mat.shape[-1]
-    TN = 0 if TN < 0 else TN
+    TP = sum_mats(predicted_mats & ground_truth)
+    FP = sum_mats(false_positives)
+    FN = sum_mats(false_negatives)
+    TN = predicted_mats.shape[-1] * predicted_mats.shape[-2] - TP - FP - FN
+    TN = np.maximum(TN - predicted_mats.shape[-1], 0)
 
-    recall = TP / max(TP + FN, 1e-5)
-    precision = TP / max(TP + FP, 1e-5)
+    recall = TP / np.maximum(TP + FN, 1e-5)
+    precision = TP / np.maximum(TP + FP, 1e-5)
 
-    rev = np.logical_and(predicted_mat, ground_truth.T)
-    num_revs = rev.astype(float).sum()
-    SHD = (false_positives + false_negatives + rev + rev.T).astype(float).sum() - num_revs
+    rev = predicted_mats & ground_truth.T
+    num_revs = sum_mats(rev)
+    SHD = sum_mats(false_positives | false_negatives | rev | np.swapaxes(rev, -2, -1)) - num_revs
 
     metrics = {
-        "TP": int(TP),
-        "TN": int(TN),
-        "FP": int(FP),
-        "FN": int(FN),
-        "SHD": int(SHD),
-        "reverse": int(num_revs),
+        "TP": TP.astype(int),
+        "TN": TN.astype(int),
+        "FP": FP.astype(int),
+        "FN": FN.astype(int),
+        "SHD": SHD.astype(int),
+        "reverse": num_revs.astype(int),
         "recall": recall,
         "precision": precision,
     }
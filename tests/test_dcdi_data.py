@@ -0,0 +1,124 @@
+"""
+    File name: test_dcdi_data.py
+    Python Version: 3.8
+    Description: The memory-mapped DCDI data manager and the chunked full-split losses against the
+        in-memory DataManagerFile.
+
+    Usage (from the repository root):
+        $ python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'baselines', 'dcdi'))
+from dcdi.data import DataManagerFile, MemmapDataManagerFile
+
+
+NUM_SAMPLES, NUM_VARS = 3000, 7
+TARGETS = {0: [], 1: [2], 2: [0, 5, 6], 3: [4]}
+
+
+@pytest.fixture(scope='module')
+def data_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dcdi_data')
+    rng = np.random.default_rng(0)
+    regimes = rng.integers(0, len(TARGETS), NUM_SAMPLES)
+
+    np.save(path / 'DAG1.npy', np.triu(np.ones((NUM_VARS, NUM_VARS)), k=1))
+    np.save(path / 'data1.npy', rng.normal(size=(NUM_SAMPLES, NUM_VARS)))
+    np.save(path / 'data_interv1.npy', rng.normal(size=(NUM_SAMPLES, NUM_VARS)))
+    np.savetxt(path / 'regime1.csv', regimes, fmt='%d')
+    with open(path / 'intervention1.csv', 'w') as f:
+        f.writelines(','.join(map(str, TARGETS[regime])) + '\n' for regime in regimes)
+    return str(path)
+
+
+DATA_KWARGS = [dict(intervention=True),
+               dict(intervention=True, normalize=True, regimes_to_ignore=[2]),
+               dict(intervention=True, train=False),
+               dict(intervention=False),
+               dict(intervention=False, dcd=True)]
+
+
+@pytest.mark.parametrize('kwargs', DATA_KWARGS)
+def test_memmap_manager_matches_in_memory(data_path, kwargs):
+    in_memory = DataManagerFile(data_path, 1, **kwargs)
+    memmap = MemmapDataManagerFile(data_path, 1, chunk_size=1000, **kwargs)
+
+    assert in_memory.data_path == memmap.data_path
+    assert memmap.num_samples == in_memory.num_samples
+    assert memmap.num_regimes == in_memory.num_regimes
+    np.testing.assert_array_equal(memmap.regimes, in_memory.regimes)
+    if in_memory.gt_interv is None:
+        assert memmap.gt_interv is None
+    else:
+        np.testing.assert_array_equal(memmap.gt_interv, in_memory.gt_interv)
+
+    # Same random draws, so the same minibatches
+    for batch_size in [64, in_memory.num_samples]:
+        x, masks, regimes = in_memory.sample(batch_size)
+        memmap_x, memmap_masks, memmap_regimes = memmap.sample(batch_size)
+        torch.testing.assert_close(memmap_x, x, rtol=0, atol=1e-5)
+        torch.testing.assert_close(memmap_masks, masks)
+        if regimes is None:
+            assert memmap_regimes is None
+        else:
+            np.testing.assert_array_equal(memmap_regimes, regimes)
+
+
+@pytest.mark.parametrize('kwargs', DATA_KWARGS)
+def test_iterate_covers_the_split_in_order(data_path, kwargs):
+    in_memory = DataManagerFile(data_path, 1, **kwargs)
+    memmap = MemmapDataManagerFile(data_path, 1, **kwargs)
+
+    for manager in (in_memory, memmap):
+        chunks = list(manager.iterate(chunk_size=700))
+        x = torch.cat([chunk[0] for chunk in chunks])
+        masks = torch.cat([chunk[1] for chunk in chunks])
+
+        assert x.shape == (in_memory.num_samples, NUM_VARS)
+        torch.testing.assert_close(x, in_memory.dataset, rtol=0, atol=1e-5)
+        if kwargs['intervention']:
+            torch.testing.assert_close(masks, in_memory.convert_masks(np.arange(in_memory.num_samples)))
+            np.testing.assert_array_equal(np.concatenate([chunk[2] for chunk in chunks]), in_memory.regimes)
+        else:
+            torch.testing.assert_close(masks, torch.ones_like(x))
+
+
+class LinearGaussianModel:
+    """
+    Deterministic stand-in for the DCDI models: a Gaussian log-likelihood per variable around a
+    linear function of the other variables, shifted by the regime when masks are given.
+    """
+    def __init__(self, num_vars, seed=0):
+        generator = torch.Generator().manual_seed(seed)
+        self.weights = torch.randn(num_vars, num_vars, generator=generator).triu(1)
+
+    def compute_log_likelihood(self, x, weights, biases, extra_params, mask=None, regime=None):
+        mean = x @ self.weights
+        if mask is not None:
+            mean = mean * mask + torch.as_tensor(regime, dtype=x.dtype)[:, None] * (1 - mask)
+        return -0.5 * (x - mean) ** 2
+
+
+@pytest.mark.parametrize('intervention_type, intervention_knowledge',
+                         [('perfect', 'known'), ('imperfect', 'known'), ('perfect', 'unknown')])
+def test_chunked_loss_matches_full_batch(data_path, intervention_type, intervention_knowledge):
+    pytest.importorskip('cdt')
+    from dcdi.train import compute_loss, compute_loss_full
+
+    model = LinearGaussianModel(NUM_VARS)
+    data = MemmapDataManagerFile(data_path, 1, intervention=True, normalize=True)
+    x, masks, regimes = data.sample(data.num_samples)
+
+    loss, mean_std = compute_loss(x, masks, regimes, model, None, None, None, True, intervention_type,
+                                  intervention_knowledge, mean_std=True)
+    chunked_loss, chunked_mean_std = compute_loss_full(data, model, None, None, None, True, intervention_type,
+                                                       intervention_knowledge, mean_std=True, chunk_size=700)
+    torch.testing.assert_close(chunked_loss, loss)
+    torch.testing.assert_close(chunked_mean_std, mean_std)
@@ -0,0 +1,162 @@
+"""
+    File name: test_distributed_simulation.py
+    Python Version: 3.8
+    Description: The server/client runtime with a server and two stub clients in local processes
+        against the aggregation of FederatedSimulator on the same matrices.
+
+    Usage (from the repository root):
+        $ python -m pytest tests
+"""
+
+import os
+import pickle
+import socket
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'federated'))
+from federated.distributed_network import Network
+from federated.distributed_simulation import DistributedFederatedSimulator
+from federated.federated_simulation import FederatedSimulator
+
+
+NUM_VARS, NUM_CLIENTS, NUM_ROUNDS = 6, 2, 3
+INTERVENTIONS = {0: [0, 1, 2], 1: [3, 4, 5]}
+LOCALITY_KWARGS = dict(initial_mass=np.full(NUM_CLIENTS, 16.0), alpha=0.5, min_mass=1.0)
+TIMEOUT = 120
+
+
+def client_params(client_id, round_id):
+    """ Fixed gamma and theta of a client in a round. Multiples of 1/8 keep the float32 sums of
+    the reduction exact, so that the priors can be compared bitwise.
+    """
+
+    rng = np.random.default_rng(100 * client_id + round_id)
+    gamma = rng.integers(-8, 9, size=(NUM_VARS, NUM_VARS)) / 8
+    theta = np.triu(rng.integers(-8, 9, size=(NUM_VARS, NUM_VARS)), k=1) / 8
+    np.fill_diagonal(gamma, 0)
+    return gamma, theta - theta.T
+
+
+class StubClient:
+    """
+    Stands in for an ENCOAlg client: its local inference sets the fixed matrices of the round and
+    reports the received priors as its metrics.
+    """
+    def __init__(self, client_id, interventions_list):
+        self.client_id = client_id
+        self.interventions_list = interventions_list
+        self.round_id = -1
+
+    def infer_causal_structure(self, prior_gamma, prior_theta, *args, **kwargs):
+        self.round_id += 1
+        self.set_params(*client_params(self.client_id, self.round_id))
+        self.metrics_dict = {'prior_gamma': prior_gamma, 'prior_theta': prior_theta}
+        self.metrics_dict_acycle = {'round_id': self.round_id}
+        self.epochs_run = self.round_id + 1
+
+    def set_params(self, gamma, theta):
+        self.inferred_existence_mat = gamma
+        self.inferred_orientation_mat = theta
+        self.binary_adjacency_mat = FederatedSimulator.get_binary_adjacency_mat(gamma, theta)
+
+    def get_client_id(self):
+        return self.client_id
+
+    def get_accessible_percentage(self):
+        return 100
+
+    def get_interventions_list(self):
+        return self.interventions_list
+
+
+class StubDistributedSimulator(DistributedFederatedSimulator):
+    """
+    Runs the server and client loops of DistributedFederatedSimulator with stub clients instead
+    of generating data and training ENCO.
+    """
+    def run_agent(self, agent_rank):
+        if agent_rank == self.network.server_rank:
+            self.run_server(np.triu(np.ones((NUM_VARS, NUM_VARS), dtype=int), k=1), NUM_VARS)
+        else:
+            client_id = agent_rank - 1
+            self.run_client(StubClient(client_id, self.interventions_dict[client_id]), NUM_VARS)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def reference_priors(aggregation_method, output_dir):
+    """ Priors of every round aggregated by FederatedSimulator from the same client matrices. """
+
+    simulator = FederatedSimulator(INTERVENTIONS, num_clients=NUM_CLIENTS, output_dir=output_dir)
+    clients = [StubClient(client_id, INTERVENTIONS[client_id]) for client_id in range(NUM_CLIENTS)]
+    simulator._FederatedSimulator__clients = clients
+    simulator._FederatedSimulator__num_vars = NUM_VARS
+
+    priors = list()
+    for round_id in range(NUM_ROUNDS):
+        for client in clients:
+            client.set_params(*client_params(client.client_id, round_id))
+        if aggregation_method == 'naive':
+            prior_gamma, prior_theta = simulator.naive_aggregation()
+        else:
+            prior_gamma, prior_theta = simulator.locality_aggregation(round_id=round_id, **LOCALITY_KWARGS)
+        simulator.results['round_adjs'].append(FederatedSimulator.get_binary_adjacency_mat(prior_gamma, prior_theta))
+        priors.append((prior_gamma, prior_theta))
+    return priors
+
+
+@pytest.mark.parametrize('aggregation_method', ['naive', 'locality'])
+def test_server_priors_match_federated_simulator(aggregation_method, tmp_path):
+    output_dir = str(tmp_path / 'distributed')
+    network = Network(NUM_CLIENTS + 1, master_addr='127.0.0.1', master_port=free_port())
+    simulator = StubDistributedSimulator(network, INTERVENTIONS, num_rounds=NUM_ROUNDS, output_dir=output_dir)
+    simulator.initialize_clients_data(num_vars=NUM_VARS)
+
+    # A failed agent leaves the others waiting in a collective, so they are stopped after a while
+    def stop_agents():
+        for process in network.process_array:
+            process.terminate()
+    watchdog = threading.Timer(TIMEOUT, stop_agents)
+    watchdog.start()
+    try:
+        kwargs = LOCALITY_KWARGS if aggregation_method == 'locality' else dict()
+        simulator.execute_simulation(aggregation_method, num_epochs=1, **kwargs)
+    finally:
+        watchdog.cancel()
+
+    with open(os.path.join(output_dir, 'results_0_0.pickle'), 'rb') as f:
+        results = pickle.load(f)
+
+    expected = reference_priors(aggregation_method, str(tmp_path / 'reference'))
+    assert len(results['round_gammas']) == NUM_ROUNDS
+    for round_id, (prior_gamma, prior_theta) in enumerate(expected):
+        # Reduced on the server
+        np.testing.assert_array_equal(results['round_gammas'][round_id], prior_gamma)
+        np.testing.assert_array_equal(results['round_thetas'][round_id], prior_theta)
+        np.testing.assert_array_equal(results['round_adjs'][round_id],
+                                      FederatedSimulator.get_binary_adjacency_mat(prior_gamma, prior_theta))
+
+        for client_id in range(NUM_CLIENTS):
+            # Gathered from the clients
+            gamma, theta = client_params(client_id, round_id)
+            np.testing.assert_array_equal(results[f'client_{client_id}_adjs'][round_id],
+                                          FederatedSimulator.get_binary_adjacency_mat(gamma, theta))
+            assert results[f'client_{client_id}_metrics_acycle'][round_id] == {'round_id': round_id}
+            assert results[f'client_{client_id}_epochs'][round_id] == round_id + 1
+
+            # Broadcast as float32 by the server
+            received = results[f'client_{client_id}_metrics'][round_id]
+            if round_id == 0:
+                assert received['prior_gamma'] is None and received['prior_theta'] is None
+            else:
+                np.testing.assert_allclose(received['prior_gamma'], expected[round_id - 1][0], rtol=1e-6)
+                np.testing.assert_allclose(received['prior_theta'], expected[round_id - 1][1], rtol=1e-6)
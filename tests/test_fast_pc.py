@@ -0,0 +1,108 @@
+"""
+    File name: test_fast_pc.py
+    Python Version: 3.8
+    Description: The batched JCI-PC engine against a sequential port of pcalg's stable skeleton.
+
+    Usage (from the repository root):
+        $ python -m pytest tests
+"""
+
+import itertools
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'baselines', 'dcdi', 'jci'))
+from fast_pc import FastPC, gauss_ci_pvalues, which
+
+
+class SequentialPC(FastPC):
+    """
+    FastPC with the skeleton loop of pcalg's skeleton(method = "stable"): one test at a time, the
+    edges of a level in the column-major order of which() stably sorted by the first endpoint,
+    and stopping at the first separating set.
+    """
+    def skeleton(self, corr, num_samples, alpha, fixed_gaps, fixed_edges):
+        G = ~fixed_gaps
+        np.fill_diagonal(G, False)
+        sepsets = dict()
+
+        order, done = 0, False
+        while not done and G.any():
+            done = True
+            level_adj = G.copy()
+            for x, y in sorted(which(level_adj), key=lambda pair: pair[0]):
+                if not G[y, x] or fixed_edges[y, x]:
+                    continue
+                nbrs = [v for v in np.flatnonzero(level_adj[:, x]) if v != y]
+                if len(nbrs) < order:
+                    continue
+                if len(nbrs) > order:
+                    done = False
+                for cond_set in itertools.combinations(nbrs, order):
+                    pval = gauss_ci_pvalues(corr, num_samples, np.array([x]), np.array([y]),
+                                            np.array(cond_set, dtype=int).reshape(1, order))[0]
+                    if pval >= alpha:
+                        G[x, y] = G[y, x] = False
+                        sepsets[frozenset((x, y))] = set(cond_set)
+                        break
+            order += 1
+
+        return G, sepsets
+
+
+def simulate_interventional(num_vars, num_samples, num_regimes, seed):
+    """
+    Linear Gaussian SEM on a random DAG with two shifted variables per interventional regime.
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.uniform(0.5, 1.5, (num_vars, num_vars)) * rng.choice([-1, 1], (num_vars, num_vars))
+    weights = np.triu(weights * (rng.random((num_vars, num_vars)) < 3 / num_vars), k=1)
+    regimes = rng.integers(0, num_regimes + 1, num_samples)
+    targets = {regime: rng.choice(num_vars, 2, replace=False) for regime in range(1, num_regimes + 1)}
+
+    data = np.zeros((num_samples, num_vars))
+    for j in range(num_vars):
+        data[:, j] = data @ weights[:, j] + rng.normal(size=num_samples)
+        for regime, regime_targets in targets.items():
+            if j in regime_targets:
+                shifted = regimes == regime
+                data[shifted, j] = rng.normal(2, 1, shifted.sum())
+    return data, regimes
+
+
+# With column-major edge order, the CPDAG differs from pcalg for the unknown-target seeds 5, 12,
+# 14, 20, 22 and 27
+@pytest.mark.parametrize('seed, known', [(seed, False) for seed in range(30)] + [(seed, True) for seed in range(5)])
+def test_cpdag_matches_sequential_pcalg_order(seed, known):
+    data, regimes = simulate_interventional(num_vars=30, num_samples=500, num_regimes=3, seed=seed)
+    # A small batch size splits the conditioning sets of an endpoint over several batches
+    fast = FastPC(batch_size=3).run(data, regimes, alpha=0.01, known=known)
+    sequential = SequentialPC().run(data, regimes, alpha=0.01, known=known)
+    np.testing.assert_array_equal(fast, sequential)
+
+
+def test_skeleton_matches_sequential_pcalg_order():
+    data, regimes = simulate_interventional(num_vars=20, num_samples=2000, num_regimes=3, seed=0)
+    corr = np.corrcoef(data, rowvar=False)
+    no_gaps = np.zeros(corr.shape, dtype=bool)
+
+    skeleton, sepsets = FastPC(batch_size=3).skeleton(corr, data.shape[0], 0.01, no_gaps, no_gaps)
+    ref_skeleton, ref_sepsets = SequentialPC().skeleton(corr, data.shape[0], 0.01, no_gaps, no_gaps)
+    np.testing.assert_array_equal(skeleton, ref_skeleton)
+    assert sepsets == ref_sepsets
+
+
+def test_pdag2dag_extends_the_cpdag():
+    data, regimes = simulate_interventional(num_vars=15, num_samples=1000, num_regimes=2, seed=1)
+    cpdag = FastPC().run(data, regimes, alpha=0.01)
+    dag, success = FastPC.pdag2dag(cpdag)
+
+    assert success
+    directed = (cpdag == 1) & (cpdag.T == 0)
+    np.testing.assert_array_equal(dag[directed], 1)
+    np.testing.assert_array_equal(np.maximum(dag, dag.T), np.maximum(cpdag, cpdag.T))
+    assert not ((dag == 1) & (dag.T == 1)).any()
+    assert np.trace(np.linalg.matrix_power(np.eye(dag.shape[0]) + dag, dag.shape[0])) == dag.shape[0]
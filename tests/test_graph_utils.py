@@ -0,0 +1,166 @@
+"""
+    File name: test_graph_utils.py
+    Python Version: 3.8
+    Description: Kahn's sort and the cached node relations of causal_graphs against the scan-based
+        versions they replaced.
+
+    Usage (from the repository root):
+        $ python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from causal_graphs.graph_definition import CausalDAG
+from causal_graphs.graph_generation import generate_categorical_graph, get_graph_func
+from causal_graphs.graph_utils import _STRUCTURE_CACHE, adj_matrix_to_edges, get_node_relations, sort_graph_by_vars
+
+
+def legacy_sort_graph_by_vars(variables, edges, adj_matrix, latents=None):
+    """ Frozen copy of the scan-based sort_graph_by_vars before Kahn's algorithm. """
+
+    matrix_copy = np.copy(adj_matrix)
+
+    sorted_idxs = []
+
+    def get_empty_nodes():
+        return [i for i in np.where(~matrix_copy.any(axis=0))[0] if i not in sorted_idxs]
+
+    if latents is None or latents.shape[0] == 0 or latents[0, 0] < 0:
+        empty_nodes = get_empty_nodes()
+    else:
+        empty_nodes = [latents[i, 0] for i in range(latents.shape[0])]
+    while len(empty_nodes) > 0:
+        node = empty_nodes.pop(0)
+        sorted_idxs.append(node)
+        matrix_copy[node, :] = False
+        empty_nodes = get_empty_nodes()
+    assert not matrix_copy.any(), "Sorting the graph failed because it is not a DAG!"
+
+    variables = [variables[i] for i in sorted_idxs]
+    adj_matrix = adj_matrix[sorted_idxs][:, sorted_idxs]
+
+    num_vars = len(variables)
+    edges = edges - num_vars  # To have a better replacement
+    if latents is not None:
+        latents = latents - num_vars
+    for v_idx, n_idx in enumerate(sorted_idxs):
+        edges[edges == (n_idx - num_vars)] = v_idx
+        if latents is not None:
+            latents[latents == (n_idx - num_vars)] = v_idx
+
+    if latents is not None:
+        latents[:, 1:] = np.sort(latents[:, 1:], axis=-1)
+        return variables, edges, adj_matrix, latents, sorted_idxs
+    else:
+        return variables, edges, adj_matrix, sorted_idxs
+
+
+def legacy_get_node_relations(adj_matrix):
+    """ Frozen copy of get_node_relations before the transitive closure and the cache. """
+
+    ancestors = adj_matrix.T
+    changed = True
+    while changed:
+        new_anc = np.logical_and(ancestors[..., None], ancestors[None]).any(axis=1)
+        new_anc = np.logical_or(ancestors, new_anc)
+        changed = not (new_anc == ancestors).all().item()
+        ancestors = new_anc
+
+    ancestors = ancestors.astype(np.int32)
+    descendant = ancestors.T
+    node_relations = ancestors - descendant
+    confounder = (node_relations == 0) * ((ancestors[None] * ancestors[:, None]).sum(axis=-1) > 0)
+    node_relations += 2 * confounder
+    node_relations[np.arange(node_relations.shape[0]), np.arange(node_relations.shape[1])] = 0
+
+    return node_relations
+
+
+def random_dag(num_vars, edge_prob, num_latents, seed):
+    """ A DAG with its nodes randomly permuted, and latent confounders with two children each in
+    the format of CausalDAG, i.e., [confounder, child, child] per row.
+    """
+
+    rng = np.random.default_rng(seed)
+    num_nodes = num_vars + num_latents
+    adj_matrix = np.triu(rng.random((num_nodes, num_nodes)) < edge_prob, k=1)
+    adj_matrix[:num_latents] = False
+    adj_matrix[:, :num_latents] = False
+    latents = np.zeros((num_latents, 3), dtype=np.int64)
+    for l in range(num_latents):
+        latents[l] = [l] + sorted(rng.choice(np.arange(num_latents, num_nodes), size=2, replace=False))
+        adj_matrix[l, latents[l, 1:]] = True
+
+    perm = rng.permutation(num_nodes)
+    inverse = np.argsort(perm)
+    adj_matrix = adj_matrix[perm][:, perm]
+    latents = inverse[latents] if num_latents > 0 else None
+    return adj_matrix, latents
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('num_vars,edge_prob,num_latents', [(1, 0.0, 0), (12, 0.0, 0), (12, 0.3, 0),
+                                                            (40, 0.1, 0), (40, 0.5, 0), (30, 0.2, 4)])
+def test_sort_graph_by_vars(seed, num_vars, edge_prob, num_latents):
+    adj_matrix, latents = random_dag(num_vars, edge_prob, num_latents, seed)
+    variables = [f'X{i}' for i in range(adj_matrix.shape[0])]
+    edges = adj_matrix_to_edges(adj_matrix)
+
+    expected = legacy_sort_graph_by_vars(variables, np.copy(edges), adj_matrix,
+                                         None if latents is None else np.copy(latents))
+    for _ in range(2):  # The second call is served from the structure cache
+        result = sort_graph_by_vars(variables, np.copy(edges), adj_matrix,
+                                    None if latents is None else np.copy(latents))
+        assert len(result) == len(expected)
+        assert result[0] == expected[0]
+        assert list(result[-1]) == list(expected[-1])
+        for array, expected_array in zip(result[1:-1], expected[1:-1]):
+            np.testing.assert_array_equal(array, expected_array)
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('num_vars,edge_prob', [(1, 0.0), (12, 0.0), (12, 0.3), (40, 0.1), (40, 0.5)])
+def test_get_node_relations(seed, num_vars, edge_prob):
+    adj_matrix, _ = random_dag(num_vars, edge_prob, 0, seed)
+    expected = legacy_get_node_relations(adj_matrix)
+
+    for _ in range(2):
+        node_relations = get_node_relations(adj_matrix)
+        np.testing.assert_array_equal(node_relations, expected)
+        node_relations[:] = 7  # Changing a returned matrix must not change the cached one
+
+
+def test_cached_sort_of_a_cyclic_graph_fails():
+    _STRUCTURE_CACHE.clear()
+    adj_matrix = np.zeros((3, 3), dtype=bool)
+    adj_matrix[0, 1] = adj_matrix[1, 2] = adj_matrix[2, 1] = True
+    with pytest.raises(AssertionError):
+        sort_graph_by_vars(['A', 'B', 'C'], adj_matrix=adj_matrix)
+
+
+def test_intervened_graph():
+    graph = generate_categorical_graph(num_vars=12, min_categs=3, max_categs=3,
+                                       graph_func=get_graph_func('random'), edge_prob=0.4, seed=0)
+    prob_dists = [v.prob_dist for v in graph.variables]
+    adj_matrix = np.copy(graph.adj_matrix)
+    target = graph.variables[int(np.argmax(graph.adj_matrix.sum(axis=0)))].name
+
+    intervened = graph.get_intervened_graph({target: 1})
+    target_idx = [v.name for v in intervened.variables].index(target)
+
+    # The original graph is left untouched
+    assert [v.prob_dist for v in graph.variables] == prob_dists
+    np.testing.assert_array_equal(graph.adj_matrix, adj_matrix)
+
+    # Only the incoming edges of the target are removed, and the kept order is still causal
+    expected_adj_matrix = np.copy(adj_matrix)
+    expected_adj_matrix[:, target_idx] = False
+    np.testing.assert_array_equal(intervened.adj_matrix, expected_adj_matrix)
+    assert not np.tril(intervened.adj_matrix).any()
+    assert isinstance(intervened, CausalDAG)
+    assert (intervened.sample(batch_size=50, as_array=True)[:, target_idx] == 1).all()
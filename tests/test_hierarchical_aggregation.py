@@ -0,0 +1,79 @@
+"""
+    File name: test_hierarchical_aggregation.py
+    Python Version: 3.8
+    Description: Tree aggregation of double-double partial sums against the flat aggregation.
+
+    Usage (from the repository root):
+        $ python -m pytest tests
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from federated.hierarchical_aggregation import PartialSum, aggregate_flat, aggregate_tree
+
+
+NUM_CLIENTS, NUM_VARS = 200, 6
+
+
+@pytest.fixture(scope='module')
+def contributions():
+    """ Gamma and theta matrices spanning 16 orders of magnitude, so that a plain float64 sum
+    depends on the order of the additions, and per-column weights as in locality aggregation.
+    """
+
+    rng = np.random.default_rng(0)
+    gammas = [rng.random((NUM_VARS, NUM_VARS)) * 10 ** rng.uniform(-8, 8) for _ in range(NUM_CLIENTS)]
+    thetas = [rng.normal(size=(NUM_VARS, NUM_VARS)) * 10 ** rng.uniform(-8, 8) for _ in range(NUM_CLIENTS)]
+    weights = [rng.uniform(0.1, 5.0, size=(1, NUM_VARS)) for _ in range(NUM_CLIENTS)]
+    return gammas, thetas, weights
+
+
+def partial_sums(contributions, order):
+    gammas, thetas, weights = contributions
+    return [PartialSum.from_client(gammas[i], thetas[i], weights[i]) for i in order]
+
+
+@pytest.mark.parametrize('fan_in', [2, 3, 4, 13, NUM_CLIENTS - 1, 2 * NUM_CLIENTS])
+def test_tree_equals_flat(contributions, fan_in):
+    flat_gamma, flat_theta = aggregate_flat(partial_sums(contributions, range(NUM_CLIENTS)))
+    (tree_gamma, tree_theta), level_sizes = aggregate_tree(partial_sums(contributions, range(NUM_CLIENTS)), fan_in)
+
+    assert level_sizes[-1] == 1
+    assert len(level_sizes) == max(1, math.ceil(math.log(NUM_CLIENTS) / math.log(fan_in) - 1e-9))
+    np.testing.assert_array_equal(tree_gamma, flat_gamma)
+    np.testing.assert_array_equal(tree_theta, flat_theta)
+
+
+def test_tree_in_worker_processes(contributions):
+    flat = aggregate_flat(partial_sums(contributions, range(NUM_CLIENTS)))
+    tree, _ = aggregate_tree(partial_sums(contributions, range(NUM_CLIENTS)), fan_in=8, num_workers=2)
+
+    np.testing.assert_array_equal(tree[0], flat[0])
+    np.testing.assert_array_equal(tree[1], flat[1])
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_order_independent(contributions, seed):
+    order = np.random.default_rng(seed).permutation(NUM_CLIENTS)
+    flat = aggregate_flat(partial_sums(contributions, range(NUM_CLIENTS)))
+    shuffled = aggregate_flat(partial_sums(contributions, order))
+
+    np.testing.assert_array_equal(shuffled[0], flat[0])
+    np.testing.assert_array_equal(shuffled[1], flat[1])
+
+
+def test_matches_exact_sum(contributions):
+    gammas, thetas, weights = contributions
+    gamma, theta = aggregate_flat(partial_sums(contributions, range(NUM_CLIENTS)))
+
+    weight_sum = np.array([math.fsum(w[0, j] for w in weights) for j in range(NUM_VARS)])
+    for aggregated, matrices in [(gamma, gammas), (theta, thetas)]:
+        exact = np.array([[math.fsum(w[0, j] * m[i, j] for w, m in zip(weights, matrices))
+                           for j in range(NUM_VARS)] for i in range(NUM_VARS)]) / weight_sum
+        np.testing.assert_allclose(aggregated, exact, rtol=1e-15, atol=0)
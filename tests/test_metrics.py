@@ -0,0 +1,91 @@
+"""
+    File name: test_metrics.py
+    Python Version: 3.8
+    Description: Batched and packed graph metrics against the former per-matrix calculate_metrics.
+
+    Usage (from the repository root):
+        $ python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'federated'))
+from utils import calculate_metrics, calculate_metrics_batch, pack_adjacency_mats, split_batch_metrics
+
+
+METRIC_KEYS = ["TP", "TN", "FP", "FN", "SHD", "reverse", "recall", "precision"]
+
+
+def legacy_calculate_metrics(predicted_mat, ground_truth):
+    """ Frozen copy of calculate_metrics before the batched version. """
+
+    false_positives = np.logical_and(predicted_mat, np.logical_not(ground_truth))
+    false_negatives = np.logical_and(np.logical_not(predicted_mat), ground_truth)
+
+    TP = np.logical_and(predicted_mat, ground_truth).astype(float).sum()
+    TN = np.logical_and(np.logical_not(predicted_mat), np.logical_not(ground_truth)).astype(float).sum()
+    FP = false_positives.astype(float).sum()
+    FN = false_negatives.astype(float).sum()
+    TN = TN - predicted_mat.shape[-1]
+    TN = 0 if TN < 0 else TN
+
+    recall = TP / max(TP + FN, 1e-5)
+    precision = TP / max(TP + FP, 1e-5)
+
+    rev = np.logical_and(predicted_mat, ground_truth.T)
+    num_revs = rev.astype(float).sum()
+    SHD = (false_positives + false_negatives + rev + rev.T).astype(float).sum() - num_revs
+
+    return {"TP": int(TP), "TN": int(TN), "FP": int(FP), "FN": int(FN), "SHD": int(SHD),
+            "reverse": int(num_revs), "recall": recall, "precision": precision}
+
+
+def random_stack(num_mats, num_vars, seed):
+    rng = np.random.default_rng(seed)
+    ground_truth = np.triu(rng.random((num_vars, num_vars)) < 0.3, k=1)
+    predicted_mats = rng.random((num_mats, num_vars, num_vars)) < 0.2
+    predicted_mats[: num_mats // 2] ^= rng.random((num_mats // 2, num_vars, num_vars)) < 0.05
+    return predicted_mats, ground_truth
+
+
+@pytest.mark.parametrize('num_vars', [1, 3, 8, 13])
+def test_batch_matches_legacy(num_vars):
+    predicted_mats, ground_truth = random_stack(40, num_vars, num_vars)
+    predicted_mats[0] = ground_truth
+    predicted_mats[1] = ground_truth.T
+
+    batch = split_batch_metrics(calculate_metrics_batch(predicted_mats, ground_truth))
+    for predicted_mat, metrics in zip(predicted_mats, batch):
+        assert metrics == legacy_calculate_metrics(predicted_mat, ground_truth)
+        assert calculate_metrics(predicted_mat, ground_truth) == metrics
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1024])
+def test_packed_matches_unpacked(chunk_size):
+    predicted_mats, ground_truth = random_stack(30, 11, 0)
+
+    unpacked = calculate_metrics_batch(predicted_mats, ground_truth)
+    packed = calculate_metrics_batch(pack_adjacency_mats(predicted_mats), ground_truth, packed=True,
+                                     chunk_size=chunk_size)
+
+    assert set(packed) == set(unpacked) == set(METRIC_KEYS)
+    for key in METRIC_KEYS:
+        np.testing.assert_array_equal(packed[key], unpacked[key])
+
+
+@pytest.mark.parametrize('packed', [False, True])
+def test_empty_stack(packed):
+    predicted_mats = np.zeros((0, 3, 3), dtype=bool)
+    if packed:
+        predicted_mats = pack_adjacency_mats(predicted_mats)
+
+    metrics = calculate_metrics_batch(predicted_mats, np.eye(3, k=1), packed=packed)
+
+    assert set(metrics) == set(METRIC_KEYS)
+    for key in METRIC_KEYS:
+        assert metrics[key].shape == (0,)
+    assert split_batch_metrics(metrics) == []
@@ -0,0 +1,74 @@
+"""
+    File name: test_notears_suffstat.py
+    Python Version: 3.8
+    Description: Linear NOTEARS on pooled client statistics against NOTEARS on the stacked samples.
+
+    Usage (from the repository root):
+        $ python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'federated'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'baselines', 'notears'))
+from linear import aggregate_statistics, client_statistics, notears_linear, notears_linear_federated
+
+
+NUM_VARS = 8
+CLIENT_SIZES = [400, 250, 350]
+
+
+def simulate_clients(seed):
+    """ Samples of a linear Gaussian SEM split over clients whose noise is shifted by different
+    means, together with the true weights.
+    """
+
+    rng = np.random.default_rng(seed)
+    W_true = np.triu(rng.random((NUM_VARS, NUM_VARS)) < 0.3, k=1) * rng.choice([-1, 1], size=(NUM_VARS, NUM_VARS)) * \
+        rng.uniform(0.8, 1.5, size=(NUM_VARS, NUM_VARS))
+    perm = rng.permutation(NUM_VARS)
+    W_true = W_true[perm][:, perm]
+
+    X_clients = list()
+    for n in CLIENT_SIZES:
+        noise = rng.normal(size=(n, NUM_VARS)) + rng.normal(scale=0.5, size=NUM_VARS)
+        X_clients.append(noise @ np.linalg.inv(np.eye(NUM_VARS) - W_true))
+    return X_clients, W_true
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pooled_statistic_is_centered_gram(seed):
+    X_clients, _ = simulate_clients(seed)
+    X = np.concatenate(X_clients)
+    X = X - X.mean(axis=0, keepdims=True)
+
+    S, n = aggregate_statistics([client_statistics(X_k) for X_k in X_clients])
+
+    assert n == sum(CLIENT_SIZES)
+    np.testing.assert_allclose(S, X.T @ X / n, rtol=1e-12, atol=1e-12)
+    assert np.abs(np.concatenate(X_clients).mean(axis=0)).max() > 0.1  # The clients are not centered
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('acyclicity', ['expm', 'logdet'])
+def test_federated_matches_pooled_notears(seed, acyclicity):
+    """ Both solve the same problem, but stop at the default tolerance of L-BFGS-B along slightly
+    different rounding paths, hence the tolerance on the weights.
+    """
+
+    X_clients, W_true = simulate_clients(seed)
+    d = NUM_VARS
+
+    w_pooled = notears_linear(np.concatenate(X_clients), lambda1=0.1, loss_type='l2', ground_truth=W_true != 0,
+                              acyclicity=acyclicity)
+    W_pooled = (w_pooled[:d * d] - w_pooled[d * d:]).reshape([d, d])
+    W_pooled[np.abs(W_pooled) < 0.3] = 0
+    W_federated = notears_linear_federated(X_clients, lambda1=0.1, acyclicity=acyclicity)
+
+    np.testing.assert_array_equal(W_federated != 0, W_pooled != 0)
+    np.testing.assert_allclose(W_federated, W_pooled, atol=1e-2)
+    np.testing.assert_array_equal(W_federated != 0, W_true != 0)